@@ -43,6 +43,16 @@ function readJsonObject(string $root, string $relativePath): array
     return is_array($decoded) ? $decoded : [];
 }
 
+function removeFiles(string $root, array $relativePaths): void
+{
+    foreach ($relativePaths as $relativePath) {
+        $path = pathFor($root, $relativePath);
+        if (is_file($path)) {
+            unlink($path);
+        }
+    }
+}
+
 function clearDirectory(string $root, string $relativePath): void
 {
     $path = pathFor($root, $relativePath);
@@ -144,11 +154,21 @@ writeJson($root, 'etc/webhooks.json', blankScalarValues($webhooks));
 writeJson($root, 'guestbook/ip_index.json', new stdClass());
 writeJson($root, 'contact/rate_limits.json', new stdClass());
 writeJson($root, 'etc/toast-dm-history.json', new stdClass());
+removeFiles($root, [
+    'etc/toast-dm-history.sqlite3',
+    'etc/toast-dm-history.sqlite3-wal',
+    'etc/toast-dm-history.sqlite3-shm',
+]);
 writeJson($root, 'etc/toast-feed-notify-state.json', [
     'mentions' => new stdClass(),
     'replies' => new stdClass(),
     'reply_mentions_initialized' => false,
 ]);
+removeFiles($root, [
+    'etc/toast-feed-notify-state.sqlite3',
+    'etc/toast-feed-notify-state.sqlite3-wal',
+    'etc/toast-feed-notify-state.sqlite3-shm',
+]);
 writeJson($root, 'etc/off-topic-archive.json', [
     'channels' => [],
     'exported_at' => null,
@@ -10,13 +10,36 @@ import json
 import os
 import logging
 import signal
-from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig, web
 from pathlib import Path
 import re
 import shutil
+import subprocess
 import getpass
 import asyncio
+import base64
 import hashlib
+import io
+import heapq
+import threading
+import bisect
+import math
+import random
+import time
+import ctypes
+import ctypes.util
+import struct
+import sqlite3
+import contextvars
+from collections import deque
+from contextlib import aclosing
+from urllib.parse import urljoin, urlsplit
+
+try:
+    from PIL import Image
+except ImportError:
+    # optional: without Pillow, vision images are inlined as-is and GIFs keep their CDN URL
+    Image = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +64,9 @@ CONFIG_PATH = find_config_path()
 PERSONALITY_PATH = Path(__file__).resolve().parent / 'personality.json'
 SHARED_PERSONALITY_PATH = CONFIG_PATH.parent / 'toast-personality.json'
 GROQ_CHAT_COMPLETIONS_URL = 'https://api.groq.com/openai/v1/chat/completions'
+GROQ_MODELS_URL = 'https://api.groq.com/openai/v1/models'
+STATUS_SERVER_HOST = '127.0.0.1'
+STATUS_SERVER_PORT = 8765
 DEFAULT_GROQ_MODEL = 'llama-3.1-8b-instant'
 DEFAULT_GROQ_VISION_MODEL = 'meta-llama/llama-4-scout-17b-16e-instruct'
 DEFAULT_TOAST_PERSONALITY = (
@@ -53,16 +79,52 @@ GROQ_FALLBACK_REPLY = "yo i'll talk later, sorry dude busy rn"
 DM_MEMORY_CLEAR_PHRASE = 'CLEARMEMORY'
 VISION_IMAGE_SIZE_LIMIT_BYTES = 20 * 1024 * 1024
 VISION_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif'}
+VISION_IMAGE_MAX_EDGE = 1024
+VISION_IMAGE_MAX_PIXELS = 16_000_000
+VISION_IMAGE_JPEG_QUALITY = 85
+VISION_DATA_URL_MAX_BYTES = 4 * 1024 * 1024  # Groq's cap on base64-encoded images
+VISION_FETCH_TIMEOUT_SECONDS = 15
+VISION_PREFETCH_WAIT_SECONDS = 10.0
+VISION_CACHE_MAX_BYTES = 32 * 1024 * 1024
+VISION_CACHE_MAX_ATTACHMENTS = 512
 AI_DM_MIN_SEND_DELAY_SECONDS = 5.0
+AI_DM_FIRST_SEND_DELAY_SECONDS = 1.0
 AI_DM_MAX_CHUNK_LENGTH = 1800
 AI_DM_SHORT_SENTENCE_CHARS = 140
 AI_DM_MEDIUM_SENTENCE_CHARS = 230
+GROQ_MODEL_LATENCY_ALPHA = 0.3
+GROQ_MODEL_LATENCY_STALE_SECONDS = 600.0
+GROQ_ROUTE_LOG_SIZE = 50
+GROQ_HEDGE_SAMPLE_SIZE = 200
+GROQ_HEDGE_MIN_SAMPLES = 20
+GROQ_HEDGE_BUDGET_WINDOW_SECONDS = 60.0
+PROMPT_TOKEN_CHARS = 4.0
+PROMPT_MESSAGE_TOKEN_OVERHEAD = 4
+PROMPT_IMAGE_TOKEN_ESTIMATE = 1000
+PROMPT_RECENT_HISTORY_MESSAGES = 4
+PROMPT_MIN_CONTEXT_TOKENS = 120
 LINKED_FEED_CONTEXT_MAX_POSTS = 6
 LINKED_FEED_CONTEXT_MAX_REPLIES = 8
 LINKED_FEED_CONTEXT_MAX_CHARS = 3500
+FEED_INDEX_FULL_SCAN_SECONDS = 600.0
+LINKED_FEED_REFRESH_SECONDS = 30.0
 LINKED_FEED_CONTEXT_SNIPPET_CHARS = 420
-WIKI_CONTEXT_FILES = ('Home.md', 'Routes-and-Features.md')
+WIKI_CONTEXT_EXCLUDED_FILES = {'_Sidebar.md'}
 WIKI_CONTEXT_MAX_CHARS = 5200
+WIKI_CONTEXT_MAX_SECTIONS = 5
+WIKI_CONTEXT_CANDIDATE_SECTIONS = 8
+WIKI_INDEX_CHECK_SECONDS = 30.0
+WIKI_BM25_K1 = 1.2
+WIKI_BM25_B = 0.75
+WIKI_TITLE_WEIGHT = 3
+WIKI_INDEX_STOPWORDS = {
+    'the', 'and', 'are', 'was', 'were', 'for', 'with', 'this', 'that', 'these', 'those', 'from', 'into',
+    'about', 'what', 'whats', 'how', 'why', 'who', 'when', 'where', 'which', 'does', 'did', 'can', 'could',
+    'would', 'should', 'will', 'you', 'your', 'yours', 'its', 'not', 'but', 'have', 'has', 'had', 'there',
+    'they', 'them', 'then', 'than', 'just', 'like', 'get', 'got', 'also', 'any', 'all', 'out', 'our', 'yes',
+    'yeah', 'lol', 'hey', 'please', 'thanks', 'some', 'more', 'most', 'only', 'very', 'too', 'here',
+}
+BATCHED_MESSAGE_LABEL_PATTERN = re.compile(r'^Message \d+:$', re.M)
 WIKI_CONTEXT_TRIGGER_TERMS = {
     'fridg3', 'site', 'website', 'page', 'pages', 'feature', 'features', 'account', 'accounts',
     'login', 'password', 'settings', 'feed', 'post', 'posts', 'reply', 'journal', 'guestbook',
@@ -84,6 +146,8 @@ def find_wiki_dir():
     return Path(__file__).resolve().parents[2] / 'wiki'
 
 WIKI_DIR = find_wiki_dir()
+# extra markdown wikis indexed alongside wiki/*.md; missing directories are skipped
+WIKI_CONTEXT_EXTRA_DIRS = (WIKI_DIR.parent / 'tools' / 'frdgbeats' / 'wiki',)
 
 def find_ffmpeg_executable():
     """Locate ffmpeg executable on the system.
@@ -143,66 +207,133 @@ def normalize_stream_url(url: str) -> str:
         u = u + '/'
     return u
 
-def parse_playlist(url: str) -> str:
-    """Parse .m3u or .pls playlist file and return the first valid stream URL.
-    
-    Supports:
-      - .m3u format: lines starting with # are metadata, other lines are URLs
-      - .pls format: lines like File1=url, File2=url, etc.
-      - Raw stream URLs: returned as-is
-    
-    Returns the normalized first stream URL found, or the input URL if not a playlist.
+PLAYLIST_SUFFIXES = ('.m3u', '.m3u8', '.pls')
+PLAYLIST_CACHE_TTL_SECONDS = 300
+PLAYLIST_STALE_SECONDS = 3600
+PLAYLIST_ERROR_TTL_SECONDS = 30
+PLAYLIST_FETCH_TIMEOUT_SECONDS = 10
+PLAYLIST_MAX_BYTES = 256 * 1024
+
+# Resolved playlist URLs keyed by playlist URL. Fresh entries are served directly, stale
+# ones are served while a background fetch revalidates them, so restarts and heartbeat
+# rejoins never wait on the playlist host.
+playlist_cache = {}
+playlist_fetch_tasks = {}
+
+def is_playlist_url(url: str) -> bool:
+    return urlsplit(url).path.lower().endswith(PLAYLIST_SUFFIXES)
+
+def parse_playlist_content(content: str, base_url: str) -> list:
+    """Return every stream URL listed in an M3U/M3U8/extended-M3U or PLS playlist.
+
+    HLS playlists (#EXT-X- tags) are returned as the playlist URL itself, since FFmpeg
+    plays those directly. Path-relative entries are resolved against the playlist URL.
     """
-    if not isinstance(url, str):
-        return url
-    
-    url = url.strip()
-    
-    # Check if it looks like a playlist URL
-    if not (url.lower().endswith('.m3u') or url.lower().endswith('.pls')):
-        # Not a playlist file, return as-is
-        return normalize_stream_url(url)
-    
+    lines = [line.strip() for line in re.split(r'\r\n|\n|\r', content.lstrip('\ufeff'))]
+    if any(line.startswith('#EXT-X-') for line in lines):
+        return [base_url]
+
+    urls = []
+    is_pls = any(line.lower() == '[playlist]' for line in lines) or urlsplit(base_url).path.lower().endswith('.pls')
+    for line in lines:
+        if not line:
+            continue
+        if is_pls:
+            match = re.match(r'^file\d*\s*=\s*(.+)$', line, re.I)
+            entry = match.group(1).strip() if match else ''
+        else:
+            entry = '' if line.startswith('#') else line
+        if not entry:
+            continue
+        if entry.startswith(('/', './', '../')) and not entry.startswith('//'):
+            entry = urljoin(base_url, entry)
+        stream_url = normalize_stream_url(entry)
+        if stream_url not in urls:
+            urls.append(stream_url)
+    return urls
+
+async def fetch_playlist_urls(url: str) -> list:
+    logger.info(f"Fetching playlist: {url}")
+    async with ClientSession(timeout=ClientTimeout(total=PLAYLIST_FETCH_TIMEOUT_SECONDS)) as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            raw = await response.content.read(PLAYLIST_MAX_BYTES)
+    urls = parse_playlist_content(raw.decode('utf-8', errors='ignore'), url)
+    if urls:
+        logger.info(f"Extracted {len(urls)} stream URL(s) from playlist, first: {urls[0]}")
+    return urls
+
+async def refresh_playlist_cache(url: str) -> list:
     try:
-        import urllib.request
-        logger.info(f"Fetching playlist: {url}")
-        
-        with urllib.request.urlopen(url, timeout=10) as response:
-            content = response.read().decode('utf-8', errors='ignore')
-        
-        # Parse .m3u format
-        if url.lower().endswith('.m3u'):
-            for line in content.split('\n'):
-                line = line.strip()
-                # Skip comments and empty lines
-                if not line or line.startswith('#'):
-                    continue
-                # Found a stream URL
-                logger.info(f"Extracted from .m3u: {line}")
-                return normalize_stream_url(line)
-        
-        # Parse .pls format
-        elif url.lower().endswith('.pls'):
-            # Look for File1=, File2=, etc. lines
-            for line in content.split('\n'):
-                line = line.strip()
-                if line.lower().startswith('file'):
-                    # Extract URL after '='
-                    if '=' in line:
-                        stream_url = line.split('=', 1)[1].strip()
-                        if stream_url:
-                            logger.info(f"Extracted from .pls: {stream_url}")
-                            return normalize_stream_url(stream_url)
-        
-        # Fallback: if no stream found in playlist, return original URL
-        logger.warning(f"No stream URL found in playlist, using original URL")
-        return normalize_stream_url(url)
-    
+        return await fetch_and_cache_playlist(url)
+    finally:
+        playlist_fetch_tasks.pop(url, None)
+
+async def fetch_and_cache_playlist(url: str) -> list:
+    try:
+        urls = await fetch_playlist_urls(url)
+        if not urls:
+            logger.warning(f"No stream URL found in playlist {url}, using original URL")
+            urls = [normalize_stream_url(url)]
+        playlist_cache[url] = {'urls': urls, 'fetched_at': time.monotonic(), 'ttl': PLAYLIST_CACHE_TTL_SECONDS}
     except Exception as e:
-        logger.error(f"Failed to parse playlist {url}: {e}")
-        # On error, return the original URL normalized
-        return normalize_stream_url(url)
+        logger.error(f"Failed to fetch playlist {url}: {e}")
+        cached = playlist_cache.get(url)
+        if cached and cached['ttl'] == PLAYLIST_CACHE_TTL_SECONDS:
+            # keep serving the last good resolution, but retry soon
+            cached['fetched_at'] = time.monotonic() - PLAYLIST_CACHE_TTL_SECONDS + PLAYLIST_ERROR_TTL_SECONDS
+        else:
+            playlist_cache[url] = {
+                'urls': [normalize_stream_url(url)],
+                'fetched_at': time.monotonic(),
+                'ttl': PLAYLIST_ERROR_TTL_SECONDS,
+            }
+    return playlist_cache[url]['urls']
+
+def start_playlist_fetch(url: str) -> asyncio.Task:
+    # concurrent callers share one in-flight fetch per playlist
+    task = playlist_fetch_tasks.get(url)
+    if task is None or task.done():
+        task = asyncio.create_task(refresh_playlist_cache(url))
+        playlist_fetch_tasks[url] = task
+    return task
+
+async def resolve_stream_urls(url: str) -> list:
+    """Resolve a configured stream URL to its candidate stream URLs without blocking the loop.
+
+    Raw stream URLs are normalized and returned as-is; playlists go through the cache.
+    """
+    if not isinstance(url, str) or url.strip() == '':
+        return [url]
+
+    url = url.strip()
+    if not is_playlist_url(url):
+        return [normalize_stream_url(url)]
+
+    cached = playlist_cache.get(url)
+    if cached:
+        age = time.monotonic() - cached['fetched_at']
+        if age < cached['ttl']:
+            return cached['urls']
+        if age < PLAYLIST_STALE_SECONDS and cached['ttl'] == PLAYLIST_CACHE_TTL_SECONDS:
+            start_playlist_fetch(url)
+            return cached['urls']
+
+    return await asyncio.shield(start_playlist_fetch(url))
+
+async def resolve_stream_url(url: str) -> str:
+    return (await resolve_stream_urls(url))[0]
 
+def get_playlist_cache_stats() -> dict:
+    now = time.monotonic()
+    return {
+        url: {
+            'urls': len(entry['urls']),
+            'age_seconds': round(now - entry['fetched_at'], 1),
+            'fresh': now - entry['fetched_at'] < entry['ttl'],
+        }
+        for url, entry in playlist_cache.items()
+    }
 
 def load_config():
     """Load bot configuration from toast.json"""
@@ -238,23 +369,117 @@ def coerce_float(value, default: float, minimum: float = None, maximum: float =
         result = min(maximum, result)
     return result
 
+# Static prompt pieces and the parsed groq config are compiled once and reused until the
+# config watcher reports a change to toast.json or a personality file.
+prompt_cache = {
+    'entries': {},
+    'hits': 0,
+    'misses': 0,
+    'fingerprints': None,
+}
+
+def invalidate_prompt_cache(reason: str = ''):
+    if prompt_cache['entries']:
+        logger.info(f"Invalidating prompt cache{': ' + reason if reason else ''}")
+    prompt_cache['entries'] = {}
+
+def get_cached_prompt_value(name: str, builder):
+    # without a running config watcher (e.g. scripts importing this module), fall back to
+    # checking the personality files' fingerprints on every lookup
+    if config_watch_state['mode'] is None:
+        fingerprints = tuple(stat_fingerprint(str(path)) for path in (SHARED_PERSONALITY_PATH, PERSONALITY_PATH))
+        if fingerprints != prompt_cache['fingerprints']:
+            prompt_cache['fingerprints'] = fingerprints
+            prompt_cache['entries'] = {}
+
+    entries = prompt_cache['entries']
+    if name in entries:
+        prompt_cache['hits'] += 1
+        return entries[name]
+    prompt_cache['misses'] += 1
+    value = builder()
+    entries[name] = value
+    return value
+
+def get_prompt_cache_stats() -> dict:
+    lookups = prompt_cache['hits'] + prompt_cache['misses']
+    return {
+        'hits': prompt_cache['hits'],
+        'misses': prompt_cache['misses'],
+        'hit_rate': round(prompt_cache['hits'] / lookups, 4) if lookups else 0.0,
+        'entries': sorted(prompt_cache['entries']),
+    }
+
 def get_groq_config() -> dict:
+    return get_cached_prompt_value('groq_config', compile_groq_config)
+
+def compile_groq_config() -> dict:
     groq_config = config.get('groq', {})
     if not isinstance(groq_config, dict):
         groq_config = {}
 
+    model = str(groq_config.get('model', DEFAULT_GROQ_MODEL)).strip() or DEFAULT_GROQ_MODEL
+    max_completion_tokens = coerce_int(groq_config.get('max_completion_tokens'), 700, 1, 4096)
+    hedging = groq_config.get('hedging')
+    if not isinstance(hedging, dict):
+        hedging = {}
     return {
         'api_key': str(groq_config.get('api_key', '')).strip(),
-        'model': str(groq_config.get('model', DEFAULT_GROQ_MODEL)).strip() or DEFAULT_GROQ_MODEL,
+        'model': model,
         'vision_model': str(groq_config.get('vision_model', DEFAULT_GROQ_VISION_MODEL)).strip() or DEFAULT_GROQ_VISION_MODEL,
         'temperature': coerce_float(groq_config.get('temperature'), 0.8, 0.0, 2.0),
         'top_p': coerce_float(groq_config.get('top_p'), 0.95, 0.0, 1.0),
-        'max_completion_tokens': coerce_int(groq_config.get('max_completion_tokens'), 700, 1, 4096),
+        'max_completion_tokens': max_completion_tokens,
         'timeout_seconds': coerce_int(groq_config.get('timeout_seconds'), 30, 5, 120),
         'max_history_messages': coerce_int(groq_config.get('max_history_messages'), 12, 0, 30),
         'max_vision_images': coerce_int(groq_config.get('max_vision_images'), 5, 0, 5),
+        'pool_connections': coerce_int(groq_config.get('pool_connections'), 20, 1, 200),
+        'pool_connections_per_host': coerce_int(groq_config.get('pool_connections_per_host'), 8, 1, 100),
+        'dns_cache_seconds': coerce_int(groq_config.get('dns_cache_seconds'), 300, 0, 3600),
+        'keepalive_seconds': coerce_float(groq_config.get('keepalive_seconds'), 60.0, 1.0, 600.0),
+        'warmup_connection': bool(groq_config.get('warmup_connection', True)),
+        'stream_replies': bool(groq_config.get('stream_replies', True)),
+        'prompt_token_budget': coerce_int(groq_config.get('prompt_token_budget'), 6000, 1000, 100000),
+        'routing_tiers': normalize_routing_tiers(groq_config.get('routing'), model, max_completion_tokens),
+        'hedging': {
+            'enabled': bool(hedging.get('enabled', False)),
+            'percentile': coerce_float(hedging.get('percentile'), 95.0, 50.0, 99.9),
+            'min_delay_seconds': coerce_float(hedging.get('min_delay_seconds'), 1.0, 0.1, 60.0),
+            'budget_per_minute': coerce_int(hedging.get('budget_per_minute'), 6, 0, 600),
+        },
     }
 
+def normalize_routing_tiers(routing, model: str, max_completion_tokens: int) -> list:
+    """Routing tiers ordered cheapest first; the last tier is the catch-all"""
+    raw_tiers = routing.get('tiers') if isinstance(routing, dict) else None
+    tiers = []
+    for index, tier in enumerate(raw_tiers if isinstance(raw_tiers, list) else []):
+        if not isinstance(tier, dict):
+            continue
+        models = tier.get('models', tier.get('model'))
+        if isinstance(models, str):
+            models = [models]
+        models = normalize_prompt_items(models) or [model]
+        max_message_chars = tier.get('max_message_chars')
+        tiers.append({
+            'name': str(tier.get('name', '')).strip() or f"tier{index + 1}",
+            'models': models,
+            'max_completion_tokens': coerce_int(tier.get('max_completion_tokens'), max_completion_tokens, 1, 4096),
+            'max_message_chars': None if max_message_chars is None else coerce_int(max_message_chars, 0, 0),
+            'wiki': bool(tier.get('wiki', True)),
+        })
+    if tiers:
+        return tiers
+
+    # without explicit tiers every reply keeps the plain model and token cap
+    return [{
+        'name': 'standard',
+        'models': [model],
+        'max_completion_tokens': max_completion_tokens,
+        'max_message_chars': None,
+        'wiki': True,
+    }]
+
 def normalize_prompt_items(items) -> list:
     if not isinstance(items, list):
         return []
@@ -313,6 +538,9 @@ def load_discord_personality_block() -> dict:
     return {}
 
 def load_personality_prompt() -> str:
+    return get_cached_prompt_value('personality_prompt', compile_personality_prompt)
+
+def compile_personality_prompt() -> str:
     block = load_discord_personality_block()
     system_prompt = block.get('system_prompt', '')
     if not system_prompt:
@@ -346,6 +574,9 @@ def load_personality_prompt() -> str:
     return "\n\n".join(prompt_parts)
 
 def build_bot_purpose_context() -> str:
+    return get_cached_prompt_value('bot_purpose_context', compile_bot_purpose_context)
+
+def compile_bot_purpose_context() -> str:
     stream_config = config.get('stream', {})
     stream_name = str(stream_config.get('name', '')).strip()
     stream_url = str(stream_config.get('url', '')).strip()
@@ -368,6 +599,12 @@ def build_bot_purpose_context() -> str:
         "- If someone asks for an action that needs admin tools or server slash commands, tell them the practical next step instead of pretending it already happened."
     )
 
+def get_static_system_messages() -> tuple:
+    return get_cached_prompt_value('static_system_messages', lambda: (
+        {'role': 'system', 'content': load_personality_prompt()},
+        {'role': 'system', 'content': build_bot_purpose_context()},
+    ))
+
 def tokenize_context_query(text: str) -> set:
     return {
         token
@@ -381,71 +618,143 @@ def should_include_wiki_context(user_text: str) -> bool:
         return True
     return bool(re.search(r'/(feed|journal|chat|contact|settings|music|gallery|tools|others|discord|account)\b', user_text or '', re.I))
 
-def read_wiki_context_sections() -> list:
-    sections = []
-    for filename in WIKI_CONTEXT_FILES:
-        path = WIKI_DIR / filename
-        try:
-            raw = path.read_text(encoding='utf-8')
-        except Exception as e:
-            logger.warning(f"Failed to read wiki context file {path}: {e}")
+def normalize_index_token(token: str) -> str:
+    # tiny plural folding so "posts" matches "post" without a real stemmer
+    if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize_index_text(text: str) -> list:
+    return [
+        normalize_index_token(token)
+        for token in re.findall(r'[a-z0-9]+', (text or '').lower())
+        if len(token) >= 3 and token not in WIKI_INDEX_STOPWORDS
+    ]
+
+def list_wiki_context_files() -> list:
+    files = []
+    for directory in (WIKI_DIR, *WIKI_CONTEXT_EXTRA_DIRS):
+        if not directory.is_dir():
             continue
+        try:
+            source_prefix = directory.relative_to(WIKI_DIR.parent).as_posix()
+        except ValueError:
+            source_prefix = directory.name
+        for path in sorted(directory.glob('*.md')):
+            if path.name in WIKI_CONTEXT_EXCLUDED_FILES:
+                continue
+            files.append((path, f"{source_prefix}/{path.name}"))
+    return files
 
-        current_title = filename
-        current_lines = []
-        for line in raw.splitlines():
-            heading_match = re.match(r'^(#{1,3})\s+(.+?)\s*$', line)
-            if heading_match:
-                if current_lines:
-                    sections.append({
-                        'source': filename,
-                        'title': current_title,
-                        'body': '\n'.join(current_lines).strip(),
-                    })
-                current_title = heading_match.group(2).strip()
-                current_lines = [line]
-            else:
-                current_lines.append(line)
-
-        if current_lines:
-            sections.append({
-                'source': filename,
-                'title': current_title,
-                'body': '\n'.join(current_lines).strip(),
-            })
+def read_wiki_sections(path: Path, source: str) -> list:
+    try:
+        raw = path.read_text(encoding='utf-8')
+    except Exception as e:
+        logger.warning(f"Failed to read wiki context file {path}: {e}")
+        return []
+
+    sections = []
+    current_title = path.name
+    current_lines = []
+
+    def add_section():
+        body = re.sub(r'\n{3,}', '\n\n', '\n'.join(current_lines)).strip()
+        if body:
+            sections.append({'source': source, 'title': current_title, 'body': body})
+
+    for line in raw.splitlines():
+        heading_match = re.match(r'^(#{1,3})\s+(.+?)\s*$', line)
+        if heading_match:
+            add_section()
+            current_title = heading_match.group(2).strip()
+            current_lines = [line]
+        else:
+            current_lines.append(line)
+    add_section()
     return sections
 
-def score_wiki_section(section: dict, query_tokens: set) -> int:
-    title = str(section.get('title', '')).lower()
-    body = str(section.get('body', '')).lower()
-    score = 0
-    for token in query_tokens:
-        if token in title:
-            score += 5
-        if re.search(rf'\b{re.escape(token)}\b', body):
-            score += 1
-    return score
+# BM25 index over every wiki section: built once, rebuilt only when a wiki file's
+# fingerprint changes (checked at most every WIKI_INDEX_CHECK_SECONDS).
+wiki_index = {
+    'fingerprints': None,
+    'checked_at': 0.0,
+    'sections': [],
+    'postings': {},
+    'lengths': [],
+    'avg_length': 0.0,
+    'idf': {},
+}
+
+def build_wiki_index(files: list) -> dict:
+    sections = []
+    for path, source in files:
+        sections.extend(read_wiki_sections(path, source))
+
+    postings = {}
+    lengths = []
+    for section_index, section in enumerate(sections):
+        # title terms count several times, like the old +5 title bonus
+        tokens = tokenize_index_text(section['body']) + tokenize_index_text(section['title']) * WIKI_TITLE_WEIGHT
+        lengths.append(len(tokens))
+        term_counts = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+        for token, count in term_counts.items():
+            postings.setdefault(token, []).append((section_index, count))
+
+    section_count = len(sections)
+    return {
+        'sections': sections,
+        'postings': postings,
+        'lengths': lengths,
+        'avg_length': (sum(lengths) / section_count) if section_count else 0.0,
+        'idf': {
+            token: math.log(1 + (section_count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for token, entries in postings.items()
+        },
+    }
+
+def get_wiki_index() -> dict:
+    now = time.monotonic()
+    if wiki_index['fingerprints'] is not None and now - wiki_index['checked_at'] < WIKI_INDEX_CHECK_SECONDS:
+        return wiki_index
+    wiki_index['checked_at'] = now
+
+    files = list_wiki_context_files()
+    fingerprints = {source: stat_fingerprint(str(path)) for path, source in files}
+    if fingerprints != wiki_index['fingerprints']:
+        wiki_index.update(build_wiki_index(files))
+        wiki_index['fingerprints'] = fingerprints
+        logger.info(f"Built wiki context index: {len(wiki_index['sections'])} section(s) from {len(files)} file(s)")
+    return wiki_index
+
+def search_wiki_sections(user_text: str, limit: int = WIKI_CONTEXT_CANDIDATE_SECTIONS) -> list:
+    index = get_wiki_index()
+    lengths = index['lengths']
+    avg_length = index['avg_length'] or 1.0
+    scores = {}
+    for token in set(tokenize_index_text(user_text)):
+        entries = index['postings'].get(token)
+        if not entries:
+            continue
+        idf = index['idf'][token]
+        for section_index, term_count in entries:
+            length_norm = 1 - WIKI_BM25_B + WIKI_BM25_B * lengths[section_index] / avg_length
+            scores[section_index] = scores.get(section_index, 0.0) + idf * (
+                term_count * (WIKI_BM25_K1 + 1) / (term_count + WIKI_BM25_K1 * length_norm)
+            )
+    top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [index['sections'][section_index] for section_index, score in top if score > 0]
 
 def build_wiki_context_for_message(user_text: str) -> str:
     if not should_include_wiki_context(user_text):
         return ''
 
-    query_tokens = tokenize_context_query(user_text)
-    sections = read_wiki_context_sections()
-    scored_sections = [
-        (score_wiki_section(section, query_tokens), section)
-        for section in sections
-    ]
-    relevant_sections = [
-        section
-        for score, section in sorted(scored_sections, key=lambda item: item[0], reverse=True)
-        if score > 0
-    ][:5]
-
+    relevant_sections = search_wiki_sections(BATCHED_MESSAGE_LABEL_PATTERN.sub('', user_text))
     if not relevant_sections:
         relevant_sections = [
-            section for section in sections
-            if section.get('source') == 'Home.md' and section.get('title') in ('Project Snapshot', 'fridg3.org Developer Wiki')
+            section for section in get_wiki_index()['sections']
+            if section.get('source') == 'wiki/Home.md' and section.get('title') in ('Project Snapshot', 'fridg3.org Developer Wiki')
         ][:2]
 
     if not relevant_sections:
@@ -454,14 +763,14 @@ def build_wiki_context_for_message(user_text: str) -> str:
     context_parts = []
     total_length = 0
     for section in relevant_sections:
-        body = re.sub(r'\n{3,}', '\n\n', section.get('body', '')).strip()
-        if not body:
-            continue
-        chunk = f"From wiki/{section['source']} - {section['title']}:\n{body}"
+        if len(context_parts) >= WIKI_CONTEXT_MAX_SECTIONS:
+            break
+        chunk = f"From {section['source']} - {section['title']}:\n{section['body']}"
         if total_length + len(chunk) > WIKI_CONTEXT_MAX_CHARS:
             remaining = WIKI_CONTEXT_MAX_CHARS - total_length
             if remaining < 500:
-                break
+                # a lower-ranked but shorter section may still fit whole
+                continue
             chunk = chunk[:remaining].rsplit('\n', 1)[0].strip()
         context_parts.append(chunk)
         total_length += len(chunk)
@@ -495,7 +804,132 @@ config = load_config()
 
 signal_file_path = CONFIG_PATH.parent / '.stream-update-signal'
 feed_notify_state_path = CONFIG_PATH.parent / 'toast-feed-notify-state.json'
+feed_notify_db_path = CONFIG_PATH.parent / 'toast-feed-notify-state.sqlite3'
 dm_history_path = CONFIG_PATH.parent / 'toast-dm-history.json'
+dm_history_db_path = CONFIG_PATH.parent / 'toast-dm-history.sqlite3'
+dm_campaign_db_path = CONFIG_PATH.parent / 'toast-dm-campaigns.sqlite3'
+
+# Every outbound DM goes through one dispatcher: a priority queue drained by a few workers
+# that share a token bucket, so a /sendmsg blast can't starve link confirmations or AI replies
+# and a global 429 from Discord pauses everyone instead of each send finding out alone.
+DISCORD_RATE_LIMIT_BUCKET_LIMIT = 256
+DM_PRIORITY_INTERACTIVE = 0
+DM_PRIORITY_AI_REPLY = 1
+DM_PRIORITY_NOTIFICATION = 2
+DM_PRIORITY_BULK = 3
+DM_PRIORITY_NAMES = {
+    DM_PRIORITY_INTERACTIVE: 'interactive',
+    DM_PRIORITY_AI_REPLY: 'ai_reply',
+    DM_PRIORITY_NOTIFICATION: 'notification',
+    DM_PRIORITY_BULK: 'bulk',
+}
+
+dm_dispatch = {
+    'queue': None,
+    'workers': [],
+    'sequence': 0,
+    'in_flight': 0,
+    'tokens': None,
+    'refilled_at': 0.0,
+    'paused_until': 0.0,
+    'queued': {priority: 0 for priority in DM_PRIORITY_NAMES},
+    'rate_limit': {
+        'buckets': {},
+        'rate_limited': 0,
+        'global_pauses': 0,
+        'last_scope': '',
+    },
+}
+dm_dispatch_sending = contextvars.ContextVar('dm_dispatch_sending', default=False)
+
+def get_dm_dispatch_config() -> dict:
+    dispatch_config = config.get('dm_dispatch', {})
+    if not isinstance(dispatch_config, dict):
+        dispatch_config = {}
+
+    return {
+        # defaults sit just under Discord's global 50 requests/s; per-channel limits are
+        # left to discord.py and the 429 handling in record_discord_rate_limit
+        'rate_per_second': coerce_float(dispatch_config.get('rate_per_second'), 45.0, 0.1, 50.0),
+        'burst': coerce_int(dispatch_config.get('burst'), 45, 1, 50),
+        'concurrency': coerce_int(dispatch_config.get('concurrency'), 8, 1, 20),
+    }
+
+def pause_dm_dispatch(seconds: float):
+    resume_at = time.monotonic() + max(0.0, seconds)
+    if resume_at > dm_dispatch['paused_until']:
+        dm_dispatch['paused_until'] = resume_at
+
+def prune_discord_rate_limit_buckets(now: float):
+    buckets = dm_dispatch['rate_limit']['buckets']
+    if len(buckets) <= DISCORD_RATE_LIMIT_BUCKET_LIMIT:
+        return
+    for key in [key for key, entry in buckets.items() if entry['reset_at'] <= now]:
+        del buckets[key]
+    while len(buckets) > DISCORD_RATE_LIMIT_BUCKET_LIMIT:
+        del buckets[next(iter(buckets))]
+
+def record_discord_rate_limit(status: int, headers, route: str):
+    """Track Discord's per-route buckets and pause every sender only on a global 429.
+
+    Per-channel limits are waited out by discord.py's own route locks, so they stay out
+    of the shared token bucket; one busy DM channel shouldn't stall the rest.
+    """
+    rate_limit = dm_dispatch['rate_limit']
+    now = time.monotonic()
+    bucket = headers.get('X-RateLimit-Bucket')
+    limit = coerce_int(headers.get('X-RateLimit-Limit'), None)
+    remaining = coerce_int(headers.get('X-RateLimit-Remaining'), None)
+    reset_after = coerce_float(headers.get('X-RateLimit-Reset-After'), None)
+    if bucket or remaining is not None:
+        key = f"{bucket or 'unknown'}:{route}"
+        entry = rate_limit['buckets'].pop(key, None) or {'limit': None, 'remaining': None, 'reset_at': now}
+        if limit is not None:
+            entry['limit'] = limit
+        if remaining is not None:
+            entry['remaining'] = remaining
+        if reset_after is not None:
+            entry['reset_at'] = now + reset_after
+        rate_limit['buckets'][key] = entry
+        prune_discord_rate_limit_buckets(now)
+
+    if status == 429:
+        scope = headers.get('X-RateLimit-Scope') or ('global' if headers.get('X-RateLimit-Global') else 'user')
+        rate_limit['rate_limited'] += 1
+        rate_limit['last_scope'] = scope
+        increment_metric('toast_dm_rate_limited_total', (('scope', scope),))
+        if scope == 'global':
+            rate_limit['global_pauses'] += 1
+            pause_dm_dispatch(coerce_float(headers.get('Retry-After'), reset_after or 1.0, 0.0, 3600.0))
+
+def get_discord_rate_limit_stats() -> dict:
+    rate_limit = dm_dispatch['rate_limit']
+    now = time.monotonic()
+    exhausted = sum(
+        1 for entry in rate_limit['buckets'].values()
+        if entry['remaining'] == 0 and entry['reset_at'] > now
+    )
+    return {
+        'buckets': len(rate_limit['buckets']),
+        'exhausted_buckets': exhausted,
+        'rate_limited': rate_limit['rate_limited'],
+        'global_pauses': rate_limit['global_pauses'],
+        'last_scope': rate_limit['last_scope'],
+    }
+
+def build_discord_trace_config() -> TraceConfig:
+    """Feed Discord's rate-limit headers from dispatcher DM sends into the dispatcher state"""
+    trace_config = TraceConfig()
+
+    async def on_request_end(session, context, params):
+        if not dm_dispatch_sending.get() or params.method != 'POST':
+            return
+        path = params.url.path
+        if path.endswith('/messages') or path.endswith('/users/@me/channels'):
+            record_discord_rate_limit(params.response.status, params.response.headers, path)
+
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
 
 # Initialize bot with intents
 intents = discord.Intents.default()
@@ -503,45 +937,170 @@ intents.message_content = True
 intents.voice_states = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(command_prefix="!", intents=intents, http_trace=build_discord_trace_config())
 bot_online = False
 ai_dm_reply_tasks = {}
 ai_dm_pending_batches = {}
 
 MENTION_PATTERN = re.compile(r'@([A-Za-z0-9_-]{1,50})')
 
-def find_accounts_path():
-    cur = Path(__file__).resolve().parent
-    root = cur
+# Process metrics for the local /metrics endpoint (Prometheus text format). Recording is a
+# dict lookup plus a bisect into fixed buckets, so it stays on in production.
+METRIC_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_DEFINITIONS = {
+    'toast_groq_requests_total': ('counter', 'Groq chat completion requests by model, prompt size and outcome'),
+    'toast_groq_request_seconds': ('histogram', 'Groq chat completion latency until the full reply'),
+    'toast_groq_first_token_seconds': ('histogram', 'Streamed Groq replies: time until the first text delta'),
+    'toast_groq_routes_total': ('counter', 'DM replies routed to each tier and model'),
+    'toast_groq_hedges_total': ('counter', 'Slow Groq requests that were hedged or skipped, by outcome'),
+    'toast_groq_retries_total': ('counter', 'Groq chat completion attempts retried after a transient failure'),
+    'toast_groq_breaker_trips_total': ('counter', 'Times the Groq circuit breaker opened'),
+    'toast_groq_breaker_open': ('gauge', '1 while the Groq circuit breaker is open or half-open'),
+    'toast_dm_sends_total': ('counter', 'Discord DMs sent by priority and outcome'),
+    'toast_dm_send_seconds': ('histogram', 'Discord DM send latency'),
+    'toast_dm_queue_depth': ('gauge', 'DMs waiting in the outbound dispatcher by priority'),
+    'toast_dm_queue_wait_seconds': ('histogram', 'Time DMs spent queued before sending, by priority'),
+    'toast_dm_sends_in_flight': ('gauge', 'DMs currently being sent by dispatcher workers'),
+    'toast_dm_rate_limited_total': ('counter', 'Discord 429 responses to DM sends by scope'),
+    'toast_feed_notifications_total': ('counter', 'Feed notification events queued for digest delivery by kind'),
+    'toast_notification_digests_total': ('counter', 'Feed notification DMs flushed, single event or merged digest'),
+    'toast_feed_monitor_tick_seconds': ('histogram', 'feed_notifications_monitor tick duration'),
+    'toast_feed_files_scanned': ('gauge', 'Feed files checked in the last feed index scan'),
+    'toast_feed_files_parsed_total': ('counter', 'Feed files re-parsed because they changed'),
+    'toast_dm_history_seconds': ('histogram', 'DM history store operation time'),
+    'toast_ai_pending_batches': ('gauge', 'Users with DMs waiting to be batched for an AI reply'),
+    'toast_ai_reply_tasks': ('gauge', 'Running AI reply tasks'),
+    'toast_http_request_seconds': ('histogram', 'Local status server handler latency by route'),
+}
+metrics = {
+    'counters': {},
+    'histograms': {},
+}
+
+def increment_metric(name: str, labels: tuple = (), value: float = 1):
+    key = (name, labels)
+    metrics['counters'][key] = metrics['counters'].get(key, 0) + value
+
+def observe_metric(name: str, seconds: float, labels: tuple = ()):
+    key = (name, labels)
+    histogram = metrics['histograms'].get(key)
+    if histogram is None:
+        histogram = metrics['histograms'][key] = {'buckets': [0] * len(METRIC_LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+    index = bisect.bisect_left(METRIC_LATENCY_BUCKETS, seconds)
+    if index < len(METRIC_LATENCY_BUCKETS):
+        histogram['buckets'][index] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+def prompt_size_label(chars: int) -> str:
+    for limit, label in ((2000, 'lt_2k'), (8000, 'lt_8k'), (32000, 'lt_32k')):
+        if chars < limit:
+            return label
+    return 'ge_32k'
+
+def format_metric_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+def render_metrics() -> str:
+    gauges = {
+        ('toast_feed_files_scanned', ()): feed_index['last_scan']['files'],
+        ('toast_ai_pending_batches', ()): len(ai_dm_pending_batches),
+        ('toast_ai_reply_tasks', ()): sum(1 for task in ai_dm_reply_tasks.values() if not task.done()),
+        ('toast_dm_sends_in_flight', ()): dm_dispatch['in_flight'],
+        ('toast_groq_breaker_open', ()): 0 if groq_resilience['breaker']['state'] == 'closed' else 1,
+    }
+    for priority, count in dm_dispatch['queued'].items():
+        gauges[('toast_dm_queue_depth', (('priority', DM_PRIORITY_NAMES[priority]),))] = count
+    lines = []
+    for name, (metric_type, help_text) in METRIC_DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == 'histogram':
+            for (metric_name, labels), histogram in sorted(metrics['histograms'].items()):
+                if metric_name != name:
+                    continue
+                running = 0
+                for bound, count in zip(METRIC_LATENCY_BUCKETS, histogram['buckets']):
+                    running += count
+                    lines.append(f"{name}_bucket{format_metric_labels(labels, (('le', bound),))} {running}")
+                lines.append(f"{name}_bucket{format_metric_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{format_metric_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{format_metric_labels(labels)} {histogram['count']}")
+            continue
+        source = metrics['counters'] if metric_type == 'counter' else gauges
+        for (metric_name, labels), value in sorted(source.items()):
+            if metric_name == name:
+                lines.append(f"{name}{format_metric_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+# Resolved data/ locations are remembered once found; a missing path is looked up again
+# next time in case the site data is created later.
+resolved_data_paths = {}
+
+def find_data_path(*parts: str) -> Path:
+    cached = resolved_data_paths.get(parts)
+    if cached is not None:
+        return cached
+
+    root = Path(__file__).resolve().parent
     while True:
-        candidate = root / 'data' / 'accounts' / 'accounts.json'
+        candidate = root.joinpath('data', *parts)
         if candidate.exists():
+            resolved_data_paths[parts] = candidate
             return candidate
         if root.parent == root:
             break
         root = root.parent
-    return Path(__file__).resolve().parent.parent / 'data' / 'accounts' / 'accounts.json'
+    return Path(__file__).resolve().parent.parent.joinpath('data', *parts)
+
+def find_accounts_path():
+    return find_data_path('accounts', 'accounts.json')
 
 def find_feed_posts_dir():
-    cur = Path(__file__).resolve().parent
-    root = cur
-    while True:
-        candidate = root / 'data' / 'feed'
-        if candidate.exists():
-            return candidate
-        if root.parent == root:
-            break
-        root = root.parent
-    return Path(__file__).resolve().parent.parent / 'data' / 'feed'
+    return find_data_path('feed')
+
+# accounts.json is parsed only when its fingerprint changes. Both maps are rebuilt (never
+# mutated in place) so callers can compare index objects to detect account changes.
+accounts_cache = {
+    'fingerprint': None,
+    'by_username': {},
+    'by_discord_id': {},
+    'loads': 0,
+}
 
-def load_accounts_index():
+def set_accounts_cache(by_username: dict):
+    accounts_cache['by_username'] = by_username
+    accounts_cache['by_discord_id'] = {
+        account['discord_user_id']: account
+        for account in by_username.values()
+        if account.get('discord_user_id')
+    }
+
+def refresh_accounts_cache(force: bool = False):
     accounts_path = find_accounts_path()
+    try:
+        fingerprint = file_fingerprint(accounts_path.stat())
+    except OSError:
+        fingerprint = None
+    if not force and fingerprint is not None and fingerprint == accounts_cache['fingerprint']:
+        return
+
     try:
         with open(accounts_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
     except Exception as e:
         logger.error(f"Failed to load accounts.json: {e}")
-        return {}
+        # keep the last good index while PHP is mid-write; the next change is picked up by mtime
+        if accounts_cache['fingerprint'] is None:
+            set_accounts_cache({})
+        return
 
     index = {}
     for account in data.get('accounts', []):
@@ -555,17 +1114,46 @@ def load_accounts_index():
             'username': username,
             'discord_user_id': discord_user_id,
         }
-    return index
+    set_accounts_cache(index)
+    accounts_cache['fingerprint'] = fingerprint
+    accounts_cache['loads'] += 1
+
+def load_accounts_index():
+    refresh_accounts_cache()
+    return accounts_cache['by_username']
 
 def find_account_by_discord_user_id(discord_user_id: str):
     target_id = str(discord_user_id or '').strip()
     if not target_id:
         return None
+    refresh_accounts_cache()
+    return accounts_cache['by_discord_id'].get(target_id)
+
+def apply_discord_link_to_accounts_cache(site_username: str, discord_user_id: str):
+    # /link-discord answers before PHP saves accounts.json, so the link is applied to the
+    # cache right away and the saved file replaces it once its mtime changes.
+    refresh_accounts_cache(force=True)
+    username_key = site_username.strip().lower()
+    account = accounts_cache['by_username'].get(username_key)
+    if not account or account.get('discord_user_id') == discord_user_id:
+        return
+    by_username = dict(accounts_cache['by_username'])
+    by_username[username_key] = {**account, 'discord_user_id': discord_user_id}
+    set_accounts_cache(by_username)
 
-    for account in load_accounts_index().values():
-        if str(account.get('discord_user_id', '')).strip() == target_id:
-            return account
-    return None
+def extract_mention_keys(body: str) -> tuple:
+    keys = []
+    seen = set()
+    for match in MENTION_PATTERN.finditer(body or ''):
+        key = match.group(1).lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        keys.append(key)
+    return tuple(keys)
+
+def file_fingerprint(stat_result) -> tuple:
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
 
 def parse_feed_post(post_path: Path):
     try:
@@ -586,76 +1174,328 @@ def parse_feed_post(post_path: Path):
         'date': date_line,
         'body': body,
         'path': post_path,
+        'mention_keys': extract_mention_keys(body),
     }
 
-def load_feed_posts():
-    posts_dir = find_feed_posts_dir()
-    posts = {}
+def parse_feed_replies_file(reply_path: Path):
     try:
-        for post_path in posts_dir.glob('*.txt'):
-            parsed = parse_feed_post(post_path)
-            if parsed:
-                posts[parsed['id']] = parsed
+        data = json.loads(reply_path.read_text(encoding='utf-8'))
     except Exception as e:
-        logger.error(f"Failed to scan feed posts: {e}")
-    return posts
+        logger.warning(f"Failed to read replies file {reply_path}: {e}")
+        return None
 
-def load_feed_replies():
-    replies_dir = find_feed_posts_dir() / 'replies'
-    reply_index = {}
-    if not replies_dir.exists():
-        return reply_index
+    replies = data.get('replies', []) if isinstance(data, dict) else []
+    if not isinstance(replies, list):
+        return None
 
-    for reply_path in replies_dir.glob('*.json'):
-        post_id = reply_path.stem
-        try:
-            data = json.loads(reply_path.read_text(encoding='utf-8'))
-        except Exception as e:
-            logger.warning(f"Failed to read replies file {reply_path}: {e}")
+    normalized = []
+    for idx, reply in enumerate(replies):
+        if not isinstance(reply, dict):
             continue
-
-        replies = data.get('replies', [])
-        if not isinstance(replies, list):
+        username = str(reply.get('username', '')).strip().lstrip('@')
+        body = str(reply.get('body', ''))
+        date_line = str(reply.get('date', '')).strip()
+        reply_id = str(reply.get('id', '')).strip()
+        if not reply_id:
+            seed = f"{username}|{date_line}|{body}|{idx}"
+            reply_id = 'legacy_' + hashlib.sha1(seed.encode('utf-8')).hexdigest()[:16]
+        if not username or not date_line or not body.strip():
             continue
+        normalized.append({
+            'id': reply_id,
+            'username': username,
+            'body': body,
+            'date': date_line,
+            'mention_keys': extract_mention_keys(body),
+        })
+    return normalized
 
-        normalized = []
-        for idx, reply in enumerate(replies):
-            if not isinstance(reply, dict):
-                continue
-            username = str(reply.get('username', '')).strip().lstrip('@')
-            body = str(reply.get('body', ''))
-            date_line = str(reply.get('date', '')).strip()
-            reply_id = str(reply.get('id', '')).strip()
-            if not reply_id:
-                seed = f"{username}|{date_line}|{body}|{idx}"
-                reply_id = 'legacy_' + hashlib.sha1(seed.encode('utf-8')).hexdigest()[:16]
-            if not username or not date_line or not body.strip():
-                continue
-            normalized.append({
-                'id': reply_id,
-                'username': username,
-                'body': body,
-                'date': date_line,
-            })
-        reply_index[post_id] = normalized
+# In-process feed index: every data/feed file is parsed once and re-parsed only when its
+# (mtime, size, inode) fingerprint changes. Entries carry the index version they were last
+# changed at and are kept in version order (a changed entry moves to the end), so each
+# consumer can ask for "what changed since version N" by walking back from the newest
+# entry, without touching the rest of the index or interfering with other consumers.
+feed_index = {
+    'version': 0,
+    'posts': {},
+    'replies': {},
+    'post_ids': {},
+    'post_replies': {},
+    'removed_posts': {},
+    'removed_replies': {},
+    'last_scan': {'files': 0, 'parsed': 0, 'mode': 'full'},
+    'refreshed_at': None,
+}
 
-    return reply_index
+# With inotify, refreshes only re-stat the paths the kernel reported since the last refresh;
+# a full directory scan still runs on queue overflow and every FEED_INDEX_FULL_SCAN_SECONDS
+# in case an event was missed. Without inotify every refresh is a full scan.
+feed_watch_state = {
+    'fd': None,
+    'watch_dirs': {},
+    'pending': set(),
+    'full_scan_due': True,
+    'full_scan_at': 0.0,
+    'open_attempted_at': None,
+}
 
-def extract_mentions(body: str, accounts_index: dict):
+def scan_feed_files(directory: Path, suffix: str) -> dict:
+    found = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(suffix) or not entry.is_file():
+                    continue
+                try:
+                    found[entry.path] = file_fingerprint(entry.stat())
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to scan feed directory {directory}: {e}")
+        return None
+    return found
+
+def open_feed_watcher(posts_dir: Path):
+    now = time.monotonic()
+    attempted_at = feed_watch_state['open_attempted_at']
+    if attempted_at is not None and now - attempted_at < FEED_INDEX_FULL_SCAN_SECONDS:
+        return
+    feed_watch_state['open_attempted_at'] = now
+    directories = [str(posts_dir), str(posts_dir / 'replies')]
+    if not all(os.path.isdir(directory) for directory in directories):
+        return
+    watcher = open_inotify_watcher(directories, IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE)
+    if watcher is None:
+        return
+    fd, watch_dirs = watcher
+    if len(watch_dirs) < len(directories):
+        os.close(fd)
+        return
+    feed_watch_state['fd'] = fd
+    feed_watch_state['watch_dirs'] = watch_dirs
+    # events before the watch existed are covered by the full scan this refresh runs
+    feed_watch_state['full_scan_due'] = True
+    logger.info(f"Watching feed files with inotify in {len(watch_dirs)} director(ies)")
+
+def close_feed_watcher():
+    fd = feed_watch_state['fd']
+    feed_watch_state['fd'] = None
+    feed_watch_state['watch_dirs'] = {}
+    feed_watch_state['pending'] = set()
+    feed_watch_state['full_scan_due'] = True
+    if fd is not None:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+def drain_feed_watch_events():
+    for path, mask in read_inotify_events(feed_watch_state['fd'], feed_watch_state['watch_dirs']):
+        if mask & IN_Q_OVERFLOW:
+            feed_watch_state['full_scan_due'] = True
+        elif mask & IN_IGNORED:
+            # a watched directory went away; reopen (and rescan) once it is back
+            close_feed_watcher()
+            feed_watch_state['open_attempted_at'] = None
+            return
+        elif path is not None:
+            feed_watch_state['pending'].add(path)
+
+def move_to_newest(entries: dict, key, value):
+    entries.pop(key, None)
+    entries[key] = value
+
+def update_feed_post(path: str, fingerprint, version: int):
+    """Apply one post file's current state; returns (parsed, changed)"""
+    indexed_posts = feed_index['posts']
+    entry = indexed_posts.get(path)
+    post_id = Path(path).stem
+    if fingerprint is None:
+        if entry is None:
+            return False, False
+        del indexed_posts[path]
+        if entry.get('post'):
+            feed_index['post_ids'].pop(post_id, None)
+            move_to_newest(feed_index['removed_posts'], post_id, version)
+        return False, True
+    if entry and entry['fingerprint'] == fingerprint:
+        return False, False
+
+    post = parse_feed_post(Path(path))
+    if not post and entry and entry.get('post'):
+        # keep serving the last good parse while PHP is mid-write; only a file that is
+        # gone from the scan counts as a removed post
+        entry['fingerprint'] = fingerprint
+        return True, False
+    move_to_newest(indexed_posts, path, {'fingerprint': fingerprint, 'post': post, 'version': version})
+    if post:
+        feed_index['post_ids'][post_id] = post
+        feed_index['removed_posts'].pop(post_id, None)
+    else:
+        feed_index['post_ids'].pop(post_id, None)
+    return True, True
+
+def update_feed_replies(path: str, fingerprint, version: int):
+    """Apply one replies file's current state; returns (parsed, changed)"""
+    indexed_replies = feed_index['replies']
+    entry = indexed_replies.get(path)
+    post_id = Path(path).stem
+    if fingerprint is None:
+        if entry is None:
+            return False, False
+        del indexed_replies[path]
+        feed_index['post_replies'].pop(post_id, None)
+        move_to_newest(feed_index['removed_replies'], post_id, version)
+        return False, True
+    if entry and entry['fingerprint'] == fingerprint:
+        return False, False
+
+    replies = parse_feed_replies_file(Path(path))
+    if replies is None and entry:
+        # keep serving the last good parse while PHP is mid-write
+        entry['fingerprint'] = fingerprint
+        return True, False
+    move_to_newest(indexed_replies, path, {
+        'fingerprint': fingerprint,
+        'post_id': post_id,
+        'replies': replies,
+        'version': version,
+    })
+    if replies is not None:
+        feed_index['post_replies'][post_id] = replies
+    feed_index['removed_replies'].pop(post_id, None)
+    return True, True
+
+def collect_feed_updates(posts_dir: Path):
+    """Return ({post path: fingerprint}, {replies path: fingerprint}, mode); None means gone"""
+    replies_dir = posts_dir / 'replies'
+    if feed_watch_state['fd'] is None:
+        open_feed_watcher(posts_dir)
+    if feed_watch_state['fd'] is not None:
+        drain_feed_watch_events()
+
+    now = time.monotonic()
+    if (
+        feed_watch_state['fd'] is not None
+        and not feed_watch_state['full_scan_due']
+        and now - feed_watch_state['full_scan_at'] < FEED_INDEX_FULL_SCAN_SECONDS
+    ):
+        pending = feed_watch_state['pending']
+        feed_watch_state['pending'] = set()
+        post_updates = {}
+        reply_updates = {}
+        for path in pending:
+            directory, name = os.path.split(path)
+            if directory == str(posts_dir) and name.endswith('.txt'):
+                post_updates[path] = stat_fingerprint(path)
+            elif directory == str(replies_dir) and name.endswith('.json'):
+                reply_updates[path] = stat_fingerprint(path)
+        return post_updates, reply_updates, 'events'
+
+    feed_watch_state['pending'] = set()
+    feed_watch_state['full_scan_due'] = False
+    feed_watch_state['full_scan_at'] = now
+    post_files = scan_feed_files(posts_dir, '.txt')
+    reply_files = scan_feed_files(replies_dir, '.json')
+    # a failed scan keeps the previous entries instead of reporting every file as deleted
+    post_updates = {}
+    if post_files is not None:
+        post_updates = {path: None for path in feed_index['posts'] if path not in post_files}
+        post_updates.update(post_files)
+    reply_updates = {}
+    if reply_files is not None:
+        reply_updates = {path: None for path in feed_index['replies'] if path not in reply_files}
+        reply_updates.update(reply_files)
+    return post_updates, reply_updates, 'full'
+
+def refresh_feed_index() -> int:
+    post_updates, reply_updates, mode = collect_feed_updates(find_feed_posts_dir())
+    parsed_count = 0
+    next_version = feed_index['version'] + 1
+    changed = False
+    for path, fingerprint in post_updates.items():
+        parsed, entry_changed = update_feed_post(path, fingerprint, next_version)
+        parsed_count += parsed
+        changed = changed or entry_changed
+    for path, fingerprint in reply_updates.items():
+        parsed, entry_changed = update_feed_replies(path, fingerprint, next_version)
+        parsed_count += parsed
+        changed = changed or entry_changed
+
+    if changed:
+        feed_index['version'] = next_version
+    feed_index['refreshed_at'] = time.monotonic()
+    feed_index['last_scan'] = {'files': len(post_updates) + len(reply_updates), 'parsed': parsed_count, 'mode': mode}
+    if parsed_count:
+        increment_metric('toast_feed_files_parsed_total', value=parsed_count)
+    return feed_index['version']
+
+def iter_newer_than(entries: dict, since_version: int, version_of):
+    for key, value in reversed(entries.items()):
+        if version_of(value) <= since_version:
+            break
+        yield key, value
+
+def get_feed_index_changes(since_version: int) -> dict:
+    return {
+        'version': feed_index['version'],
+        'posts': {
+            entry['post']['id']: entry['post']
+            for _, entry in iter_newer_than(feed_index['posts'], since_version, lambda entry: entry['version'])
+            if entry.get('post')
+        },
+        'replies': {
+            entry['post_id']: entry['replies']
+            for _, entry in iter_newer_than(feed_index['replies'], since_version, lambda entry: entry['version'])
+            if entry.get('replies') is not None
+        },
+        'removed_posts': {
+            post_id for post_id, _ in iter_newer_than(feed_index['removed_posts'], since_version, int)
+        },
+        'removed_replies': {
+            post_id for post_id, _ in iter_newer_than(feed_index['removed_replies'], since_version, int)
+        },
+    }
+
+def indexed_feed_posts():
+    """Post id -> parsed post. This is the live index mapping; callers must not modify it."""
+    return feed_index['post_ids']
+
+def indexed_feed_post_ids() -> set:
+    return {Path(path).stem for path in feed_index['posts']}
+
+def indexed_feed_replies():
+    """Post id -> parsed replies. This is the live index mapping; callers must not modify it."""
+    return feed_index['post_replies']
+
+def load_feed_posts():
+    refresh_feed_index()
+    return indexed_feed_posts()
+
+def load_feed_replies():
+    refresh_feed_index()
+    return indexed_feed_replies()
+
+def resolve_mentions(mention_keys, accounts_index: dict):
     mentions = []
-    seen = set()
-    for match in MENTION_PATTERN.finditer(body or ''):
-        username_raw = match.group(1)
-        key = username_raw.lower()
-        if key in seen:
-            continue
+    for key in mention_keys or ():
         account = accounts_index.get(key)
         if not account or not account.get('discord_user_id'):
             continue
-        seen.add(key)
         mentions.append(account)
     return mentions
 
+def extract_mentions(body: str, accounts_index: dict):
+    return resolve_mentions(extract_mention_keys(body), accounts_index)
+
+def get_mentions(item: dict, accounts_index: dict):
+    mention_keys = item.get('mention_keys')
+    if mention_keys is None:
+        return extract_mentions(item.get('body', ''), accounts_index)
+    return resolve_mentions(mention_keys, accounts_index)
+
 def clean_feed_context_text(text: str) -> str:
     cleaned = str(text or '')
     cleaned = re.sub(r'\[audio=([^\]]+)\]\[name:([^\]]+)\]', r'[voice note: \2]', cleaned, flags=re.I)
@@ -681,6 +1521,101 @@ def feed_context_sort_key(item: dict):
         str(item.get('post_id', '')),
     )
 
+# Materialized per-username /feed activity for linked-user DM context. It follows the feed
+# index version, so a feed change only touches the users who own the changed posts/replies
+# and only their newest items are re-selected (with a bounded heap, not a full sort).
+linked_feed_activity = {
+    'version': 0,
+    'post_owner': {},
+    'reply_owners': {},
+    'user_posts': {},
+    'user_replies': {},
+    'recent': {},
+}
+
+def build_linked_feed_activity_item(item: dict, post_id: str = '') -> dict:
+    return {
+        'id': str(item.get('id', '')),
+        'post_id': str(post_id or item.get('id', '')),
+        'date': item.get('date', 'unknown date'),
+        'snippet': truncate_context_snippet(item.get('body', '')),
+    }
+
+def drop_linked_feed_post(post_id: str, dirty: set):
+    owner = linked_feed_activity['post_owner'].pop(post_id, None)
+    if owner is None:
+        return
+    user_posts = linked_feed_activity['user_posts'].get(owner, {})
+    user_posts.pop(post_id, None)
+    if not user_posts:
+        linked_feed_activity['user_posts'].pop(owner, None)
+    dirty.add(owner)
+
+def drop_linked_feed_replies(post_id: str, dirty: set):
+    for owner in linked_feed_activity['reply_owners'].pop(post_id, ()):
+        user_replies = linked_feed_activity['user_replies'].get(owner, {})
+        user_replies.pop(post_id, None)
+        if not user_replies:
+            linked_feed_activity['user_replies'].pop(owner, None)
+        dirty.add(owner)
+
+def refresh_linked_feed_activity():
+    # feed_notifications_monitor keeps the index current; a DM only refreshes it itself when
+    # the monitor isn't running, at most every LINKED_FEED_REFRESH_SECONDS
+    refreshed_at = feed_index['refreshed_at']
+    if refreshed_at is None or time.monotonic() - refreshed_at >= LINKED_FEED_REFRESH_SECONDS:
+        refresh_feed_index()
+    if feed_index['version'] == linked_feed_activity['version']:
+        return
+
+    changes = get_feed_index_changes(linked_feed_activity['version'])
+    dirty = set()
+
+    for post_id in changes['removed_posts']:
+        drop_linked_feed_post(post_id, dirty)
+    for post_id, post in changes['posts'].items():
+        drop_linked_feed_post(post_id, dirty)
+        owner = str(post.get('username', '')).strip().lower()
+        if not owner:
+            continue
+        linked_feed_activity['post_owner'][post_id] = owner
+        linked_feed_activity['user_posts'].setdefault(owner, {})[post_id] = build_linked_feed_activity_item(post)
+        dirty.add(owner)
+
+    for post_id in changes['removed_replies']:
+        drop_linked_feed_replies(post_id, dirty)
+    for post_id, replies in changes['replies'].items():
+        drop_linked_feed_replies(post_id, dirty)
+        grouped = {}
+        for reply in replies:
+            owner = str(reply.get('username', '')).strip().lower()
+            if owner:
+                grouped.setdefault(owner, []).append(build_linked_feed_activity_item(reply, post_id))
+        if not grouped:
+            continue
+        linked_feed_activity['reply_owners'][post_id] = set(grouped)
+        for owner, items in grouped.items():
+            linked_feed_activity['user_replies'].setdefault(owner, {})[post_id] = items
+            dirty.add(owner)
+
+    for owner in dirty:
+        posts = linked_feed_activity['user_posts'].get(owner, {}).values()
+        replies = (
+            reply
+            for post_replies in linked_feed_activity['user_replies'].get(owner, {}).values()
+            for reply in post_replies
+        )
+        recent = {
+            'posts': heapq.nlargest(LINKED_FEED_CONTEXT_MAX_POSTS, posts, key=feed_context_sort_key),
+            'replies': heapq.nlargest(LINKED_FEED_CONTEXT_MAX_REPLIES, replies, key=feed_context_sort_key),
+        }
+        if recent['posts'] or recent['replies']:
+            linked_feed_activity['recent'][owner] = recent
+        else:
+            linked_feed_activity['recent'].pop(owner, None)
+
+    linked_feed_activity['version'] = changes['version']
+
 def build_linked_feed_context_for_user(discord_user_id: str) -> str:
     account = find_account_by_discord_user_id(discord_user_id)
     if not account:
@@ -689,26 +1624,13 @@ def build_linked_feed_context_for_user(discord_user_id: str) -> str:
     username = str(account.get('username', '')).strip()
     if not username:
         return ''
-    username_key = username.lower()
-
-    posts = [
-        post for post in load_feed_posts().values()
-        if str(post.get('username', '')).strip().lower() == username_key
-    ]
-    posts.sort(key=feed_context_sort_key, reverse=True)
-
-    replies = []
-    for post_id, post_replies in load_feed_replies().items():
-        for reply in post_replies:
-            if str(reply.get('username', '')).strip().lower() != username_key:
-                continue
-            reply_copy = dict(reply)
-            reply_copy['post_id'] = str(post_id)
-            replies.append(reply_copy)
-    replies.sort(key=feed_context_sort_key, reverse=True)
 
-    if not posts and not replies:
+    refresh_linked_feed_activity()
+    recent = linked_feed_activity['recent'].get(username.lower())
+    if not recent:
         return ''
+    posts = recent['posts']
+    replies = recent['replies']
 
     lines = [
         (
@@ -722,25 +1644,88 @@ def build_linked_feed_context_for_user(discord_user_id: str) -> str:
 
     if posts:
         lines.append(f"Recent /feed posts by @{username}:")
-        for post in posts[:LINKED_FEED_CONTEXT_MAX_POSTS]:
-            snippet = truncate_context_snippet(post.get('body', ''))
-            if not snippet:
+        for post in posts:
+            if not post['snippet']:
                 continue
-            lines.append(f"- {post.get('date', 'unknown date')} /feed/posts/{post.get('id', '')}: {snippet}")
+            lines.append(f"- {post['date']} /feed/posts/{post['id']}: {post['snippet']}")
 
     if replies:
         lines.append(f"Recent /feed replies by @{username}:")
-        for reply in replies[:LINKED_FEED_CONTEXT_MAX_REPLIES]:
-            snippet = truncate_context_snippet(reply.get('body', ''))
-            if not snippet:
+        for reply in replies:
+            if not reply['snippet']:
                 continue
-            lines.append(f"- {reply.get('date', 'unknown date')} on /feed/posts/{reply.get('post_id', '')}: {snippet}")
+            lines.append(f"- {reply['date']} on /feed/posts/{reply['post_id']}: {reply['snippet']}")
 
     context = '\n'.join(lines).strip()
     if len(context) <= LINKED_FEED_CONTEXT_MAX_CHARS:
         return context
     return context[:LINKED_FEED_CONTEXT_MAX_CHARS].rsplit('\n', 1)[0].strip()
 
+# Delivered feed notifications are stored as 64-bit key hashes grouped by post id, so a
+# delivery is one small INSERT and deleting a post drops its whole group.
+notify_state_store = {
+    'connection': None,
+    'delivered': {},
+}
+
+NOTIFY_STATE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS notify_delivered (
+        post_id TEXT NOT NULL,
+        key_hash INTEGER NOT NULL,
+        PRIMARY KEY (post_id, key_hash)
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE IF NOT EXISTS notify_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS notify_digest_pending (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_user_id TEXT NOT NULL,
+        queued_at REAL NOT NULL,
+        event TEXT NOT NULL
+    )
+    """,
+)
+
+def notify_key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def get_notify_state_db() -> sqlite3.Connection:
+    connection = notify_state_store['connection']
+    if connection is not None:
+        return connection
+
+    connection = sqlite3.connect(str(feed_notify_db_path), isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    for statement in NOTIFY_STATE_SCHEMA:
+        connection.execute(statement)
+    notify_state_store['connection'] = connection
+    try:
+        migrate_notify_state_json(connection)
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to migrate {feed_notify_state_path.name} into SQLite: {e}")
+    return connection
+
+def close_notify_state_db():
+    connection = notify_state_store['connection']
+    if connection is None:
+        return
+    notify_state_store['connection'] = None
+    notify_state_store['delivered'] = {}
+    try:
+        connection.close()
+    except Exception as e:
+        logger.warning(f"Failed to close notify state database: {e}")
+
+def get_notify_meta(key: str, default: str = '') -> str:
+    row = get_notify_state_db().execute('SELECT value FROM notify_meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else default
+
+def set_notify_meta(key: str, value: str):
+    get_notify_state_db().execute('INSERT OR REPLACE INTO notify_meta (key, value) VALUES (?, ?)', (key, value))
+
 def load_notify_state():
     if not feed_notify_state_path.exists():
         return None
@@ -754,54 +1739,401 @@ def load_notify_state():
         logger.warning(f"Failed to load notify state: {e}")
         return None
 
-def load_dm_history():
-    if not dm_history_path.exists():
-        return {'threads': {}}
-    try:
-        with open(dm_history_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            return {'threads': {}}
-        threads = data.get('threads', {})
-        if not isinstance(threads, dict):
-            threads = {}
-        return {'threads': threads}
-    except Exception as e:
-        logger.warning(f"Failed to load DM history: {e}")
-        return {'threads': {}}
+def legacy_notify_key_to_grouped(key: str, kind: str):
+    """Map a legacy toast-feed-notify-state.json key to (post_id, namespaced key)"""
+    if kind == 'replies':
+        post_id, _, reply_id = key.rpartition(':')
+        return (post_id, f"reply:{post_id}:{reply_id}") if post_id and reply_id else None
+    if key.startswith('post:'):
+        post_id, _, target = key[len('post:'):].rpartition(':')
+        return (post_id, f"mention:post:{post_id}:{target}") if post_id and target else None
+    if key.startswith('reply:'):
+        parts = key[len('reply:'):].rsplit(':', 2)
+        if len(parts) != 3 or not all(parts):
+            return None
+        post_id, reply_id, target = parts
+        return post_id, f"mention:reply:{post_id}:{reply_id}:{target}"
+    # pre-namespace mention keys were "{post_id}:{target}"
+    post_id, _, target = key.rpartition(':')
+    return (post_id, f"mention:post:{post_id}:{target}") if post_id and target else None
+
+def migrate_notify_state_json(connection: sqlite3.Connection):
+    """One-time import of the legacy sorted-list state file"""
+    if connection.execute("SELECT 1 FROM notify_meta WHERE key = 'initialized'").fetchone():
+        return
 
-def save_dm_history(history: dict):
-    try:
-        with open(dm_history_path, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save DM history: {e}")
+    state = load_notify_state()
+    if state is None:
+        return
 
-def get_dm_thread(discord_user_id: str) -> dict:
-    history = load_dm_history()
-    thread = history.get('threads', {}).get(str(discord_user_id), {})
-    return thread if isinstance(thread, dict) else {}
+    rows = []
+    for kind in ('mentions', 'replies'):
+        keys = state.get(kind, [])
+        if not isinstance(keys, list):
+            continue
+        for key in keys:
+            grouped = legacy_notify_key_to_grouped(str(key), kind)
+            if grouped:
+                rows.append((grouped[0], notify_key_hash(grouped[1])))
 
-def is_ai_muted_for_user(discord_user_id: str) -> bool:
-    return bool(get_dm_thread(str(discord_user_id)).get('ai_muted', False))
+    if not rows:
+        # an empty (e.g. sanitized dev) state file is treated as a cold start
+        return
 
-def set_ai_muted_for_user(discord_user_id: str, muted: bool) -> bool:
-    if not re.fullmatch(r'\d{17,20}', str(discord_user_id)):
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('INSERT OR IGNORE INTO notify_delivered (post_id, key_hash) VALUES (?, ?)', rows)
+        connection.execute(
+            "INSERT OR REPLACE INTO notify_meta (key, value) VALUES ('reply_mentions_initialized', ?)",
+            ('1' if state.get('reply_mentions_initialized') else '0',),
+        )
+        connection.execute("INSERT OR REPLACE INTO notify_meta (key, value) VALUES ('initialized', '1')")
+    logger.info(f"Migrated {len(rows)} feed notification key(s) from {feed_notify_state_path.name} to SQLite")
+
+def notify_state_initialized() -> bool:
+    return get_notify_meta('initialized') == '1'
+
+def get_delivered_notifications(post_id: str) -> set:
+    delivered = notify_state_store['delivered'].get(post_id)
+    if delivered is None:
+        delivered = {
+            row[0]
+            for row in get_notify_state_db().execute(
+                'SELECT key_hash FROM notify_delivered WHERE post_id = ?',
+                (post_id,),
+            )
+        }
+        notify_state_store['delivered'][post_id] = delivered
+    return delivered
+
+def is_notification_delivered(post_id: str, key: str) -> bool:
+    return notify_key_hash(key) in get_delivered_notifications(post_id)
+
+def mark_notifications_delivered(items) -> int:
+    """Record (post_id, key) pairs as delivered in a single transaction"""
+    rows = [(str(post_id), notify_key_hash(key)) for post_id, key in items]
+    if not rows:
+        return 0
+    connection = get_notify_state_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('INSERT OR IGNORE INTO notify_delivered (post_id, key_hash) VALUES (?, ?)', rows)
+    for post_id, key_hash in rows:
+        delivered = notify_state_store['delivered'].get(post_id)
+        if delivered is not None:
+            delivered.add(key_hash)
+    return len(rows)
+
+def prune_notify_state(post_ids) -> int:
+    """Forget delivered notifications for posts that no longer exist"""
+    post_ids = [str(post_id) for post_id in post_ids or () if str(post_id)]
+    if not post_ids:
+        return 0
+    connection = get_notify_state_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('DELETE FROM notify_delivered WHERE post_id = ?', [(post_id,) for post_id in post_ids])
+    for post_id in post_ids:
+        notify_state_store['delivered'].pop(post_id, None)
+    return len(post_ids)
+
+def save_pending_notification(discord_user_id: str, queued_at: float, event: dict) -> int:
+    cursor = get_notify_state_db().execute(
+        'INSERT INTO notify_digest_pending (discord_user_id, queued_at, event) VALUES (?, ?, ?)',
+        (discord_user_id, queued_at, json.dumps(event, ensure_ascii=False)),
+    )
+    return cursor.lastrowid
+
+def delete_pending_notifications(row_ids):
+    rows = [(row_id,) for row_id in row_ids]
+    if not rows:
+        return
+    connection = get_notify_state_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('DELETE FROM notify_digest_pending WHERE id = ?', rows)
+
+def load_pending_notifications() -> list:
+    """Undelivered digest events left over from before a restart, oldest first"""
+    pending = []
+    for row_id, discord_user_id, queued_at, event_json in get_notify_state_db().execute(
+        'SELECT id, discord_user_id, queued_at, event FROM notify_digest_pending ORDER BY id'
+    ):
+        try:
+            event = json.loads(event_json)
+        except json.JSONDecodeError:
+            event = None
+        pending.append((row_id, discord_user_id, queued_at, event if isinstance(event, dict) else None))
+    return pending
+
+def find_orphaned_notify_posts(post_ids) -> list:
+    return [
+        row[0]
+        for row in get_notify_state_db().execute('SELECT DISTINCT post_id FROM notify_delivered')
+        if row[0] not in post_ids
+    ]
+
+DM_HISTORY_MAX_MESSAGES = 250
+DM_HISTORY_EXPORT_DELAY_SECONDS = 2.0
+
+# DM threads live in SQLite (WAL mode); toast-dm-history.json is now a debounced export
+# kept only for the PHP inbox at /others/toast-discord-bot/messages.
+dm_history_store = {
+    'connection': None,
+    'export_handle': None,
+    'export_dirty': False,
+}
+
+DM_HISTORY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS dm_threads (
+        discord_user_id TEXT PRIMARY KEY,
+        username TEXT NOT NULL DEFAULT '',
+        global_name TEXT NOT NULL DEFAULT '',
+        display_name TEXT NOT NULL DEFAULT '',
+        avatar_url TEXT NOT NULL DEFAULT '',
+        ai_muted INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL DEFAULT '',
+        memory_cleared_seq INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dm_messages (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_user_id TEXT NOT NULL,
+        message_id TEXT NOT NULL DEFAULT '',
+        direction TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS dm_messages_user_seq ON dm_messages (discord_user_id, seq)",
+    "CREATE TABLE IF NOT EXISTS dm_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+def get_dm_history_db() -> sqlite3.Connection:
+    connection = dm_history_store['connection']
+    if connection is not None:
+        return connection
+
+    connection = sqlite3.connect(str(dm_history_db_path), isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    for statement in DM_HISTORY_SCHEMA:
+        connection.execute(statement)
+    dm_history_store['connection'] = connection
+    try:
+        migrate_dm_history_json(connection)
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to migrate {dm_history_path.name} into SQLite: {e}")
+    return connection
+
+def close_dm_history_db():
+    connection = dm_history_store['connection']
+    if connection is None:
+        return
+    dm_history_store['connection'] = None
+    try:
+        connection.close()
+    except Exception as e:
+        logger.warning(f"Failed to close DM history database: {e}")
+
+def read_dm_history_json() -> dict:
+    if not dm_history_path.exists():
+        return {'threads': {}}
+    try:
+        with open(dm_history_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            return {'threads': {}}
+        threads = data.get('threads', {})
+        if not isinstance(threads, dict):
+            threads = {}
+        return {'threads': threads}
+    except Exception as e:
+        logger.warning(f"Failed to load DM history: {e}")
+        return {'threads': {}}
+
+def migrate_dm_history_json(connection: sqlite3.Connection):
+    """One-time import of the legacy toast-dm-history.json into the SQLite store"""
+    if connection.execute("SELECT 1 FROM dm_meta WHERE key = 'json_migrated'").fetchone():
+        return
+
+    threads = read_dm_history_json().get('threads', {})
+    imported_messages = 0
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        for discord_user_id, thread in threads.items():
+            if not isinstance(thread, dict):
+                continue
+            discord_user_id = str(thread.get('discord_user_id') or discord_user_id)
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO dm_threads
+                    (discord_user_id, username, global_name, display_name, avatar_url, ai_muted, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    discord_user_id,
+                    str(thread.get('username', '') or ''),
+                    str(thread.get('global_name', '') or ''),
+                    str(thread.get('display_name', '') or ''),
+                    str(thread.get('avatar_url', '') or ''),
+                    1 if thread.get('ai_muted') else 0,
+                    str(thread.get('updated_at', '') or ''),
+                ),
+            )
+            messages = thread.get('messages', [])
+            if not isinstance(messages, list):
+                continue
+            memory_cleared_seq = 0
+            for entry in messages[-DM_HISTORY_MAX_MESSAGES:]:
+                if not isinstance(entry, dict):
+                    continue
+                direction = str(entry.get('direction', ''))
+                content = str(entry.get('content', ''))
+                cursor = connection.execute(
+                    """
+                    INSERT INTO dm_messages (discord_user_id, message_id, direction, content, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        discord_user_id,
+                        str(entry.get('id', '') or ''),
+                        direction,
+                        content,
+                        str(entry.get('timestamp', '') or ''),
+                    ),
+                )
+                imported_messages += 1
+                if direction == 'inbound' and is_memory_clear_message(content):
+                    memory_cleared_seq = cursor.lastrowid
+            if memory_cleared_seq:
+                connection.execute(
+                    'UPDATE dm_threads SET memory_cleared_seq = ? WHERE discord_user_id = ?',
+                    (memory_cleared_seq, discord_user_id),
+                )
+        connection.execute("INSERT OR REPLACE INTO dm_meta (key, value) VALUES ('json_migrated', '1')")
+
+    if threads:
+        logger.info(f"Migrated {len(threads)} DM thread(s) and {imported_messages} message(s) from {dm_history_path.name} to SQLite")
+
+def dm_thread_row_to_dict(row) -> dict:
+    return {
+        'discord_user_id': row['discord_user_id'],
+        'username': row['username'],
+        'global_name': row['global_name'],
+        'display_name': row['display_name'],
+        'avatar_url': row['avatar_url'],
+        'ai_muted': bool(row['ai_muted']),
+        'updated_at': row['updated_at'],
+    }
+
+def dm_message_row_to_dict(row) -> dict:
+    return {
+        'id': row['message_id'],
+        'direction': row['direction'],
+        'content': row['content'],
+        'timestamp': row['timestamp'],
+    }
+
+def load_dm_history():
+    """Build the legacy {'threads': {...}} document from the SQLite store"""
+    connection = get_dm_history_db()
+    threads = {}
+    for row in connection.execute('SELECT * FROM dm_threads'):
+        thread = dm_thread_row_to_dict(row)
+        thread['messages'] = []
+        threads[row['discord_user_id']] = thread
+    for row in connection.execute('SELECT * FROM dm_messages ORDER BY discord_user_id, seq'):
+        thread = threads.get(row['discord_user_id'])
+        if thread is not None:
+            thread['messages'].append(dm_message_row_to_dict(row))
+    return {'threads': threads}
+
+def export_dm_history_json():
+    """Atomically rewrite toast-dm-history.json from SQLite for the PHP inbox"""
+    dm_history_store['export_handle'] = None
+    if not dm_history_store['export_dirty']:
+        return
+    dm_history_store['export_dirty'] = False
+    temp_path = dm_history_path.with_name(dm_history_path.name + '.tmp')
+    try:
+        history = load_dm_history()
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+        os.replace(temp_path, dm_history_path)
+    except Exception as e:
+        logger.error(f"Failed to export DM history: {e}")
+
+def schedule_dm_history_export():
+    dm_history_store['export_dirty'] = True
+    if dm_history_store['export_handle'] is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        export_dm_history_json()
+        return
+    dm_history_store['export_handle'] = loop.call_later(DM_HISTORY_EXPORT_DELAY_SECONDS, export_dm_history_json)
+
+def flush_dm_history_export():
+    handle = dm_history_store['export_handle']
+    if handle is not None:
+        handle.cancel()
+    export_dm_history_json()
+
+def get_dm_thread(discord_user_id: str) -> dict:
+    try:
+        connection = get_dm_history_db()
+        row = connection.execute(
+            'SELECT * FROM dm_threads WHERE discord_user_id = ?',
+            (str(discord_user_id),),
+        ).fetchone()
+        if row is None:
+            return {}
+        thread = dm_thread_row_to_dict(row)
+        thread['messages'] = [
+            dm_message_row_to_dict(message_row)
+            for message_row in connection.execute(
+                'SELECT * FROM dm_messages WHERE discord_user_id = ? ORDER BY seq',
+                (str(discord_user_id),),
+            )
+        ]
+        return thread
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to load DM thread: {e}")
+        return {}
+
+def is_ai_muted_for_user(discord_user_id: str) -> bool:
+    try:
+        row = get_dm_history_db().execute(
+            'SELECT ai_muted FROM dm_threads WHERE discord_user_id = ?',
+            (str(discord_user_id),),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to load AI mute state: {e}")
         return False
+    return bool(row and row['ai_muted'])
 
-    history = load_dm_history()
-    threads = history.setdefault('threads', {})
-    thread = threads.get(str(discord_user_id))
-    if not isinstance(thread, dict):
-        thread = {
-            'discord_user_id': str(discord_user_id),
-            'messages': [],
-        }
+def set_ai_muted_for_user(discord_user_id: str, muted: bool) -> bool:
+    if not re.fullmatch(r'\d{17,20}', str(discord_user_id)):
+        return False
 
-    thread['discord_user_id'] = str(discord_user_id)
-    thread['ai_muted'] = bool(muted)
-    threads[str(discord_user_id)] = thread
-    save_dm_history(history)
+    try:
+        with get_dm_history_db() as connection:
+            connection.execute(
+                """
+                INSERT INTO dm_threads (discord_user_id, ai_muted) VALUES (?, ?)
+                ON CONFLICT (discord_user_id) DO UPDATE SET ai_muted = excluded.ai_muted
+                """,
+                (str(discord_user_id), 1 if muted else 0),
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save AI mute state: {e}")
+        return False
+    schedule_dm_history_export()
     return True
 
 def build_dm_content(content: str, attachments=None) -> str:
@@ -839,19 +2171,8 @@ def build_user_snapshot(user) -> dict:
     }
 
 def append_dm_history_entry(user, direction: str, content: str, timestamp=None, message_id=''):
-    history = load_dm_history()
-    threads = history.setdefault('threads', {})
-
     user_snapshot = build_user_snapshot(user)
     discord_user_id = user_snapshot['discord_user_id']
-    thread = threads.get(discord_user_id)
-    if not isinstance(thread, dict):
-        thread = {
-            'discord_user_id': discord_user_id,
-            'messages': [],
-        }
-
-    thread.update(user_snapshot)
 
     if timestamp is None:
         timestamp_value = discord.utils.utcnow()
@@ -863,24 +2184,58 @@ def append_dm_history_entry(user, direction: str, content: str, timestamp=None,
     else:
         timestamp_string = str(timestamp_value)
 
-    messages = thread.get('messages', [])
-    if not isinstance(messages, list):
-        messages = []
-
-    messages.append({
-        'id': str(message_id or ''),
-        'direction': direction,
-        'content': content,
-        'timestamp': timestamp_string,
-    })
-
-    if len(messages) > 250:
-        messages = messages[-250:]
-
-    thread['messages'] = messages
-    thread['updated_at'] = timestamp_string
-    threads[discord_user_id] = thread
-    save_dm_history(history)
+    started = time.perf_counter()
+    try:
+        with get_dm_history_db() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                """
+                INSERT INTO dm_threads
+                    (discord_user_id, username, global_name, display_name, avatar_url, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (discord_user_id) DO UPDATE SET
+                    username = excluded.username,
+                    global_name = excluded.global_name,
+                    display_name = excluded.display_name,
+                    avatar_url = excluded.avatar_url,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    discord_user_id,
+                    user_snapshot['username'],
+                    user_snapshot['global_name'],
+                    user_snapshot['display_name'],
+                    user_snapshot['avatar_url'],
+                    timestamp_string,
+                ),
+            )
+            cursor = connection.execute(
+                """
+                INSERT INTO dm_messages (discord_user_id, message_id, direction, content, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (discord_user_id, str(message_id or ''), direction, content, timestamp_string),
+            )
+            if direction == 'inbound' and is_memory_clear_message(content):
+                connection.execute(
+                    'UPDATE dm_threads SET memory_cleared_seq = ? WHERE discord_user_id = ?',
+                    (cursor.lastrowid, discord_user_id),
+                )
+            connection.execute(
+                """
+                DELETE FROM dm_messages
+                WHERE discord_user_id = ? AND seq <= (
+                    SELECT seq FROM dm_messages WHERE discord_user_id = ?
+                    ORDER BY seq DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (discord_user_id, discord_user_id, DM_HISTORY_MAX_MESSAGES),
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save DM history: {e}")
+        return
+    observe_metric('toast_dm_history_seconds', time.perf_counter() - started, (('operation', 'append'),))
+    schedule_dm_history_export()
 
 def is_memory_clear_message(content: str) -> bool:
     return (content or '').strip() == DM_MEMORY_CLEAR_PHRASE
@@ -894,28 +2249,29 @@ def get_recent_dm_messages(discord_user_id: str, limit: int, exclude_message_ids
         for message_id in (exclude_message_ids or [])
         if str(message_id)
     }
-    history = load_dm_history()
-    thread = history.get('threads', {}).get(str(discord_user_id), {})
-    messages = thread.get('messages', [])
-    if not isinstance(messages, list):
+    # everything at or before the newest CLEARMEMORY boundary is skipped via the stored watermark
+    started = time.perf_counter()
+    try:
+        rows = get_dm_history_db().execute(
+            """
+            SELECT message_id, direction, content FROM dm_messages
+            WHERE discord_user_id = ? AND seq > COALESCE(
+                (SELECT memory_cleared_seq FROM dm_threads WHERE discord_user_id = ?), 0
+            )
+            ORDER BY seq DESC LIMIT ?
+            """,
+            (str(discord_user_id), str(discord_user_id), limit),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to load DM history: {e}")
         return []
-
-    newest_clear_index = None
-    for index, entry in enumerate(messages):
-        if not isinstance(entry, dict):
-            continue
-        if entry.get('direction') == 'inbound' and is_memory_clear_message(str(entry.get('content', ''))):
-            newest_clear_index = index
-    if newest_clear_index is not None:
-        messages = messages[newest_clear_index + 1:]
+    observe_metric('toast_dm_history_seconds', time.perf_counter() - started, (('operation', 'recent'),))
 
     recent = []
-    for entry in messages[-limit:]:
-        if not isinstance(entry, dict):
-            continue
-        if str(entry.get('id', '')) in excluded_ids:
+    for row in reversed(rows):
+        if str(row['message_id']) in excluded_ids:
             continue
-        direction = entry.get('direction')
+        direction = row['direction']
         if direction == 'inbound':
             role = 'user'
         elif direction == 'outbound':
@@ -923,7 +2279,7 @@ def get_recent_dm_messages(discord_user_id: str, limit: int, exclude_message_ids
         else:
             continue
 
-        content = str(entry.get('content', '')).strip()
+        content = str(row['content']).strip()
         if not content:
             continue
         recent.append({'role': role, 'content': content})
@@ -964,9 +2320,12 @@ def get_vision_attachments(attachments, max_images: int) -> list:
         url = str(getattr(attachment, 'url', '') or '').strip()
         content_type = str(getattr(attachment, 'content_type', '') or '').strip()
         is_gif = filename.lower().endswith('.gif') or content_type.lower() == 'image/gif'
+        key = get_vision_attachment_key(attachment)
         vision_attachments.append({
             'filename': filename or 'image',
-            'url': url,
+            'url': get_cached_vision_data_url(key) or url,
+            'source_url': url,
+            'key': key,
             'content_type': content_type,
             'is_gif': is_gif,
         })
@@ -974,6 +2333,183 @@ def get_vision_attachments(attachments, max_images: int) -> list:
             break
     return vision_attachments
 
+# Vision images are fetched by the bot (concurrently, through one pooled session), downscaled,
+# and sent to Groq as base64 data URLs, so Groq never has to fetch a 20 MB original or an
+# expired CDN link. Encoded images are cached by content hash; attachments map to their hash.
+vision_cache = {
+    'attachments': {},
+    'images': {},
+    'bytes': 0,
+    'stats': {
+        'fetches': 0,
+        'fetch_failures': 0,
+        'bytes_fetched': 0,
+        'hash_hits': 0,
+        'inlined': 0,
+        'url_fallbacks': 0,
+        'encode_ms_total': 0.0,
+        'encodes': 0,
+    },
+}
+vision_fetch_tasks = {}
+vision_http_state = {'session': None}
+
+def get_vision_attachment_key(attachment) -> str:
+    attachment_id = getattr(attachment, 'id', None)
+    if attachment_id:
+        return str(attachment_id)
+    # Discord CDN links carry expiring signature params; the path identifies the file
+    url = str(getattr(attachment, 'url', '') or '').strip()
+    return urlsplit(url)._replace(query='', fragment='').geturl()
+
+def get_cached_vision_data_url(key: str) -> str:
+    content_hash = vision_cache['attachments'].get(key)
+    if content_hash is None:
+        return ''
+    return vision_cache['images'].get(content_hash) or ''
+
+def store_vision_image(content_hash: str, data_url: str):
+    images = vision_cache['images']
+    images[content_hash] = data_url
+    vision_cache['bytes'] += len(data_url)
+    while vision_cache['bytes'] > VISION_CACHE_MAX_BYTES and len(images) > 1:
+        oldest_hash = next(iter(images))
+        vision_cache['bytes'] -= len(images.pop(oldest_hash))
+
+def remember_vision_attachment(key: str, content_hash: str):
+    attachments = vision_cache['attachments']
+    attachments.pop(key, None)
+    attachments[key] = content_hash
+    while len(attachments) > VISION_CACHE_MAX_ATTACHMENTS:
+        attachments.pop(next(iter(attachments)))
+    images = vision_cache['images']
+    if content_hash in images:
+        # keep recently used images at the young end of the eviction order
+        images[content_hash] = images.pop(content_hash)
+
+def encode_vision_image(data: bytes, content_type: str) -> str:
+    """Downscale an image (a GIF's middle frame) to the vision model's useful size as a data URL.
+
+    Returns '' when the image should be sent by URL instead, including images too large to
+    decode cheaply (draft() only shrinks JPEGs, so a huge PNG or GIF would decode at full size).
+    """
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if getattr(image, 'is_animated', False):
+                    image.seek(image.n_frames // 2)
+                image.draft('RGB', (VISION_IMAGE_MAX_EDGE, VISION_IMAGE_MAX_EDGE))
+                width, height = image.size
+                if width * height > VISION_IMAGE_MAX_PIXELS:
+                    logger.info(f"Vision image is {width}x{height}; sending it by URL instead of decoding it")
+                    return ''
+                frame = image.convert('RGBA')
+            frame.thumbnail((VISION_IMAGE_MAX_EDGE, VISION_IMAGE_MAX_EDGE))
+            flattened = Image.new('RGB', frame.size, (255, 255, 255))
+            flattened.paste(frame, mask=frame.getchannel('A'))
+            buffer = io.BytesIO()
+            flattened.save(buffer, format='JPEG', quality=VISION_IMAGE_JPEG_QUALITY, optimize=True)
+        except Exception as e:
+            logger.warning(f"Failed to downscale vision image: {e}")
+            return ''
+        data = buffer.getvalue()
+        content_type = 'image/jpeg'
+    elif content_type == 'image/gif':
+        return ''
+
+    encoded = base64.b64encode(data).decode('ascii')
+    if len(encoded) > VISION_DATA_URL_MAX_BYTES:
+        return ''
+    return f"data:{content_type};base64,{encoded}"
+
+def get_vision_http_session() -> ClientSession:
+    session = vision_http_state['session']
+    if session is None or session.closed:
+        session = vision_http_state['session'] = ClientSession(connector=TCPConnector(limit=8, ttl_dns_cache=300))
+    return session
+
+async def close_vision_http_client():
+    for task in list(vision_fetch_tasks.values()):
+        task.cancel()
+    session = vision_http_state['session']
+    vision_http_state['session'] = None
+    if session is not None and not session.closed:
+        await session.close()
+
+async def fetch_vision_attachment(key: str, url: str):
+    stats = vision_cache['stats']
+    try:
+        async with get_vision_http_session().get(url, timeout=ClientTimeout(total=VISION_FETCH_TIMEOUT_SECONDS)) as response:
+            if response.status >= 400:
+                raise ValueError(f"status={response.status}")
+            if (response.content_length or 0) > VISION_IMAGE_SIZE_LIMIT_BYTES:
+                raise ValueError(f"size={response.content_length}")
+            content_type = response.content_type
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(65536):
+                data.extend(chunk)
+                if len(data) > VISION_IMAGE_SIZE_LIMIT_BYTES:
+                    raise ValueError(f"size>{VISION_IMAGE_SIZE_LIMIT_BYTES}")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        stats['fetch_failures'] += 1
+        logger.warning(f"Failed to prefetch vision attachment {key}: {e.__class__.__name__}: {e}")
+        return
+
+    stats['fetches'] += 1
+    stats['bytes_fetched'] += len(data)
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash in vision_cache['images']:
+        stats['hash_hits'] += 1
+    else:
+        started = time.perf_counter()
+        data_url = await asyncio.to_thread(encode_vision_image, bytes(data), content_type)
+        stats['encodes'] += 1
+        stats['encode_ms_total'] += (time.perf_counter() - started) * 1000
+        store_vision_image(content_hash, data_url)
+    remember_vision_attachment(key, content_hash)
+
+def start_vision_fetches(attachments) -> list:
+    """Start (or join) background fetches for a DM's vision attachments that aren't cached yet"""
+    tasks = []
+    for item in get_vision_attachments(attachments, get_groq_config()['max_vision_images']):
+        key = item['key']
+        if vision_cache['attachments'].get(key) in vision_cache['images']:
+            continue
+        task = vision_fetch_tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch_vision_attachment(key, item['source_url']))
+            vision_fetch_tasks[key] = task
+            task.add_done_callback(lambda _, key=key: vision_fetch_tasks.pop(key, None))
+        tasks.append(task)
+    return tasks
+
+async def prepare_vision_attachments(attachments):
+    """Wait briefly for the reply's images; anything still missing is sent by CDN URL"""
+    tasks = start_vision_fetches(attachments)
+    if tasks:
+        # asyncio.wait doesn't cancel the fetches, so a cancelled reply leaves them for the next one
+        await asyncio.wait(tasks, timeout=VISION_PREFETCH_WAIT_SECONDS)
+    for item in get_vision_attachments(attachments, get_groq_config()['max_vision_images']):
+        if item['url'] == item['source_url']:
+            vision_cache['stats']['url_fallbacks'] += 1
+        else:
+            vision_cache['stats']['inlined'] += 1
+
+def get_vision_cache_stats() -> dict:
+    stats = dict(vision_cache['stats'])
+    encodes = stats.pop('encodes')
+    stats['encode_ms_avg'] = round(stats.pop('encode_ms_total') / encodes, 2) if encodes else 0.0
+    return {
+        'pillow': Image is not None,
+        'images': len(vision_cache['images']),
+        'attachments': len(vision_cache['attachments']),
+        'bytes': vision_cache['bytes'],
+        'in_flight': len(vision_fetch_tasks),
+        **stats,
+    }
+
 def flatten_batch_attachments(batch: list) -> list:
     attachments = []
     for entry in batch or []:
@@ -1015,32 +2551,127 @@ def build_current_user_content(current_message: str, vision_attachments: list):
         })
     return content_blocks
 
+def estimate_text_tokens(text: str) -> int:
+    # ~4 characters per token for English chat text; close enough to budget without a tokenizer
+    return math.ceil(len(text or '') / PROMPT_TOKEN_CHARS)
+
+def estimate_message_tokens(message: dict) -> int:
+    content = message.get('content', '')
+    if isinstance(content, list):
+        tokens = 0
+        for block in content:
+            if block.get('type') == 'image_url':
+                tokens += PROMPT_IMAGE_TOKEN_ESTIMATE
+            else:
+                tokens += estimate_text_tokens(block.get('text', ''))
+    else:
+        tokens = estimate_text_tokens(str(content))
+    return tokens + PROMPT_MESSAGE_TOKEN_OVERHEAD
+
+def trim_text_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = int(max_tokens * PROMPT_TOKEN_CHARS)
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind('\n', 0, max_chars - 3)
+    if cut < max_chars // 2:
+        cut = text.rfind(' ', 0, max_chars - 3)
+    if cut <= 0:
+        cut = max_chars - 3
+    return text[:cut].rstrip() + '...'
+
+def fit_context_block(text: str, available_tokens: int) -> tuple:
+    """Return (text, tokens) for a system context block trimmed to fit, or ('', 0) if too little is left"""
+    if not text:
+        return '', 0
+    needed = estimate_message_tokens({'content': text})
+    if needed <= available_tokens:
+        return text, needed
+    content_tokens = available_tokens - PROMPT_MESSAGE_TOKEN_OVERHEAD
+    if content_tokens < PROMPT_MIN_CONTEXT_TOKENS:
+        return '', 0
+    trimmed = trim_text_to_tokens(text, content_tokens)
+    return trimmed, estimate_message_tokens({'content': trimmed})
+
+def fit_newest_history(history: list, available_tokens: int) -> tuple:
+    """Keep the newest contiguous messages that fit; returns (messages in order, tokens)"""
+    kept = []
+    used = 0
+    for message in reversed(history):
+        tokens = estimate_message_tokens(message)
+        if used + tokens > available_tokens:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept, used
+
 def build_groq_messages(user, history_limit: int, current_message: str = '', attachments=None, current_message_ids=None) -> list:
     groq_config = get_groq_config()
+    budget = groq_config['prompt_token_budget']
     vision_attachments = get_vision_attachments(attachments, groq_config['max_vision_images'])
-    messages = [
-        {'role': 'system', 'content': load_personality_prompt()},
-        {'role': 'system', 'content': build_bot_purpose_context()},
-    ]
-    wiki_context = build_wiki_context_for_message(current_message)
-    if wiki_context:
-        messages.append({'role': 'system', 'content': wiki_context})
-    linked_feed_context = build_linked_feed_context_for_user(str(user.id))
-    if linked_feed_context:
-        messages.append({'role': 'system', 'content': linked_feed_context})
+    system_messages = list(get_static_system_messages())
+    vision_messages = []
     if vision_attachments:
-        messages.append({
+        vision_messages.append({
             'role': 'system',
             'content': (
                 "The user's latest DM includes visual attachments. Answer based on what is visible. "
                 "For memes or GIFs, explain the joke casually if it is obvious. If the image is unclear, say so instead of guessing."
             ),
         })
-    messages.extend(get_recent_dm_messages(str(user.id), history_limit, current_message_ids))
-    messages.append({
+    current = {
         'role': 'user',
         'content': build_current_user_content(current_message, vision_attachments),
-    })
+    }
+
+    # Personality, duty summary and the current message always go in. Whatever budget is left
+    # is handed out in priority order: recent history > wiki > linked feed > older history.
+    fixed_tokens = sum(estimate_message_tokens(message) for message in (*system_messages, *vision_messages, current))
+    remaining = budget - fixed_tokens
+
+    history = get_recent_dm_messages(str(user.id), history_limit, current_message_ids)
+    split_at = max(0, len(history) - PROMPT_RECENT_HISTORY_MESSAGES)
+    older_history, recent_history = history[:split_at], history[split_at:]
+    kept_recent, recent_tokens = fit_newest_history(recent_history, max(0, remaining))
+    remaining -= recent_tokens
+
+    wiki_context = build_wiki_context_for_message(current_message)
+    wiki_text, wiki_tokens = fit_context_block(wiki_context, remaining)
+    remaining -= wiki_tokens
+
+    linked_feed_context = build_linked_feed_context_for_user(str(user.id))
+    feed_text, feed_tokens = fit_context_block(linked_feed_context, remaining)
+    remaining -= feed_tokens
+
+    kept_older, older_tokens = [], 0
+    if len(kept_recent) == len(recent_history):
+        kept_older, older_tokens = fit_newest_history(older_history, max(0, remaining))
+    remaining -= older_tokens
+
+    def describe_block(text: str, original: str, tokens: int) -> str:
+        if not original:
+            return '-'
+        if not text:
+            return 'dropped'
+        return f"{tokens}" + (' (trimmed)' if text != original else '')
+
+    logger.info(
+        f"Groq prompt for {user.id}: budget={budget} used={budget - remaining} fixed={fixed_tokens} "
+        f"recent_history={len(kept_recent)}/{len(recent_history)}:{recent_tokens} "
+        f"wiki={describe_block(wiki_text, wiki_context, wiki_tokens)} "
+        f"feed={describe_block(feed_text, linked_feed_context, feed_tokens)} "
+        f"older_history={len(kept_older)}/{len(older_history)}:{older_tokens}"
+    )
+
+    messages = system_messages
+    if wiki_text:
+        messages.append({'role': 'system', 'content': wiki_text})
+    if feed_text:
+        messages.append({'role': 'system', 'content': feed_text})
+    messages.extend(vision_messages)
+    messages.extend(kept_older)
+    messages.extend(kept_recent)
+    messages.append(current)
     return messages
 
 def split_oversized_message(text: str, max_length: int = AI_DM_MAX_CHUNK_LENGTH) -> list:
@@ -1157,19 +2788,680 @@ def split_natural_messages(text: str, max_length: int = AI_DM_MAX_CHUNK_LENGTH)
     append_sentence_chunk(chunks, current)
     return chunks
 
+STREAM_PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+STREAM_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+def create_stream_chunker(max_length: int = AI_DM_MAX_CHUNK_LENGTH) -> dict:
+    return {
+        'buffer': '',
+        'sentences': [],
+        'max_length': max_length,
+        'chunks_emitted': 0,
+    }
+
+def take_stream_sentence_groups(chunker: dict, final: bool) -> list:
+    """Group pending complete sentences into DM chunks.
+
+    The first chunk goes out after a single sentence so the user sees something quickly;
+    later chunks follow the same sentence-count preferences as split_natural_messages.
+    Without `final`, a trailing group that is still short of its limit is held back.
+    """
+    sentences = chunker['sentences']
+    max_length = chunker['max_length']
+    chunks = []
+    while sentences:
+        limit = 1 if chunker['chunks_emitted'] == 0 else preferred_sentence_count(sentences)
+        group = []
+        group_length = 0
+        for sentence in sentences:
+            projected_length = group_length + len(sentence) + (1 if group else 0)
+            if group and (len(group) >= limit or projected_length > max_length):
+                break
+            group.append(sentence)
+            group_length = projected_length
+        if not final and len(group) == len(sentences) and len(group) < limit:
+            break
+        del sentences[:len(group)]
+        group_chunks = []
+        append_sentence_chunk(group_chunks, group)
+        chunks.extend(group_chunks)
+        chunker['chunks_emitted'] += len(group_chunks)
+    return chunks
+
+def feed_stream_chunker(chunker: dict, text: str) -> list:
+    """Add streamed text and return any DM chunks that are now complete"""
+    chunker['buffer'] += text or ''
+    chunks = []
+
+    while True:
+        match = STREAM_PARAGRAPH_BOUNDARY.search(chunker['buffer'])
+        if not match:
+            break
+        paragraph = chunker['buffer'][:match.start()]
+        chunker['buffer'] = chunker['buffer'][match.end():]
+        chunker['sentences'].extend(split_paragraph_sentences(paragraph))
+        chunks.extend(take_stream_sentence_groups(chunker, final=True))
+
+    last_boundary = None
+    for match in STREAM_SENTENCE_BOUNDARY.finditer(chunker['buffer']):
+        last_boundary = match.end()
+    if last_boundary:
+        chunker['sentences'].extend(split_paragraph_sentences(chunker['buffer'][:last_boundary]))
+        chunker['buffer'] = chunker['buffer'][last_boundary:]
+        chunks.extend(take_stream_sentence_groups(chunker, final=False))
+
+    # a run-on without sentence punctuation still has to respect the Discord length cap
+    if len(chunker['buffer']) > chunker['max_length']:
+        chunks.extend(take_stream_sentence_groups(chunker, final=True))
+        parts = split_oversized_message(chunker['buffer'], chunker['max_length'])
+        chunks.extend(parts[:-1])
+        chunker['chunks_emitted'] += len(parts) - 1
+        chunker['buffer'] = parts[-1] if parts else ''
+
+    return chunks
+
+def finish_stream_chunker(chunker: dict) -> list:
+    chunker['sentences'].extend(split_paragraph_sentences(chunker['buffer']))
+    chunker['buffer'] = ''
+    return take_stream_sentence_groups(chunker, final=True)
+
 def typing_delay_seconds(text: str) -> float:
     length = len(text or '')
     return min(12.0, max(AI_DM_MIN_SEND_DELAY_SECONDS, length / 38))
 
-async def request_groq_dm_reply(user, current_message: str, attachments=None, current_message_ids=None) -> str:
+# One long-lived aiohttp session for all Groq traffic so replies reuse pooled keep-alive
+# connections instead of paying DNS + TCP + TLS setup on every DM.
+groq_http_state = {
+    'session': None,
+    'stats': {
+        'requests': 0,
+        'connections_created': 0,
+        'connections_reused': 0,
+        'handshake_ms_total': 0.0,
+        'handshake_ms_last': 0.0,
+        'dns_lookups': 0,
+        'dns_cache_hits': 0,
+        'warmup_ok': None,
+    },
+}
+
+def build_groq_trace_config() -> TraceConfig:
+    stats = groq_http_state['stats']
+    trace_config = TraceConfig()
+
+    async def on_request_start(session, context, params):
+        stats['requests'] += 1
+
+    async def on_connection_create_start(session, context, params):
+        context.connection_started = asyncio.get_running_loop().time()
+
+    async def on_connection_create_end(session, context, params):
+        stats['connections_created'] += 1
+        started = getattr(context, 'connection_started', None)
+        if started is not None:
+            elapsed_ms = (asyncio.get_running_loop().time() - started) * 1000
+            stats['handshake_ms_last'] = round(elapsed_ms, 2)
+            stats['handshake_ms_total'] = round(stats['handshake_ms_total'] + elapsed_ms, 2)
+
+    async def on_connection_reuseconn(session, context, params):
+        stats['connections_reused'] += 1
+
+    async def on_dns_resolvehost_end(session, context, params):
+        stats['dns_lookups'] += 1
+
+    async def on_dns_cache_hit(session, context, params):
+        stats['dns_cache_hits'] += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+    return trace_config
+
+def get_groq_http_session() -> ClientSession:
+    session = groq_http_state['session']
+    if session is not None and not session.closed:
+        return session
+
+    groq_config = get_groq_config()
+    dns_cache_seconds = groq_config['dns_cache_seconds']
+    connector = TCPConnector(
+        limit=groq_config['pool_connections'],
+        limit_per_host=groq_config['pool_connections_per_host'],
+        use_dns_cache=dns_cache_seconds > 0,
+        ttl_dns_cache=dns_cache_seconds or None,
+        keepalive_timeout=groq_config['keepalive_seconds'],
+    )
+    session = ClientSession(connector=connector, trace_configs=[build_groq_trace_config()])
+    groq_http_state['session'] = session
+    return session
+
+def get_groq_http_stats() -> dict:
+    stats = dict(groq_http_state['stats'])
+    created = stats['connections_created']
+    stats['handshake_ms_avg'] = round(stats['handshake_ms_total'] / created, 2) if created else 0.0
+    return stats
+
+async def warm_up_groq_connection(api_key: str):
+    """Open a pooled connection to Groq ahead of the first DM (GET /models costs no tokens)"""
+    try:
+        async with get_groq_http_session().get(
+            GROQ_MODELS_URL,
+            headers={'Authorization': f"Bearer {api_key}"},
+            timeout=ClientTimeout(total=10),
+        ) as response:
+            await response.read()
+            groq_http_state['stats']['warmup_ok'] = response.status < 400
+            if response.status >= 400:
+                logger.warning(f"Groq warm-up request failed: status={response.status}")
+    except Exception as e:
+        groq_http_state['stats']['warmup_ok'] = False
+        logger.warning(f"Groq warm-up request crashed: {e}")
+
+async def start_groq_http_client():
+    groq_config = get_groq_config()
+    get_groq_http_session()
+    if groq_config['api_key'] and groq_config['warmup_connection']:
+        asyncio.create_task(warm_up_groq_connection(groq_config['api_key']))
+
+async def close_groq_http_client():
+    session = groq_http_state['session']
+    groq_http_state['session'] = None
+    if session is not None and not session.closed:
+        await session.close()
+
+GROQ_RETRY_ATTEMPTS = 3
+GROQ_RETRY_BASE_SECONDS = 0.5
+GROQ_RETRY_MAX_SECONDS = 8.0
+GROQ_RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+GROQ_RETRY_MIN_ATTEMPT_SECONDS = 2.0
+GROQ_THROTTLE_MAX_WAIT_SECONDS = 10.0
+GROQ_BREAKER_FAILURE_THRESHOLD = 5
+GROQ_BREAKER_OPEN_SECONDS = 30.0
+GROQ_BREAKER_MAX_OPEN_SECONDS = 300.0
+GROQ_RESET_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+# Groq calls go through a small resilience layer: transient failures are retried with jittered
+# backoff, x-ratelimit-* headers throttle new requests before Groq has to 429 them, and after
+# repeated failures a circuit breaker sends the fallback reply right away instead of waiting.
+groq_resilience = {
+    'breaker': {
+        'state': 'closed',
+        'consecutive_failures': 0,
+        'open_until': 0.0,
+        'open_seconds': GROQ_BREAKER_OPEN_SECONDS,
+        'probe_in_flight': False,
+        'trips': 0,
+    },
+    'rate_limit': {
+        'limit_requests': None,
+        'limit_tokens': None,
+        'remaining_requests': None,
+        'remaining_tokens': None,
+        'requests_reset_at': 0.0,
+        'tokens_reset_at': 0.0,
+        'retry_at': 0.0,
+    },
+    'stats': {
+        'retries': 0,
+        'fast_failures': 0,
+        'throttled_waits': 0,
+        'deadline_exhausted': 0,
+    },
+}
+
+def parse_groq_reset_duration(value) -> float:
+    """Parse Groq reset values like '7.66s', '2m59.56s' or '120ms' into seconds"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    units = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+    parts = GROQ_RESET_DURATION_PATTERN.findall(text)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+def record_groq_rate_limit_headers(headers):
+    rate_limit = groq_resilience['rate_limit']
+    now = time.monotonic()
+    for key, header in (
+        ('limit_requests', 'x-ratelimit-limit-requests'),
+        ('limit_tokens', 'x-ratelimit-limit-tokens'),
+        ('remaining_requests', 'x-ratelimit-remaining-requests'),
+        ('remaining_tokens', 'x-ratelimit-remaining-tokens'),
+    ):
+        value = coerce_int(headers.get(header), None)
+        if value is not None:
+            rate_limit[key] = value
+    for key, header in (('requests_reset_at', 'x-ratelimit-reset-requests'), ('tokens_reset_at', 'x-ratelimit-reset-tokens')):
+        seconds = parse_groq_reset_duration(headers.get(header))
+        if seconds is not None:
+            rate_limit[key] = now + seconds
+    retry_after = parse_groq_reset_duration(headers.get('retry-after'))
+    if retry_after is not None:
+        rate_limit['retry_at'] = max(rate_limit['retry_at'], now + retry_after)
+
+def get_groq_throttle_delay(estimated_tokens: int) -> float:
+    rate_limit = groq_resilience['rate_limit']
+    now = time.monotonic()
+    delay = max(0.0, rate_limit['retry_at'] - now)
+    remaining_requests = rate_limit['remaining_requests']
+    if remaining_requests is not None and remaining_requests <= 0 and rate_limit['requests_reset_at'] > now:
+        delay = max(delay, rate_limit['requests_reset_at'] - now)
+    remaining_tokens = rate_limit['remaining_tokens']
+    if remaining_tokens is not None and remaining_tokens < estimated_tokens and rate_limit['tokens_reset_at'] > now:
+        delay = max(delay, rate_limit['tokens_reset_at'] - now)
+    return delay
+
+def reserve_groq_capacity(estimated_tokens: int):
+    # spend the last header snapshot locally so concurrent DMs don't all see the same headroom
+    rate_limit = groq_resilience['rate_limit']
+    now = time.monotonic()
+    if rate_limit['remaining_requests'] is not None:
+        if rate_limit['requests_reset_at'] <= now:
+            rate_limit['remaining_requests'] = None
+        else:
+            rate_limit['remaining_requests'] -= 1
+    if rate_limit['remaining_tokens'] is not None:
+        if rate_limit['tokens_reset_at'] <= now:
+            rate_limit['remaining_tokens'] = None
+        else:
+            rate_limit['remaining_tokens'] -= estimated_tokens
+
+def acquire_groq_breaker() -> str:
+    """Return 'allowed', 'probe' (half-open trial request) or 'open'"""
+    breaker = groq_resilience['breaker']
+    if breaker['state'] == 'closed':
+        return 'allowed'
+    if breaker['state'] == 'open':
+        if time.monotonic() < breaker['open_until']:
+            return 'open'
+        breaker['state'] = 'half_open'
+    if breaker['probe_in_flight']:
+        return 'open'
+    breaker['probe_in_flight'] = True
+    return 'probe'
+
+def record_groq_success():
+    breaker = groq_resilience['breaker']
+    if breaker['state'] != 'closed':
+        logger.info("Groq circuit breaker closed; requests succeeding again")
+    breaker.update(
+        state='closed',
+        consecutive_failures=0,
+        probe_in_flight=False,
+        open_seconds=GROQ_BREAKER_OPEN_SECONDS,
+    )
+
+def record_groq_failure():
+    breaker = groq_resilience['breaker']
+    breaker['consecutive_failures'] += 1
+    if breaker['state'] == 'half_open':
+        breaker['open_seconds'] = min(GROQ_BREAKER_MAX_OPEN_SECONDS, breaker['open_seconds'] * 2)
+    elif breaker['consecutive_failures'] < GROQ_BREAKER_FAILURE_THRESHOLD:
+        return
+    breaker.update(state='open', open_until=time.monotonic() + breaker['open_seconds'], probe_in_flight=False)
+    breaker['trips'] += 1
+    increment_metric('toast_groq_breaker_trips_total')
+    logger.warning(
+        f"Groq circuit breaker opened for {breaker['open_seconds']:.0f}s "
+        f"after {breaker['consecutive_failures']} consecutive failure(s)"
+    )
+
+def get_groq_retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(GROQ_RETRY_MAX_SECONDS, GROQ_RETRY_BASE_SECONDS * (2 ** (attempt - 1))))
+
+async def post_groq_request(request: dict):
+    """POST a chat completion with retries; returns an open 2xx response or None after giving up.
+
+    All attempts share the request's deadline (timeout_seconds from when it was built), so
+    retries can't stretch a reply past it. A request that gives up after transient failures
+    counts once toward the circuit breaker, however many attempts it made. The caller owns
+    the returned response and must close/release it; reading it is bounded by the deadline.
+    """
+    metric_labels = request['metric_labels']
+    estimated_tokens = request['estimated_tokens']
+    failed = False
+    for attempt in range(1, GROQ_RETRY_ATTEMPTS + 1):
+        permit = acquire_groq_breaker()
+        if permit == 'open':
+            groq_resilience['stats']['fast_failures'] += 1
+            increment_metric('toast_groq_requests_total', metric_labels + (('outcome', 'breaker_open'),))
+            return None
+
+        try:
+            delay = get_groq_throttle_delay(estimated_tokens)
+            if delay > GROQ_THROTTLE_MAX_WAIT_SECONDS or delay + GROQ_RETRY_MIN_ATTEMPT_SECONDS > request['deadline'] - time.monotonic():
+                groq_resilience['stats']['fast_failures'] += 1
+                increment_metric('toast_groq_requests_total', metric_labels + (('outcome', 'throttled'),))
+                logger.warning(f"Groq rate limit resets in {delay:.1f}s; using the fallback reply")
+                return None
+            if delay > 0:
+                groq_resilience['stats']['throttled_waits'] += 1
+                await asyncio.sleep(delay)
+            reserve_groq_capacity(estimated_tokens)
+
+            try:
+                response = await get_groq_http_session().post(
+                    GROQ_CHAT_COMPLETIONS_URL,
+                    headers=request['headers'],
+                    json=request['payload'],
+                    timeout=ClientTimeout(total=request['deadline'] - time.monotonic()),
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                increment_metric('toast_groq_requests_total', metric_labels + (('outcome', 'error'),))
+                logger.warning(f"Groq request attempt {attempt} failed: {e.__class__.__name__}: {e}")
+                failed = True
+                if permit == 'probe':
+                    record_groq_failure()
+                    return None
+                retry_delay = get_groq_retry_delay(attempt)
+            else:
+                record_groq_rate_limit_headers(response.headers)
+                if response.status < 400:
+                    record_groq_success()
+                    return response
+
+                try:
+                    response_text = await response.text()
+                except Exception as e:
+                    response_text = f"<unreadable body: {e.__class__.__name__}>"
+                finally:
+                    response.release()
+                increment_metric('toast_groq_requests_total', metric_labels + (('outcome', f"http_{response.status}"),))
+                logger.warning(f"Groq DM reply failed: status={response.status} attempt={attempt} body={response_text[:500]}")
+                if response.status not in GROQ_RETRYABLE_STATUSES:
+                    # a client error isn't Groq being unhealthy, so it doesn't count toward the breaker
+                    if permit == 'probe':
+                        record_groq_success()
+                    return None
+                if response.status != 429:
+                    failed = True
+                    if permit == 'probe':
+                        record_groq_failure()
+                        return None
+                retry_delay = max(get_groq_retry_delay(attempt), groq_resilience['rate_limit']['retry_at'] - time.monotonic())
+        finally:
+            # a probe that ended without a verdict (cancelled, throttled, 429) lets the next request try
+            if permit == 'probe':
+                groq_resilience['breaker']['probe_in_flight'] = False
+
+        if attempt == GROQ_RETRY_ATTEMPTS or retry_delay > GROQ_RETRY_MAX_SECONDS:
+            if failed:
+                record_groq_failure()
+            return None
+        if retry_delay + GROQ_RETRY_MIN_ATTEMPT_SECONDS > request['deadline'] - time.monotonic():
+            groq_resilience['stats']['deadline_exhausted'] += 1
+            logger.warning(f"Groq request deadline leaves no room for attempt {attempt + 1}; giving up")
+            if failed:
+                record_groq_failure()
+            return None
+        groq_resilience['stats']['retries'] += 1
+        increment_metric('toast_groq_retries_total')
+        await asyncio.sleep(retry_delay)
+    return None
+
+def get_groq_resilience_stats() -> dict:
+    breaker = groq_resilience['breaker']
+    rate_limit = groq_resilience['rate_limit']
+    now = time.monotonic()
+    return {
+        'breaker': {
+            'state': breaker['state'],
+            'consecutive_failures': breaker['consecutive_failures'],
+            'open_for_seconds': round(max(0.0, breaker['open_until'] - now), 1) if breaker['state'] == 'open' else 0.0,
+            'trips': breaker['trips'],
+        },
+        'rate_limit': {
+            'limit_requests': rate_limit['limit_requests'],
+            'limit_tokens': rate_limit['limit_tokens'],
+            'remaining_requests': rate_limit['remaining_requests'],
+            'remaining_tokens': rate_limit['remaining_tokens'],
+            'requests_reset_seconds': round(max(0.0, rate_limit['requests_reset_at'] - now), 1),
+            'tokens_reset_seconds': round(max(0.0, rate_limit['tokens_reset_at'] - now), 1),
+            'retry_after_seconds': round(max(0.0, rate_limit['retry_at'] - now), 1),
+        },
+        **groq_resilience['stats'],
+    }
+
+# Live per-model latency (EWMA of time to first token when streaming, full request otherwise)
+# so each routing tier can pick its fastest model. Models with no recent sample are tried
+# first, which keeps every candidate measured.
+groq_routing = {
+    'latency': {},
+    'recent': deque(maxlen=GROQ_ROUTE_LOG_SIZE),
+}
+
+def record_groq_model_latency(model: str, seconds: float):
+    entry = groq_routing['latency'].get(model)
+    if entry is None:
+        entry = groq_routing['latency'][model] = {'ewma': seconds, 'samples': 0, 'updated_at': 0.0}
+    else:
+        entry['ewma'] += GROQ_MODEL_LATENCY_ALPHA * (seconds - entry['ewma'])
+    entry['samples'] += 1
+    entry['updated_at'] = time.monotonic()
+
+def pick_groq_hedge_model(models: list, primary_model: str) -> str:
+    """Fastest measured model in the tier, as long as it isn't slower than the primary"""
+    primary_entry = groq_routing['latency'].get(primary_model)
+    best_model = primary_model
+    best_latency = primary_entry['ewma'] if primary_entry else None
+    for model in models:
+        entry = groq_routing['latency'].get(model)
+        if entry is not None and (best_latency is None or entry['ewma'] < best_latency):
+            best_model = model
+            best_latency = entry['ewma']
+    return best_model
+
+def pick_fastest_groq_model(models: list) -> str:
+    now = time.monotonic()
+    best_model = models[0]
+    best_latency = None
+    for model in models:
+        entry = groq_routing['latency'].get(model)
+        if entry is None or now - entry['updated_at'] > GROQ_MODEL_LATENCY_STALE_SECONDS:
+            return model
+        if best_latency is None or entry['ewma'] < best_latency:
+            best_model = model
+            best_latency = entry['ewma']
+    return best_model
+
+def choose_groq_route(current_message: str, vision_attachments: list) -> dict:
+    groq_config = get_groq_config()
+    message_chars = len(BATCHED_MESSAGE_LABEL_PATTERN.sub('', current_message or '').strip())
+    wiki = should_include_wiki_context(current_message)
+    tiers = groq_config['routing_tiers']
+    tier = tiers[-1]
+    if not vision_attachments:
+        # image DMs keep the catch-all tier so a small-talk cap can't cut descriptions short
+        for candidate in tiers:
+            if candidate['max_message_chars'] is not None and message_chars > candidate['max_message_chars']:
+                continue
+            if wiki and not candidate['wiki']:
+                continue
+            tier = candidate
+            break
+
+    models = [groq_config['vision_model']] if vision_attachments else tier['models']
+    model = pick_fastest_groq_model(models)
+    latency = groq_routing['latency'].get(model)
+    return {
+        'tier': tier['name'],
+        'model': model,
+        'hedge_model': pick_groq_hedge_model(models, model),
+        'max_completion_tokens': tier['max_completion_tokens'],
+        'message_chars': message_chars,
+        'wiki': wiki,
+        'vision': bool(vision_attachments),
+        'expected_latency_ms': round(latency['ewma'] * 1000) if latency else None,
+    }
+
+def record_groq_route(user, route: dict):
+    groq_routing['recent'].append({'discord_user_id': str(user.id), 'at': time.time(), **route})
+    increment_metric('toast_groq_routes_total', (('tier', route['tier']), ('model', route['model'])))
+    logger.info(
+        f"Groq route for {user.id}: tier={route['tier']} model={route['model']} "
+        f"max_completion_tokens={route['max_completion_tokens']} chars={route['message_chars']} "
+        f"wiki={route['wiki']} vision={route['vision']} expected_latency_ms={route['expected_latency_ms']}"
+    )
+
+def get_groq_routing_stats() -> dict:
+    return {
+        'models': {
+            model: {'latency_ms': round(entry['ewma'] * 1000), 'samples': entry['samples']}
+            for model, entry in sorted(groq_routing['latency'].items())
+        },
+        'recent': list(groq_routing['recent'])[-10:],
+    }
+
+# Optional request hedging: when a Groq request is slower than the configured percentile of
+# recent response times (time to first token when streaming), a second request goes out
+# (same or faster model) and whichever answers first wins. Hedges are capped per minute so a slow spell can't double quota use.
+groq_hedging = {
+    'latencies': deque(maxlen=GROQ_HEDGE_SAMPLE_SIZE),
+    'fired_at': deque(),
+    'stats': {
+        'fired': 0,
+        'hedge_won': 0,
+        'primary_won': 0,
+        'both_failed': 0,
+        'skipped_budget': 0,
+        'skipped_throttled': 0,
+    },
+}
+
+def get_groq_hedge_delay():
+    hedging = get_groq_config()['hedging']
+    samples = groq_hedging['latencies']
+    if not hedging['enabled'] or hedging['budget_per_minute'] <= 0 or len(samples) < GROQ_HEDGE_MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * hedging['percentile'] / 100))
+    return max(hedging['min_delay_seconds'], ordered[index])
+
+def prune_groq_hedge_budget(now: float):
+    fired_at = groq_hedging['fired_at']
+    while fired_at and now - fired_at[0] >= GROQ_HEDGE_BUDGET_WINDOW_SECONDS:
+        fired_at.popleft()
+
+def start_groq_hedge(request: dict):
+    """Build the hedge request, or return None when the budget or Groq's rate limits say no"""
+    skip = None
+    now = time.monotonic()
+    prune_groq_hedge_budget(now)
+    if len(groq_hedging['fired_at']) >= get_groq_config()['hedging']['budget_per_minute']:
+        skip = 'skipped_budget'
+    elif groq_resilience['breaker']['state'] != 'closed' or get_groq_throttle_delay(request['estimated_tokens']) > 0:
+        skip = 'skipped_throttled'
+    if skip is not None:
+        groq_hedging['stats'][skip] += 1
+        increment_metric('toast_groq_hedges_total', (('outcome', skip),))
+        return None
+
+    groq_hedging['fired_at'].append(now)
+    groq_hedging['stats']['fired'] += 1
+    model = request['hedge_model']
+    logger.info(f"Groq request on {request['model']} is slow; hedging with {model}")
+    return {
+        **request,
+        'payload': {**request['payload'], 'model': model},
+        'model': model,
+        'metric_labels': (('model', model),) + request['metric_labels'][1:],
+    }
+
+def discard_groq_response(task: asyncio.Task):
+    if task.cancelled() or task.exception() is not None:
+        return
+    result = task.result()
+    if isinstance(result, tuple):
+        result = result[0]
+    if result is not None:
+        result.close()
+
+async def post_groq_request_hedged(request: dict, open_attempt=post_groq_request):
+    """Run open_attempt with optional hedging; returns (its result, request that produced it).
+
+    open_attempt is post_groq_request, or open_groq_stream so streams race on their first
+    token. The slower attempt is cancelled (or its response closed if it already arrived).
+    """
+    started = time.perf_counter()
+    hedge_delay = get_groq_hedge_delay()
+    primary = asyncio.create_task(open_attempt(request))
+    requests_by_task = {primary: request}
+    winner = None
+    try:
+        if hedge_delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if not done:
+                hedge_request = start_groq_hedge(request)
+                if hedge_request is not None:
+                    requests_by_task[asyncio.create_task(open_attempt(hedge_request))] = hedge_request
+
+        pending = set(requests_by_task)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # an attempt that crashed counts as failed; the other one keeps running
+                if task.exception() is not None:
+                    exc = task.exception()
+                    logger.warning(f"Groq request on {requests_by_task[task]['model']} crashed: {exc.__class__.__name__}: {exc}")
+                elif task.result() is not None:
+                    winner = task
+                    break
+            if winner is not None:
+                break
+    finally:
+        for task in requests_by_task:
+            if task is not winner:
+                task.cancel()
+                task.add_done_callback(discard_groq_response)
+
+    hedged = len(requests_by_task) > 1
+    if winner is None:
+        if hedged:
+            groq_hedging['stats']['both_failed'] += 1
+            increment_metric('toast_groq_hedges_total', (('outcome', 'both_failed'),))
+        return None, request
+
+    groq_hedging['latencies'].append(time.perf_counter() - started)
+    if hedged:
+        outcome = 'primary_won' if winner is primary else 'hedge_won'
+        groq_hedging['stats'][outcome] += 1
+        increment_metric('toast_groq_hedges_total', (('outcome', outcome),))
+    return winner.result(), requests_by_task[winner]
+
+def get_groq_hedging_stats() -> dict:
+    hedging = get_groq_config()['hedging']
+    prune_groq_hedge_budget(time.monotonic())
+    hedge_delay = get_groq_hedge_delay()
+    return {
+        'enabled': hedging['enabled'],
+        'hedge_after_seconds': round(hedge_delay, 3) if hedge_delay is not None else None,
+        'samples': len(groq_hedging['latencies']),
+        'budget_used': len(groq_hedging['fired_at']),
+        'budget_per_minute': hedging['budget_per_minute'],
+        **groq_hedging['stats'],
+    }
+
+def build_groq_request(user, current_message: str, attachments=None, current_message_ids=None, stream: bool = False):
     groq_config = get_groq_config()
     api_key = groq_config['api_key']
     if not api_key:
         logger.warning("Groq API key missing from toast.json; skipping AI DM reply")
-        return ''
+        return None
 
     vision_attachments = get_vision_attachments(attachments, groq_config['max_vision_images'])
-    model = groq_config['vision_model'] if vision_attachments else groq_config['model']
+    route = choose_groq_route(current_message, vision_attachments)
+    record_groq_route(user, route)
+    model = route['model']
     payload = {
         'model': model,
         'messages': build_groq_messages(
@@ -1181,26 +3473,147 @@ async def request_groq_dm_reply(user, current_message: str, attachments=None, cu
         ),
         'temperature': groq_config['temperature'],
         'top_p': groq_config['top_p'],
-        'max_completion_tokens': groq_config['max_completion_tokens'],
+        'max_completion_tokens': route['max_completion_tokens'],
     }
+    if stream:
+        payload['stream'] = True
     headers = {
         'Authorization': f"Bearer {api_key}",
         'Content-Type': 'application/json',
     }
-    timeout = ClientTimeout(total=groq_config['timeout_seconds'])
+    # image blocks may be inlined data URLs, so only text counts toward the size label
+    prompt_chars = sum(
+        len(message['content']) if isinstance(message.get('content'), str)
+        else sum(len(block.get('text', '')) for block in message.get('content') or [])
+        for message in payload['messages']
+    )
+    return {
+        'payload': payload,
+        'headers': headers,
+        'deadline': time.monotonic() + groq_config['timeout_seconds'],
+        'model': model,
+        'hedge_model': route['hedge_model'],
+        'metric_labels': (('model', model), ('prompt_size', prompt_size_label(prompt_chars))),
+        'estimated_tokens': sum(estimate_message_tokens(message) for message in payload['messages']),
+    }
 
-    async with ClientSession(timeout=timeout) as session:
-        async with session.post(GROQ_CHAT_COMPLETIONS_URL, headers=headers, json=payload) as response:
+def parse_groq_stream_line(raw_line: bytes):
+    """Return (content delta, finished) for one SSE line of a streamed Groq completion"""
+    line = raw_line.decode('utf-8', errors='ignore').strip()
+    if not line.startswith('data:'):
+        return '', False
+    data_text = line[len('data:'):].strip()
+    if data_text == '[DONE]':
+        return '', True
+    try:
+        event = json.loads(data_text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Groq stream returned invalid JSON: {e}")
+        return '', False
+    if not isinstance(event, dict):
+        return '', False
+    if event.get('error'):
+        logger.warning(f"Groq stream reported an error: {str(event.get('error'))[:500]}")
+        return '', True
+    choices = event.get('choices') or []
+    if not choices or not isinstance(choices[0], dict):
+        return '', False
+    delta = choices[0].get('delta') or {}
+    content = delta.get('content') if isinstance(delta, dict) else None
+    return (str(content) if content else ''), False
+
+async def open_groq_stream(request: dict):
+    """post_groq_request for a streamed reply, read up to its first content delta.
+
+    Returns (response, first delta) so hedging races on time to first token instead of time
+    to headers; the delta is '' when the stream finished without any content.
+    """
+    response = await post_groq_request(request)
+    if response is None:
+        return None
+    try:
+        async for raw_line in response.content:
+            content, finished = parse_groq_stream_line(raw_line)
+            if content:
+                return response, content
+            if finished:
+                break
+    except asyncio.CancelledError:
+        response.close()
+        raise
+    except Exception as e:
+        response.close()
+        increment_metric('toast_groq_requests_total', request['metric_labels'] + (('outcome', 'error'),))
+        logger.warning(f"Groq stream failed before its first token: {e.__class__.__name__}: {e}")
+        return None
+    return response, ''
+
+async def stream_groq_dm_reply(user, current_message: str, attachments=None, current_message_ids=None):
+    """Yield reply text deltas from a streamed (SSE) Groq chat completion.
+
+    Closing the generator (or cancelling the task consuming it) closes the HTTP response,
+    which aborts generation on Groq's side instead of paying for unread tokens.
+    """
+    request = build_groq_request(user, current_message, attachments, current_message_ids, stream=True)
+    if request is None:
+        return
+
+    started = time.perf_counter()
+    outcome = 'error'
+    opened, request = await post_groq_request_hedged(request, open_groq_stream)
+    if opened is None:
+        return
+    response, first_content = opened
+    metric_labels = request['metric_labels']
+    async with response:
+        try:
+            if first_content:
+                first_token_seconds = time.perf_counter() - started
+                observe_metric('toast_groq_first_token_seconds', first_token_seconds, metric_labels)
+                record_groq_model_latency(request['model'], first_token_seconds)
+                yield first_content
+                async for raw_line in response.content:
+                    content, finished = parse_groq_stream_line(raw_line)
+                    if content:
+                        yield content
+                    if finished:
+                        break
+            outcome = 'ok'
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = 'cancelled'
+            response.close()
+            raise
+        finally:
+            increment_metric('toast_groq_requests_total', metric_labels + (('outcome', outcome),))
+            if outcome == 'ok':
+                observe_metric('toast_groq_request_seconds', time.perf_counter() - started, metric_labels)
+
+async def request_groq_dm_reply(user, current_message: str, attachments=None, current_message_ids=None) -> str:
+    request = build_groq_request(user, current_message, attachments, current_message_ids)
+    if request is None:
+        return ''
+
+    started = time.perf_counter()
+    response, request = await post_groq_request_hedged(request)
+    if response is None:
+        return ''
+    metric_labels = request['metric_labels']
+    try:
+        async with response:
             response_text = await response.text()
-            if response.status >= 400:
-                logger.warning(f"Groq DM reply failed: status={response.status} body={response_text[:500]}")
-                return ''
+    except Exception:
+        increment_metric('toast_groq_requests_total', metric_labels + (('outcome', 'error'),))
+        raise
+    increment_metric('toast_groq_requests_total', metric_labels + (('outcome', 'ok'),))
+    request_seconds = time.perf_counter() - started
+    observe_metric('toast_groq_request_seconds', request_seconds, metric_labels)
+    record_groq_model_latency(request['model'], request_seconds)
 
-            try:
-                data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Groq returned invalid JSON: {e}")
-                return ''
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Groq returned invalid JSON: {e}")
+        return ''
 
     choices = data.get('choices', [])
     if not choices or not isinstance(choices, list):
@@ -1231,6 +3644,70 @@ def remove_completed_ai_batch(discord_user_id: str, completed_batch: list):
     if not ai_dm_pending_batches.get(discord_user_id):
         ai_dm_pending_batches.pop(discord_user_id, None)
 
+async def iter_ai_dm_reply_chunks(user, current_message: str, attachments=None, current_message_ids=None):
+    """Yield DM-sized reply chunks, streaming them from Groq when stream_replies is on"""
+    if not get_groq_config()['stream_replies']:
+        try:
+            reply = await request_groq_dm_reply(user, current_message, attachments, current_message_ids)
+        except Exception as e:
+            logger.warning(f"Groq DM reply request crashed: {e}")
+            reply = ''
+        for chunk in split_natural_messages(reply):
+            yield chunk
+        return
+
+    # The stream is read by its own task so our typing-delay pacing never stalls the
+    # HTTP response (or eats into its timeout); finished chunks wait in the queue.
+    chunk_queue = asyncio.Queue()
+
+    async def read_stream():
+        chunker = create_stream_chunker()
+        try:
+            try:
+                async with aclosing(stream_groq_dm_reply(user, current_message, attachments, current_message_ids)) as deltas:
+                    async for delta in deltas:
+                        for chunk in feed_stream_chunker(chunker, delta):
+                            chunk_queue.put_nowait(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Groq DM reply stream crashed: {e}")
+            for chunk in finish_stream_chunker(chunker):
+                chunk_queue.put_nowait(chunk)
+        finally:
+            chunk_queue.put_nowait(None)
+
+    reader_task = asyncio.create_task(read_stream())
+    try:
+        while True:
+            chunk = await chunk_queue.get()
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        if not reader_task.done():
+            reader_task.cancel()
+
+async def deliver_ai_dm_reply(user, chunks) -> int:
+    """Send reply chunks with typing pacing; time spent generating counts toward the delay.
+
+    The first chunk only waits out a short floor, so the first DM lands as soon as its
+    sentence is ready; the full typing pacing applies between later chunks.
+    """
+    loop = asyncio.get_running_loop()
+    last_sent_at = loop.time()
+    sent_count = 0
+    async with aclosing(chunks) as chunk_stream:
+        async for chunk in chunk_stream:
+            typing_delay = typing_delay_seconds(chunk) if sent_count else AI_DM_FIRST_SEND_DELAY_SECONDS
+            delay = typing_delay - (loop.time() - last_sent_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await send_logged_dm(user, chunk, DM_PRIORITY_AI_REPLY)
+            sent_count += 1
+            last_sent_at = loop.time()
+    return sent_count
+
 async def process_ai_dm_batch(user, channel, discord_user_id: str):
     groq_config = get_groq_config()
     if not groq_config['api_key']:
@@ -1247,33 +3724,14 @@ async def process_ai_dm_batch(user, channel, discord_user_id: str):
 
     try:
         async with channel.typing():
-            try:
-                reply = await request_groq_dm_reply(
-                    user,
-                    current_message,
-                    attachments,
-                    current_message_ids,
-                )
-            except Exception as e:
-                logger.warning(f"Groq DM reply request crashed: {e}")
-                reply = ''
-
-            if not reply:
-                await asyncio.sleep(AI_DM_MIN_SEND_DELAY_SECONDS)
-                await send_logged_dm(user, GROQ_FALLBACK_REPLY)
-                remove_completed_ai_batch(discord_user_id, batch)
-                return
-
-            chunks = split_natural_messages(reply)
-            if not chunks:
+            await prepare_vision_attachments(attachments)
+            sent_count = await deliver_ai_dm_reply(
+                user,
+                iter_ai_dm_reply_chunks(user, current_message, attachments, current_message_ids),
+            )
+            if not sent_count:
                 await asyncio.sleep(AI_DM_MIN_SEND_DELAY_SECONDS)
-                await send_logged_dm(user, GROQ_FALLBACK_REPLY)
-                remove_completed_ai_batch(discord_user_id, batch)
-                return
-
-            for chunk in chunks:
-                await asyncio.sleep(typing_delay_seconds(chunk))
-                await send_logged_dm(user, chunk)
+                await send_logged_dm(user, GROQ_FALLBACK_REPLY, DM_PRIORITY_AI_REPLY)
 
             remove_completed_ai_batch(discord_user_id, batch)
     except asyncio.CancelledError:
@@ -1308,6 +3766,7 @@ def queue_ai_dm_reply(message: discord.Message, dm_content: str):
         'attachments': list(message.attachments or []),
         'message_id': str(getattr(message, 'id', '')),
     })
+    start_vision_fetches(message.attachments)
 
     active_task = ai_dm_reply_tasks.get(discord_user_id)
     if active_task and not active_task.done():
@@ -1323,13 +3782,107 @@ async def respond_to_dm_with_groq(message: discord.Message):
         build_dm_content(message.content, message.attachments),
     )
 
-async def send_logged_dm(target, message: str):
+def ensure_dm_dispatcher():
+    queue = dm_dispatch['queue']
+    if queue is None:
+        queue = dm_dispatch['queue'] = asyncio.PriorityQueue()
+    workers = [worker for worker in dm_dispatch['workers'] if not worker.done()]
+    for _ in range(get_dm_dispatch_config()['concurrency'] - len(workers)):
+        workers.append(asyncio.create_task(run_dm_dispatch_worker()))
+    dm_dispatch['workers'] = workers
+    return queue
+
+async def take_dm_dispatch_token():
+    while True:
+        dispatch_config = get_dm_dispatch_config()
+        now = time.monotonic()
+        if now < dm_dispatch['paused_until']:
+            await asyncio.sleep(dm_dispatch['paused_until'] - now)
+            continue
+
+        tokens = dm_dispatch['tokens']
+        if tokens is None:
+            tokens = float(dispatch_config['burst'])
+        else:
+            elapsed = now - dm_dispatch['refilled_at']
+            tokens = min(float(dispatch_config['burst']), tokens + elapsed * dispatch_config['rate_per_second'])
+        dm_dispatch['refilled_at'] = now
+        if tokens >= 1.0:
+            dm_dispatch['tokens'] = tokens - 1.0
+            return
+        dm_dispatch['tokens'] = tokens
+        await asyncio.sleep((1.0 - tokens) / dispatch_config['rate_per_second'])
+
+async def run_dm_dispatch_worker():
+    dm_dispatch_sending.set(True)
+    queue = dm_dispatch['queue']
+    while True:
+        priority, _sequence, queued_at, target, message, future = await queue.get()
+        dm_dispatch['queued'][priority] -= 1
+        try:
+            # the caller gave up (e.g. a newer DM cancelled the AI reply), so don't send it
+            if future.done():
+                continue
+            await take_dm_dispatch_token()
+            if future.done():
+                continue
+            observe_metric('toast_dm_queue_wait_seconds', time.monotonic() - queued_at, (('priority', DM_PRIORITY_NAMES[priority]),))
+            dm_dispatch['in_flight'] += 1
+            try:
+                result = await deliver_logged_dm(target, message, priority)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                dm_dispatch['in_flight'] -= 1
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"DM dispatch worker error: {e}")
+        finally:
+            queue.task_done()
+
+async def send_logged_dm(target, message: str, priority: int = DM_PRIORITY_NOTIFICATION):
+    """Queue a DM with the dispatcher and wait until it has been sent; returns (user, message)"""
+    queue = ensure_dm_dispatcher()
+    future = asyncio.get_running_loop().create_future()
+    dm_dispatch['sequence'] += 1
+    dm_dispatch['queued'][priority] += 1
+    queue.put_nowait((priority, dm_dispatch['sequence'], time.monotonic(), target, message, future))
+    return await future
+
+def get_dm_dispatch_stats() -> dict:
+    dispatch_config = get_dm_dispatch_config()
+    return {
+        'queued': {DM_PRIORITY_NAMES[priority]: count for priority, count in dm_dispatch['queued'].items()},
+        'in_flight': dm_dispatch['in_flight'],
+        'workers': sum(1 for worker in dm_dispatch['workers'] if not worker.done()),
+        'tokens': round(dm_dispatch['tokens'], 2) if dm_dispatch['tokens'] is not None else float(dispatch_config['burst']),
+        'paused_seconds': round(max(0.0, dm_dispatch['paused_until'] - time.monotonic()), 2),
+        'rate_per_second': dispatch_config['rate_per_second'],
+        'rate_limit': get_discord_rate_limit_stats(),
+    }
+
+async def deliver_logged_dm(target, message: str, priority: int = DM_PRIORITY_NOTIFICATION):
     if isinstance(target, (discord.User, discord.Member)):
         user = target
     else:
         user = await bot.fetch_user(int(str(target)))
 
-    sent_message = await user.send(message)
+    priority_label = ('priority', DM_PRIORITY_NAMES[priority])
+    started = time.perf_counter()
+    try:
+        sent_message = await user.send(message)
+    except Exception as e:
+        increment_metric('toast_dm_sends_total', (priority_label, ('outcome', e.__class__.__name__)))
+        raise
+    observe_metric('toast_dm_send_seconds', time.perf_counter() - started)
+    increment_metric('toast_dm_sends_total', (priority_label, ('outcome', 'ok')))
     append_dm_history_entry(
         user,
         'outbound',
@@ -1377,38 +3930,30 @@ def build_dm_error_response(error: Exception, action: str):
         status=500,
     )
 
-def save_notify_state(state: dict):
-    try:
-        with open(feed_notify_state_path, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save notify state: {e}")
+def iter_post_mention_keys(posts: dict, accounts_index: dict):
+    for post_id, post in posts.items():
+        for target in get_mentions(post, accounts_index):
+            yield post_id, f"mention:post:{post_id}:{target['username'].lower()}"
 
-def build_initial_notify_state(posts: dict, replies: dict, accounts_index: dict):
-    return {
-        'mentions': sorted(
-            f"post:{post_id}:{target['username'].lower()}"
-            for post_id, post in posts.items()
-            for target in extract_mentions(post.get('body', ''), accounts_index)
-        ) + sorted(
-            f"reply:{post_id}:{reply.get('id', '')}:{target['username'].lower()}"
-            for post_id, items in replies.items()
-            for reply in items
-            for target in extract_mentions(reply.get('body', ''), accounts_index)
-            if reply.get('id')
-        ),
-        'replies': sorted(
-            f"{post_id}:{reply.get('id', '')}"
-            for post_id, items in replies.items()
-            for reply in items
-            if reply.get('id')
-        ),
-        'reply_mentions_initialized': True,
-    }
+def iter_reply_mention_keys(replies: dict, accounts_index: dict):
+    for post_id, items in replies.items():
+        for reply in items:
+            if not reply.get('id'):
+                continue
+            for target in get_mentions(reply, accounts_index):
+                yield post_id, f"mention:reply:{post_id}:{reply['id']}:{target['username'].lower()}"
+
+def iter_initial_notify_keys(posts: dict, replies: dict, accounts_index: dict):
+    yield from iter_post_mention_keys(posts, accounts_index)
+    yield from iter_reply_mention_keys(replies, accounts_index)
+    for post_id, items in replies.items():
+        for reply in items:
+            if reply.get('id'):
+                yield post_id, f"reply:{post_id}:{reply['id']}"
 
 async def send_dm_to_user(discord_user_id: str, message: str):
     try:
-        await send_logged_dm(discord_user_id, message)
+        await send_logged_dm(discord_user_id, message, DM_PRIORITY_NOTIFICATION)
         return True
     except Exception as e:
         logger.warning(f"Failed to DM user {discord_user_id}: {e}")
@@ -1420,66 +3965,198 @@ def format_quote_block(text: str, max_length: int = 240) -> str:
         cleaned = cleaned[:max_length - 3].rstrip() + '...'
     return cleaned or '[no text]'
 
+feed_notify_cursor = {'version': 0, 'accounts_index': None}
+
+# Feed notifications for one recipient are held for a short window and sent as one digest DM,
+# so a busy thread costs one send per user per window instead of one per reply. Pending events
+# are also written to the notify state DB so a restart delivers them instead of dropping them.
+notification_digests = {
+    'pending': {},
+    'flush_tasks': set(),
+    'restored': False,
+}
+
+def get_notification_digest_config() -> dict:
+    notifications_config = config.get('notifications', {})
+    if not isinstance(notifications_config, dict):
+        notifications_config = {}
+
+    return {
+        'window_seconds': coerce_float(notifications_config.get('digest_window_seconds'), 45.0, 0.0, 3600.0),
+        'max_delay_seconds': coerce_float(notifications_config.get('digest_max_delay_seconds'), 180.0, 0.0, 21600.0),
+        'max_items': coerce_int(notifications_config.get('digest_max_items'), 10, 1, 50),
+    }
+
+def format_feed_notification_headline(event: dict) -> str:
+    post_url = f"https://fridg3.org/feed/posts/{event['post_id']}"
+    if event['kind'] == 'mention_post':
+        return f"**@{event['actor']}** mentioned you in [a /feed/ post]({post_url})"
+    if event['kind'] == 'mention_reply':
+        return f"**@{event['actor']}** mentioned you in a reply on [a /feed/ post]({post_url})"
+    return f"**@{event['actor']}** replied to [your /feed/ post]({post_url})"
+
+def build_notification_digest_messages(events: list) -> list:
+    if len(events) == 1:
+        event = events[0]
+        return [f"{format_feed_notification_headline(event)}:\n> \"{format_quote_block(event.get('body', ''))}\""]
+
+    messages = []
+    current = f"**{len(events)} new /feed/ notifications:**"
+    for event in events:
+        item = f"{format_feed_notification_headline(event)}:\n> \"{format_quote_block(event.get('body', ''), 140)}\""
+        if len(current) + 2 + len(item) > AI_DM_MAX_CHUNK_LENGTH:
+            messages.append(current)
+            current = item
+        else:
+            current = f"{current}\n\n{item}"
+    messages.append(current)
+    return messages
+
+def queue_feed_notification(discord_user_id: str, event: dict):
+    digest_config = get_notification_digest_config()
+    now = time.time()
+    row_id = save_pending_notification(discord_user_id, now, event)
+    increment_metric('toast_feed_notifications_total', (('kind', event['kind']),))
+    add_pending_notification(discord_user_id, row_id, now, event, digest_config)
+
+def add_pending_notification(discord_user_id: str, row_id: int, queued_at: float, event: dict, digest_config: dict):
+    digest = notification_digests['pending'].get(discord_user_id)
+    if digest is None:
+        digest = notification_digests['pending'][discord_user_id] = {
+            'events': [],
+            'row_ids': [],
+            'first_at': queued_at,
+            'handle': None,
+        }
+    digest['events'].append(event)
+    digest['row_ids'].append(row_id)
+
+    if digest['handle'] is not None:
+        digest['handle'].cancel()
+        digest['handle'] = None
+    if len(digest['events']) >= digest_config['max_items']:
+        start_notification_digest_flush(discord_user_id)
+        return
+
+    # each new event restarts the quiet window, but never past max_delay from the first one
+    deadline = digest['first_at'] + digest_config['max_delay_seconds'] - time.time()
+    delay = max(0.0, min(digest_config['window_seconds'], deadline))
+    digest['handle'] = asyncio.get_running_loop().call_later(delay, start_notification_digest_flush, discord_user_id)
+
+def start_notification_digest_flush(discord_user_id: str):
+    # detach the digest now so events queued before the flush task runs start a new one
+    digest = notification_digests['pending'].pop(discord_user_id, None)
+    if digest is None:
+        return
+    if digest['handle'] is not None:
+        digest['handle'].cancel()
+    task = asyncio.create_task(flush_notification_digest(discord_user_id, digest))
+    notification_digests['flush_tasks'].add(task)
+    task.add_done_callback(notification_digests['flush_tasks'].discard)
+
+async def flush_notification_digest(discord_user_id: str, digest: dict):
+    for message in build_notification_digest_messages(digest['events']):
+        await send_dm_to_user(discord_user_id, message)
+    increment_metric('toast_notification_digests_total', (('size', 'single' if len(digest['events']) == 1 else 'multi'),))
+    # delivery is at-most-once like the delivered keys: failed sends are logged, not retried
+    try:
+        delete_pending_notifications(digest['row_ids'])
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to clear delivered notification digest for {discord_user_id}: {e}")
+
+def restore_notification_digests():
+    notification_digests['restored'] = True
+    digest_config = get_notification_digest_config()
+    restored = 0
+    orphaned = []
+    for row_id, discord_user_id, queued_at, event in load_pending_notifications():
+        if event is None:
+            orphaned.append(row_id)
+            continue
+        add_pending_notification(discord_user_id, row_id, queued_at, event, digest_config)
+        restored += 1
+    delete_pending_notifications(orphaned)
+    if restored:
+        logger.info(f"Restored {restored} undelivered feed notification(s) from before the last restart")
+
+def get_notification_digest_stats() -> dict:
+    return {
+        'pending_users': len(notification_digests['pending']),
+        'pending_events': sum(len(digest['events']) for digest in notification_digests['pending'].values()),
+        'flushing': len(notification_digests['flush_tasks']),
+    }
+
 @tasks.loop(seconds=20)
 async def feed_notifications_monitor():
+    started = time.perf_counter()
     try:
         accounts_index = load_accounts_index()
-        posts = load_feed_posts()
-        replies = load_feed_replies()
-
-        state = load_notify_state()
-        if state is None:
-            state = build_initial_notify_state(posts, replies, accounts_index)
-            save_notify_state(state)
-            logger.info("Initialized feed notification state without sending backlog DMs")
+        index_version = refresh_feed_index()
+        posts = indexed_feed_posts()
+
+        if not notify_state_initialized():
+            marked = mark_notifications_delivered(
+                iter_initial_notify_keys(posts, indexed_feed_replies(), accounts_index)
+            )
+            set_notify_meta('reply_mentions_initialized', '1')
+            set_notify_meta('initialized', '1')
+            feed_notify_cursor['version'] = index_version
+            feed_notify_cursor['accounts_index'] = accounts_index
+            logger.info(f"Initialized feed notification state with {marked} key(s) without sending backlog DMs")
             return
 
-        mention_state = set(state.get('mentions', []))
-        reply_state = set(state.get('replies', []))
-
-        mention_state_changed = False
-        reply_state_changed = False
-
-        if not state.get('reply_mentions_initialized'):
-            for post_id, post in posts.items():
-                for target in extract_mentions(post.get('body', ''), accounts_index):
-                    mention_state.add(f"post:{post_id}:{target['username'].lower()}")
-            for post_id, post_replies in replies.items():
-                for reply in post_replies:
-                    reply_id = reply.get('id', '')
-                    if not reply_id:
-                        continue
-                    for target in extract_mentions(reply.get('body', ''), accounts_index):
-                        mention_state.add(f"reply:{post_id}:{reply_id}:{target['username'].lower()}")
-            state['reply_mentions_initialized'] = True
-            mention_state_changed = True
-
-        for post_id, post in posts.items():
+        if not notification_digests['restored']:
+            restore_notification_digests()
+
+        # Only files that changed since the last tick need checking. A change to the accounts
+        # index (e.g. a newly linked Discord account) can make old mentions deliverable, so
+        # that case still walks the whole (already parsed) index.
+        if feed_notify_cursor['accounts_index'] != accounts_index:
+            changed_posts = posts
+            changed_replies = indexed_feed_replies()
+            # posts whose file exists but doesn't parse right now keep their notify state
+            removed_posts = find_orphaned_notify_posts(indexed_feed_post_ids()) if posts else []
+        else:
+            changes = get_feed_index_changes(feed_notify_cursor['version'])
+            changed_posts = changes['posts']
+            changed_replies = changes['replies']
+            removed_posts = [post_id for post_id in changes['removed_posts'] if post_id not in posts]
+            if changed_posts:
+                all_replies = indexed_feed_replies()
+                for post_id in changed_posts:
+                    if post_id in all_replies and post_id not in changed_replies:
+                        changed_replies[post_id] = all_replies[post_id]
+
+        if removed_posts:
+            pruned = prune_notify_state(removed_posts)
+            logger.info(f"Pruned feed notification state for {pruned} deleted post(s)")
+
+        if get_notify_meta('reply_mentions_initialized') != '1':
+            mark_notifications_delivered(iter_post_mention_keys(posts, accounts_index))
+            mark_notifications_delivered(iter_reply_mention_keys(indexed_feed_replies(), accounts_index))
+            set_notify_meta('reply_mentions_initialized', '1')
+
+        for post_id, post in changed_posts.items():
             author_key = post['username'].lower()
-            for target in extract_mentions(post.get('body', ''), accounts_index):
+            for target in get_mentions(post, accounts_index):
                 target_key = target['username'].lower()
-                legacy_notification_key = f"{post_id}:{target_key}"
-                notification_key = f"post:{post_id}:{target_key}"
-                if notification_key in mention_state or legacy_notification_key in mention_state:
-                    if legacy_notification_key in mention_state and notification_key not in mention_state:
-                        mention_state.discard(legacy_notification_key)
-                        mention_state.add(notification_key)
-                        mention_state_changed = True
+                notification_key = f"mention:post:{post_id}:{target_key}"
+                if is_notification_delivered(post_id, notification_key):
                     continue
-                mention_state.add(notification_key)
-                mention_state_changed = True
+                mark_notifications_delivered([(post_id, notification_key)])
                 if target_key == author_key:
                     continue
                 discord_user_id = target.get('discord_user_id', '')
                 if not discord_user_id:
                     continue
-                await send_dm_to_user(
-                    discord_user_id,
-                    f"**@{post['username']}** mentioned you in [a /feed/ post](https://fridg3.org/feed/posts/{post_id}):\n"
-                    f"> \"{format_quote_block(post.get('body', ''))}\""
-                )
-
-        for post_id, post_replies in replies.items():
+                queue_feed_notification(discord_user_id, {
+                    'kind': 'mention_post',
+                    'actor': post['username'],
+                    'post_id': post_id,
+                    'body': post.get('body', ''),
+                })
+
+        for post_id, post_replies in changed_replies.items():
             post = posts.get(post_id)
             if not post:
                 continue
@@ -1490,54 +4167,74 @@ async def feed_notifications_monitor():
                 reply_id = reply.get('id', '')
                 if not reply_id:
                     continue
-                notification_key = f"{post_id}:{reply_id}"
-                if notification_key in reply_state:
+                notification_key = f"reply:{post_id}:{reply_id}"
+                if is_notification_delivered(post_id, notification_key):
                     continue
-                reply_state.add(notification_key)
-                reply_state_changed = True
+                mark_notifications_delivered([(post_id, notification_key)])
 
                 reply_author_key = reply['username'].lower()
-                for target in extract_mentions(reply.get('body', ''), accounts_index):
+                for target in get_mentions(reply, accounts_index):
                     target_key = target['username'].lower()
-                    mention_notification_key = f"reply:{post_id}:{reply_id}:{target_key}"
-                    if mention_notification_key in mention_state:
+                    mention_notification_key = f"mention:reply:{post_id}:{reply_id}:{target_key}"
+                    if is_notification_delivered(post_id, mention_notification_key):
                         continue
-                    mention_state.add(mention_notification_key)
-                    mention_state_changed = True
+                    mark_notifications_delivered([(post_id, mention_notification_key)])
                     if target_key == reply_author_key or target_key == post_owner_key:
                         continue
                     discord_user_id = target.get('discord_user_id', '')
                     if not discord_user_id:
                         continue
-                    await send_dm_to_user(
-                        discord_user_id,
-                        f"**@{reply['username']}** mentioned you in a reply on [a /feed/ post](https://fridg3.org/feed/posts/{post_id}):\n"
-                        f"> \"{format_quote_block(reply.get('body', ''))}\""
-                    )
+                    queue_feed_notification(discord_user_id, {
+                        'kind': 'mention_reply',
+                        'actor': reply['username'],
+                        'post_id': post_id,
+                        'body': reply.get('body', ''),
+                    })
 
                 if not post_owner_discord_id:
                     continue
                 if reply['username'].lower() == post['username'].lower():
                     continue
-                await send_dm_to_user(
-                    post_owner_discord_id,
-                    f"**@{reply['username']}** replied to [your /feed/ post](https://fridg3.org/feed/posts/{post_id}):\n"
-                    f"> \"{format_quote_block(reply.get('body', ''))}\""
-                )
-
-        if mention_state_changed or reply_state_changed:
-            state['mentions'] = sorted(mention_state)
-            state['replies'] = sorted(reply_state)
-            save_notify_state(state)
+                queue_feed_notification(post_owner_discord_id, {
+                    'kind': 'reply',
+                    'actor': reply['username'],
+                    'post_id': post_id,
+                    'body': reply.get('body', ''),
+                })
+
+        feed_notify_cursor['version'] = index_version
+        feed_notify_cursor['accounts_index'] = accounts_index
     except Exception as e:
         logger.error(f"Feed notification monitor error: {e}")
+    finally:
+        observe_metric('toast_feed_monitor_tick_seconds', time.perf_counter() - started)
 
 @feed_notifications_monitor.before_loop
 async def before_feed_notifications_monitor():
     await bot.wait_until_ready()
 
+@web.middleware
+async def metrics_middleware(request, handler):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else 'unmatched'
+        observe_metric(
+            'toast_http_request_seconds',
+            time.perf_counter() - started,
+            (('route', route), ('method', request.method), ('status', status)),
+        )
+
 # Local status server for PHP to query instead of reading toast.json
-status_app = web.Application()
+status_app = web.Application(middlewares=[metrics_middleware])
 
 @bot.event
 async def on_ready():
@@ -1557,6 +4254,8 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Failed to sync application commands: {e}")
     
+    resume_dm_campaigns()
+
     # Try to join the voice channel and start playing
     await auto_play_stream()
 
@@ -1593,39 +4292,249 @@ async def on_message(message: discord.Message):
 
     await bot.process_commands(message)
 
-@tasks.loop(seconds=1)  # Check every second for immediate stream restart signal
-async def config_monitor():
-    """Monitor for stream update signal and reload config + restart playback immediately"""
-    global config
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')
+CONFIG_WATCH_DEBOUNCE_SECONDS = 0.25
+
+config_watch_state = {
+    'mode': None,
+    'fd': None,
+    'watch_dirs': {},
+    'pending': set(),
+    'debounce_handle': None,
+    'fingerprints': {},
+}
+config_reload_lock = asyncio.Lock()
+
+def get_watched_config_paths() -> set:
+    return {
+        str(CONFIG_PATH),
+        str(signal_file_path),
+        str(SHARED_PERSONALITY_PATH),
+        str(PERSONALITY_PATH),
+    }
+
+def stat_fingerprint(path: str):
+    try:
+        return file_fingerprint(os.stat(path))
+    except OSError:
+        return None
+
+def open_inotify_watcher(directories, mask: int):
+    """Create a non-blocking inotify fd watching the given directories.
+
+    Returns (fd, {wd: directory}) or None when inotify is not available (non-Linux hosts).
+    """
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
     try:
-        if signal_file_path.exists():
-            logger.info("Stream update signal detected, reloading config and restarting stream...")
-            # Reload config from file
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        logger.warning(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        return None
+
+    watch_dirs = {}
+    for directory in directories:
+        wd = inotify_add_watch(fd, os.fsencode(directory), mask)
+        if wd < 0:
+            logger.warning(f"inotify_add_watch failed for {directory}: {os.strerror(ctypes.get_errno())}")
+            continue
+        watch_dirs[wd] = directory
+
+    if not watch_dirs:
+        os.close(fd)
+        return None
+    return fd, watch_dirs
+
+def read_inotify_events(fd: int, watch_dirs: dict) -> list:
+    """Drain a non-blocking inotify fd into [(path or None, mask)]; path is None for queue events"""
+    events = []
+    while True:
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return events
+        except OSError as e:
+            logger.warning(f"Failed to read inotify events: {e}")
+            return events
+
+        offset = 0
+        while offset + INOTIFY_EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b'\0').decode('utf-8', errors='ignore')
+            offset += name_length
+            directory = watch_dirs.get(wd)
+            events.append((os.path.join(directory, name) if directory and name else None, mask))
+
+def handle_config_watch_events():
+    watched = get_watched_config_paths()
+    for path, _mask in read_inotify_events(config_watch_state['fd'], config_watch_state['watch_dirs']):
+        if path in watched:
+            queue_config_change(path)
+
+def queue_config_change(path: str):
+    """Collect a changed config path and (re)arm the debounce timer.
+
+    A burst of writes (PHP rewrites toast.json, then drops the signal file) lands in one
+    pending set and is applied once the files have been quiet for the debounce window.
+    """
+    config_watch_state['pending'].add(path)
+    handle = config_watch_state['debounce_handle']
+    if handle is not None:
+        handle.cancel()
+    loop = asyncio.get_running_loop()
+    config_watch_state['debounce_handle'] = loop.call_later(
+        CONFIG_WATCH_DEBOUNCE_SECONDS,
+        lambda: asyncio.ensure_future(apply_config_changes()),
+    )
+
+async def apply_config_changes():
+    """Reload config and restart the stream for the pending batch of file changes"""
+    global config
+    config_watch_state['debounce_handle'] = None
+    async with config_reload_lock:
+        changed = config_watch_state['pending']
+        config_watch_state['pending'] = set()
+        if not changed:
+            return
+
+        try:
+            signal_present = signal_file_path.exists()
+            personality_changed = bool(changed & {str(SHARED_PERSONALITY_PATH), str(PERSONALITY_PATH)})
+            if personality_changed:
+                invalidate_prompt_cache('personality file changed')
+                logger.info("Personality file changed; new replies will use the updated prompt")
+
+            if str(CONFIG_PATH) not in changed and not signal_present:
+                return
+
+            old_config = config
             try:
-                old_stream_name = config.get('stream', {}).get('name', 'Unknown')
                 config = load_config()
-                new_stream_name = config.get('stream', {}).get('name', 'Unknown')
             except Exception as e:
                 logger.error(f"Failed to reload config: {e}")
                 return
-            
+            invalidate_prompt_cache('toast.json reloaded')
+
+            stream_changed = (
+                old_config.get('stream') != config.get('stream')
+                or old_config.get('channel') != config.get('channel')
+            )
+            if not signal_present and not stream_changed:
+                logger.info("Config file changed, reloaded toast.json")
+                return
+
+            logger.info("Stream update detected, reloading config and restarting stream...")
             # Stop current playback
+            stop_stream_playback()
             for vc in bot.voice_clients:
                 if vc.is_playing():
                     vc.stop()
                 await vc.disconnect()
-            
+
             # Update Discord presence with new stream name
             await update_discord_presence()
-            
+
             # Start new stream
             await auto_play_stream()
-            
+
             # Remove signal file
-            try:
-                signal_file_path.unlink()
-            except Exception as e:
-                logger.warning(f"Failed to remove signal file: {e}")
+            if signal_present:
+                try:
+                    signal_file_path.unlink()
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"Failed to remove signal file: {e}")
+        except Exception as e:
+            logger.error(f"Config reload error: {e}")
+
+def start_config_watcher():
+    """Watch config files with inotify, falling back to the 1-second poll when unavailable"""
+    config_watch_state['fingerprints'] = {
+        path: stat_fingerprint(path) for path in get_watched_config_paths()
+    }
+
+    watcher = open_inotify_watcher(
+        sorted({str(Path(path).parent) for path in get_watched_config_paths()}),
+        IN_CLOSE_WRITE | IN_MOVED_TO,
+    )
+    if watcher is not None:
+        fd, watch_dirs = watcher
+        try:
+            asyncio.get_running_loop().add_reader(fd, handle_config_watch_events)
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning(f"Event loop cannot watch inotify fd, falling back to polling: {e}")
+            os.close(fd)
+        else:
+            config_watch_state['fd'] = fd
+            config_watch_state['watch_dirs'] = watch_dirs
+            config_watch_state['mode'] = 'inotify'
+            logger.info(f"Watching config files with inotify in {len(watch_dirs)} director(ies)")
+            # pick up a signal file that was written while the bot was down
+            if signal_file_path.exists():
+                queue_config_change(str(signal_file_path))
+            return
+
+    config_watch_state['mode'] = 'poll'
+    logger.info("inotify unavailable; polling config files every second")
+    config_monitor.start()
+
+def stop_config_watcher():
+    handle = config_watch_state['debounce_handle']
+    if handle is not None:
+        handle.cancel()
+        config_watch_state['debounce_handle'] = None
+    fd = config_watch_state['fd']
+    if fd is not None:
+        try:
+            asyncio.get_running_loop().remove_reader(fd)
+        except Exception:
+            pass
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+        config_watch_state['fd'] = None
+    if config_monitor.is_running():
+        config_monitor.cancel()
+
+@tasks.loop(seconds=1)  # Polling fallback when inotify is unavailable
+async def config_monitor():
+    """Poll watched config files and feed changes into the same debounced reload"""
+    try:
+        fingerprints = config_watch_state['fingerprints']
+        for path in get_watched_config_paths():
+            fingerprint = stat_fingerprint(path)
+            if fingerprints.get(path) != fingerprint:
+                fingerprints[path] = fingerprint
+                if fingerprint is not None:
+                    queue_config_change(path)
+            elif (
+                path == str(signal_file_path)
+                and fingerprint is not None
+                and not config_watch_state['pending']
+                and not config_reload_lock.locked()
+            ):
+                # signal file survived the last reload (e.g. unlink failed); retry like before
+                queue_config_change(path)
     except Exception as e:
         logger.error(f"Config monitor error: {e}")
 
@@ -1633,65 +4542,727 @@ async def config_monitor():
 async def heartbeat():
     """Periodic check to ensure bot is still connected and playing"""
     try:
-        channel = bot.get_channel(int(config['channel']['id']))
-        if channel and isinstance(channel, discord.VoiceChannel):
-            # Check if bot is in channel; if not, try to rejoin
-            if not any(member.id == bot.user.id for member in channel.members):
-                logger.warning(f"Bot disconnected from {channel.name}, attempting to rejoin...")
-                await auto_play_stream()
+        # Check if bot is in every configured channel; if not, try to rejoin
+        await rejoin_missing_channels()
     except Exception as e:
         logger.error(f"Heartbeat check failed: {e}")
 
-async def auto_play_stream():
-    """Connect to voice channel and play the m3u stream"""
+STREAM_PROBE_TIMEOUT_SECONDS = 5
+STREAM_START_TIMEOUT_SECONDS = 15
+STREAM_STALL_SECONDS = 8
+STREAM_FAILOVER_DELAY_SECONDS = 1.5
+STREAM_RETRY_ROUND_SECONDS = 5
+STREAM_RETRY_MAX_SECONDS = 60
+
+# Radio playback state. Every candidate URL (playlist entries plus stream.mirrors) is kept
+# in probe order; an upstream error, end of stream or stall moves the shared pipeline to
+# the next one. The generation counter lets callbacks from a replaced or stopped
+# pipeline be ignored.
+stream_playback = {
+    'generation': 0,
+    'active': False,
+    'candidates': [],
+    'probes': [],
+    'index': 0,
+    'voice_clients': {},
+    'listeners': {},
+    'pipeline': None,
+    'source': None,
+    'ffmpeg_exec': None,
+    'failovers': 0,
+    'failed_rounds': 0,
+    'last_failover_reason': None,
+    'failover_task': None,
+    'upstream_reconnects': 0,
+    'voice_disconnects': 0,
+    'voice_connected': {},
+    'ffmpeg_usage': None,
+}
+
+AUDIO_FRAME_MS = 20
+AUDIO_LATE_FRAME_MS = 30
+AUDIO_READ_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+AUDIO_BROADCAST_BUFFER_FRAMES = 250
+AUDIO_BROADCAST_START_FRAMES = 10
+AUDIO_BROADCAST_LEAD_FRAMES = 25
+FFMPEG_RECONNECT_PATTERN = re.compile(rb'will reconnect at', re.I)
+
+# Guards every pipeline's frame buffer; the pump thread notifies listeners of new frames
+audio_broadcast_condition = threading.Condition()
+
+class MonitoredAudioSource(discord.AudioSource):
+    """Pass-through wrapper for the upstream ffmpeg source that records when it last produced a frame"""
+
+    def __init__(self, source: discord.AudioSource, url: str):
+        self.source = source
+        self.url = url
+        self.started_at = time.monotonic()
+        self.last_frame_at = self.started_at
+        self.frames = 0
+        self._current_error = None
+
+    def read(self) -> bytes:
+        data = self.source.read()
+        if data:
+            self.frames += 1
+            self.last_frame_at = time.monotonic()
+        else:
+            self._current_error = getattr(self.source, '_current_error', None)
+        return data
+
+    def is_opus(self) -> bool:
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
+
+class BroadcastListener(discord.AudioSource):
+    """Audio source for one voice client, reading the shared pipeline buffer with its own cursor.
+
+    Listeners start a few frames behind the newest frame as a jitter buffer and follow the
+    pipeline across failovers. A read that finds the buffer empty is an underrun (the
+    upstream or ffmpeg is behind); reads that start late while reads themselves are fast
+    point at the player thread being starved, e.g. by load in this process.
+    """
+
+    def __init__(self, channel_name: str):
+        self.channel_name = channel_name
+        self.pipeline = None
+        self.cursor = 0
+        self.opus = True
+        self.closed = False
+        self.started_at = time.monotonic()
+        self.frames = 0
+        self.read_histogram = [0] * (len(AUDIO_READ_BUCKETS_MS) + 1)
+        self.read_ms_max = 0.0
+        self.underruns = 0
+        self.late_frames = 0
+        self.missed_frames = 0
+        self.skipped_frames = 0
+        self.last_read_started = None
+
+    def next_frame(self):
+        pipeline = stream_playback['pipeline']
+        if pipeline is not None and pipeline is not self.pipeline:
+            self.pipeline = pipeline
+            self.cursor = max(0, pipeline['next_seq'] - AUDIO_BROADCAST_START_FRAMES)
+            self.opus = pipeline['is_opus']
+        if self.pipeline is None:
+            return None
+        frames = self.pipeline['frames']
+        oldest = self.pipeline['next_seq'] - len(frames)
+        if self.cursor < oldest:
+            self.skipped_frames += oldest - self.cursor
+            self.cursor = oldest
+        if self.cursor >= self.pipeline['next_seq']:
+            return None
+        data = frames[self.cursor - oldest]
+        self.cursor += 1
+        return data
+
+    def read(self) -> bytes:
+        started = time.perf_counter()
+        with audio_broadcast_condition:
+            data = self.next_frame()
+            underrun = data is None and self.pipeline is not None
+            while data is None and not self.closed:
+                # a gap between pipelines (failover) just waits for the next one
+                audio_broadcast_condition.wait(0.5)
+                data = self.next_frame()
+        if self.closed:
+            return b''
+
+        read_ms = (time.perf_counter() - started) * 1000
+        self.frames += 1
+        self.read_histogram[bisect.bisect_left(AUDIO_READ_BUCKETS_MS, read_ms)] += 1
+        self.read_ms_max = max(self.read_ms_max, read_ms)
+        if underrun:
+            self.underruns += 1
+        if self.last_read_started is not None:
+            gap_ms = (started - self.last_read_started) * 1000
+            if gap_ms > AUDIO_LATE_FRAME_MS:
+                self.late_frames += 1
+                self.missed_frames += max(0, int(gap_ms // AUDIO_FRAME_MS) - 1)
+        self.last_read_started = started
+        return data
+
+    def is_opus(self) -> bool:
+        return self.opus
+
+    def close(self):
+        with audio_broadcast_condition:
+            self.closed = True
+            audio_broadcast_condition.notify_all()
+
+class FFmpegStderrMonitor:
+    """stderr pipe for the ffmpeg process: counts upstream reconnects and logs warnings live.
+
+    ffmpeg writes straight into the pipe (fileno() is its write end) and a reader thread
+    handles each line as it arrives. Call release_writer() once ffmpeg has been spawned so
+    the reader sees EOF when ffmpeg exits.
+    """
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.thread = threading.Thread(target=self.run, daemon=True, name='ffmpeg-stderr-reader')
+        self.thread.start()
+
+    def fileno(self) -> int:
+        return self.write_fd
+
+    def release_writer(self):
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+            self.write_fd = None
+
+    def run(self):
+        with open(self.read_fd, 'rb') as pipe:
+            for line in pipe:
+                self.handle_line(line.strip())
+
+    def handle_line(self, line: bytes):
+        if not line:
+            return
+        if FFMPEG_RECONNECT_PATTERN.search(line):
+            stream_playback['upstream_reconnects'] += 1
+        logger.warning(f"ffmpeg: {line.decode('utf-8', errors='replace')}")
+
+def histogram_percentile(counts: list, percentile: float):
+    total = sum(counts)
+    if not total:
+        return None
+    threshold = total * percentile / 100
+    running = 0
+    for index, count in enumerate(counts):
+        running += count
+        if running >= threshold:
+            return AUDIO_READ_BUCKETS_MS[index] if index < len(AUDIO_READ_BUCKETS_MS) else None
+    return None
+
+def read_process_usage(pid: int):
+    """CPU seconds and RSS bytes of a child process from /proc (None off Linux)"""
     try:
-        channel_id = int(config['channel']['id'])
-        raw_url = config['stream'].get('url', '')
-        # Parse playlist if needed, then normalize the URL
-        stream_url = parse_playlist(raw_url)
-        logger.info(f"Using stream URL: {stream_url}")
-        
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            fields = f.read().rsplit(b')', 1)[1].split()
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    return cpu_seconds, rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+def sample_ffmpeg_usage(source: MonitoredAudioSource):
+    process = getattr(source.source, '_process', None)
+    pid = getattr(process, 'pid', None)
+    if not pid:
+        return
+    usage = read_process_usage(pid)
+    if usage is None:
+        return
+    cpu_seconds, rss_bytes = usage
+    now = time.monotonic()
+    previous = stream_playback['ffmpeg_usage']
+    cpu_percent = None
+    if previous and previous['pid'] == pid and now > previous['sampled_at']:
+        cpu_percent = round((cpu_seconds - previous['cpu_seconds']) / (now - previous['sampled_at']) * 100, 1)
+    stream_playback['ffmpeg_usage'] = {
+        'pid': pid,
+        'cpu_seconds': cpu_seconds,
+        'cpu_percent': cpu_percent,
+        'rss_mb': round(rss_bytes / (1024 * 1024), 1),
+        'sampled_at': now,
+    }
+
+def get_listener_telemetry(listener: BroadcastListener) -> dict:
+    histogram = {
+        f"le_{bucket}ms": count
+        for bucket, count in zip(AUDIO_READ_BUCKETS_MS, listener.read_histogram)
+    }
+    histogram['gt_1000ms'] = listener.read_histogram[-1]
+    return {
+        'channel': listener.channel_name,
+        'frames': listener.frames,
+        'uptime_seconds': round(time.monotonic() - listener.started_at, 1),
+        'read_ms_histogram': histogram,
+        'read_ms_p50': histogram_percentile(listener.read_histogram, 50),
+        'read_ms_p99': histogram_percentile(listener.read_histogram, 99),
+        'read_ms_max': round(listener.read_ms_max, 2),
+        'underruns': listener.underruns,
+        'late_frames': listener.late_frames,
+        'missed_frames': listener.missed_frames,
+        'skipped_frames': listener.skipped_frames,
+    }
+
+def get_audio_telemetry() -> dict:
+    source = stream_playback['source']
+    usage = stream_playback['ffmpeg_usage'] or {}
+    return {
+        'upstream_frames': source.frames if source else 0,
+        'upstream_reconnects': stream_playback['upstream_reconnects'],
+        'voice_disconnects': stream_playback['voice_disconnects'],
+        'failovers': stream_playback['failovers'],
+        'ffmpeg': {
+            'pid': usage.get('pid'),
+            'cpu_percent': usage.get('cpu_percent'),
+            'cpu_seconds': round(usage['cpu_seconds'], 2) if usage else None,
+            'rss_mb': usage.get('rss_mb'),
+        },
+        'listeners': [get_listener_telemetry(listener) for listener in stream_playback['listeners'].values()],
+    }
+
+def format_audio_telemetry() -> str:
+    telemetry = get_audio_telemetry()
+    ffmpeg = telemetry['ffmpeg']
+    parts = []
+    for listener in telemetry['listeners']:
+        p99 = listener['read_ms_p99']
+        parts.append(
+            f"{listener['channel']}: {listener['frames']} frames, {listener['late_frames']} late "
+            f"({listener['missed_frames']} missed), {listener['underruns']} underruns, "
+            f"read p99 {'≤' + str(p99) if p99 is not None else '>1000'}ms"
+        )
+    if ffmpeg['pid']:
+        cpu = f"{ffmpeg['cpu_percent']}%" if ffmpeg['cpu_percent'] is not None else 'n/a'
+        parts.append(f"ffmpeg {cpu} CPU, {ffmpeg['rss_mb']} MB RSS")
+    parts.append(
+        f"{telemetry['upstream_reconnects']} upstream reconnects, {telemetry['voice_disconnects']} voice drops, "
+        f"{telemetry['failovers']} failovers"
+    )
+    return '; '.join(parts)
+
+async def gather_stream_candidates() -> list:
+    stream_config = config.get('stream', {})
+    mirrors = stream_config.get('mirrors', [])
+    if not isinstance(mirrors, list):
+        mirrors = []
+    candidates = []
+    for url in [stream_config.get('url', ''), *mirrors]:
+        if not isinstance(url, str) or not url.strip():
+            continue
+        for candidate in await resolve_stream_urls(url):
+            if candidate not in candidates:
+                candidates.append(candidate)
+    return candidates
+
+async def probe_stream_candidate(session: ClientSession, url: str) -> dict:
+    started = time.perf_counter()
+    try:
+        async with session.get(url, headers={'Icy-MetaData': '0'}) as response:
+            response_ms = (time.perf_counter() - started) * 1000
+            response.raise_for_status()
+            if not await response.content.readany():
+                raise ValueError('empty response body')
+            first_byte_ms = (time.perf_counter() - started) * 1000
+            response.close()
+        return {'url': url, 'ok': True, 'response_ms': round(response_ms, 1), 'first_byte_ms': round(first_byte_ms, 1)}
+    except Exception as e:
+        return {'url': url, 'ok': False, 'error': str(e) or e.__class__.__name__}
+
+async def rank_stream_candidates(candidates: list) -> tuple:
+    """Probe candidates concurrently and order them fastest first, unreachable ones last"""
+    if len(candidates) < 2:
+        return list(candidates), []
+    async with ClientSession(timeout=ClientTimeout(total=STREAM_PROBE_TIMEOUT_SECONDS)) as session:
+        probes = await asyncio.gather(*(probe_stream_candidate(session, url) for url in candidates))
+    ranked = sorted(probes, key=lambda probe: (not probe['ok'], probe.get('first_byte_ms', 0.0)))
+    for probe in ranked:
+        if probe['ok']:
+            logger.info(f"Stream probe {probe['url']}: {probe['first_byte_ms']}ms to first byte")
+        else:
+            logger.warning(f"Stream probe {probe['url']} failed: {probe['error']}")
+    return [probe['url'] for probe in ranked], ranked
+
+STREAM_FFMPEG_BEFORE_OPTIONS = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+STREAM_CODEC_PROBE_TIMEOUT_SECONDS = 10
+
+# Source codec per stream URL, so restarts and failovers do not probe the same stream again
+stream_codec_cache = {}
+
+def find_ffprobe_executable(ffmpeg_exec: str):
+    ffmpeg_path = Path(ffmpeg_exec)
+    sibling = ffmpeg_path.with_name(ffmpeg_path.name.replace('ffmpeg', 'ffprobe'))
+    if sibling != ffmpeg_path and sibling.exists():
+        return str(sibling)
+    return shutil.which('ffprobe')
+
+def probe_stream_codec(source: str, executable: str):
+    """FFmpegOpusAudio probe method: ffprobe next to our ffmpeg, with a read timeout for live streams"""
+    ffprobe = find_ffprobe_executable(executable)
+    if not ffprobe:
+        raise FileNotFoundError('ffprobe executable not found')
+    output = subprocess.check_output(
+        [
+            ffprobe, '-v', 'quiet', '-rw_timeout', str(STREAM_CODEC_PROBE_TIMEOUT_SECONDS * 1_000_000),
+            '-print_format', 'json', '-show_streams', '-select_streams', 'a:0', source,
+        ],
+        timeout=STREAM_CODEC_PROBE_TIMEOUT_SECONDS + 5,
+    )
+    streams = json.loads(output or b'{}').get('streams') or [{}]
+    return streams[0].get('codec_name'), None
+
+def get_voice_bitrate_kbps(voice_clients) -> int:
+    # one encode feeds every channel, so it uses the highest channel bitrate
+    channel_bitrate = max(
+        (getattr(getattr(voice_client, 'channel', None), 'bitrate', 0) or 0 for voice_client in voice_clients),
+        default=0,
+    ) or 64000
+    return max(16, min(512, round(channel_bitrate / 1000)))
+
+async def create_stream_audio_source(stream_url: str, ffmpeg_exec: str, voice_clients) -> discord.AudioSource:
+    """Build the ffmpeg source for a stream.
+
+    In the default `opus` mode ffmpeg hands discord.py ready-made Opus packets: an Opus
+    source is copied as-is, anything else is encoded by ffmpeg at the voice channels'
+    bitrate, so no per-frame encoding happens in this process. `stream.audio_mode: pcm`
+    restores the old decode-to-PCM pipeline (encoded separately for each voice client).
+    """
+    if str(config.get('stream', {}).get('audio_mode', 'opus')).strip().lower() == 'pcm':
+        stderr_monitor = FFmpegStderrMonitor()
+        try:
+            return discord.FFmpegPCMAudio(
+                stream_url,
+                executable=ffmpeg_exec,
+                before_options=STREAM_FFMPEG_BEFORE_OPTIONS,
+                options="-vn",
+                stderr=stderr_monitor
+            )
+        finally:
+            stderr_monitor.release_writer()
+
+    codec = stream_codec_cache.get(stream_url)
+    if codec is None:
+        codec, _ = await discord.FFmpegOpusAudio.probe(stream_url, method=probe_stream_codec, executable=ffmpeg_exec)
+        if codec:
+            stream_codec_cache[stream_url] = codec
+    bitrate = get_voice_bitrate_kbps(voice_clients)
+    logger.info(
+        f"Stream codec {codec or 'unknown'}: "
+        + ('copying Opus packets' if codec in ('opus', 'libopus') else f"encoding Opus at {bitrate}kbps in ffmpeg")
+    )
+    stderr_monitor = FFmpegStderrMonitor()
+    try:
+        return discord.FFmpegOpusAudio(
+            stream_url,
+            bitrate=bitrate,
+            codec=codec,
+            executable=ffmpeg_exec,
+            before_options=STREAM_FFMPEG_BEFORE_OPTIONS,
+            options="-vn",
+            stderr=stderr_monitor
+        )
+    finally:
+        # ffmpeg holds its own copy of the write end now
+        stderr_monitor.release_writer()
+
+def get_broadcast_lead(pipeline: dict) -> int:
+    """Frames the pipeline is ahead of its slowest listener (of its start, before any listener joins)"""
+    cursors = [
+        listener.cursor
+        for listener in stream_playback['listeners'].values()
+        if listener.pipeline is pipeline and not listener.closed
+    ]
+    return pipeline['next_seq'] - min(cursors, default=0)
+
+def run_broadcast_pump(pipeline: dict):
+    """Pipeline thread: read the upstream source once and append every frame to the shared buffer.
+
+    Sources can deliver faster than real time (Icecast burst-on-connect, HLS segments, files).
+    Once the pump is AUDIO_BROADCAST_LEAD_FRAMES ahead of the slowest listener it is paced to
+    one frame per AUDIO_FRAME_MS, so the buffer can't wrap past listeners and a short file
+    plays out at its real length instead of ending in seconds.
+    """
+    source = pipeline['source']
+    frame_seconds = AUDIO_FRAME_MS / 1000
+    next_due = time.monotonic()
+    try:
+        while not pipeline['stopped']:
+            data = source.read()
+            if not data:
+                break
+            with audio_broadcast_condition:
+                lead = get_broadcast_lead(pipeline)
+            now = time.monotonic()
+            if lead > AUDIO_BROADCAST_LEAD_FRAMES:
+                if next_due > now:
+                    time.sleep(next_due - now)
+                next_due = max(next_due, now) + frame_seconds
+            else:
+                next_due = now
+            with audio_broadcast_condition:
+                pipeline['frames'].append(data)
+                pipeline['next_seq'] += 1
+                audio_broadcast_condition.notify_all()
+    except Exception as e:
+        source._current_error = e
+    finally:
+        source.cleanup()
+    if not pipeline['stopped']:
+        error = source._current_error
+        if error:
+            logger.error(f"Player error: {error}")
+        reason = f"player error: {error}" if error else 'stream ended'
+        bot.loop.call_soon_threadsafe(schedule_stream_failover, pipeline['generation'], reason)
+
+async def start_stream_pipeline():
+    stream_url = stream_playback['candidates'][stream_playback['index']]
+    generation = stream_playback['generation']
+    audio_source = await create_stream_audio_source(
+        stream_url, stream_playback['ffmpeg_exec'], stream_playback['voice_clients'].values()
+    )
+    if generation != stream_playback['generation']:
+        # playback was stopped or restarted while the codec was being probed
+        audio_source.cleanup()
+        return
+    source = MonitoredAudioSource(audio_source, stream_url)
+    pipeline = {
+        'source': source,
+        'is_opus': source.is_opus(),
+        'frames': deque(maxlen=AUDIO_BROADCAST_BUFFER_FRAMES),
+        'next_seq': 0,
+        'generation': generation,
+        'stopped': False,
+    }
+    with audio_broadcast_condition:
+        stream_playback['pipeline'] = pipeline
+        stream_playback['source'] = source
+    threading.Thread(target=run_broadcast_pump, args=(pipeline,), daemon=True, name='toast-audio-pump').start()
+    logger.info(f"Using stream URL: {stream_url}")
+
+def stop_stream_pipeline():
+    pipeline = stream_playback['pipeline']
+    with audio_broadcast_condition:
+        stream_playback['pipeline'] = None
+        stream_playback['source'] = None
+    if pipeline is None:
+        return None
+    pipeline['stopped'] = True
+    return pipeline['source']
+
+def play_broadcast_listener(voice_client):
+    channel_id = voice_client.channel.id
+    previous = stream_playback['listeners'].pop(channel_id, None)
+    if previous is not None:
+        previous.close()
+    if voice_client.is_playing():
+        voice_client.stop()
+    listener = BroadcastListener(voice_client.channel.name)
+    stream_playback['listeners'][channel_id] = listener
+    voice_client.play(listener, after=lambda e: logger.error(f"Player error in {listener.channel_name}: {e}") if e else None)
+
+def schedule_stream_failover(generation: int, reason: str):
+    if not stream_playback['active'] or generation != stream_playback['generation']:
+        return
+    task = stream_playback['failover_task']
+    if task is not None and not task.done():
+        return
+    stream_playback['failover_task'] = asyncio.create_task(fail_over_stream(reason))
+
+def stop_stream_playback():
+    """Mark playback as intentionally stopped so the pipeline ending does not fail over"""
+    stream_playback['active'] = False
+    stream_playback['generation'] += 1
+    source = stop_stream_pipeline()
+    if source is not None:
+        source.cleanup()
+    for listener in stream_playback['listeners'].values():
+        listener.close()
+    stream_playback['listeners'] = {}
+    stream_playback['voice_clients'] = {}
+    stream_playback['voice_connected'] = {}
+
+async def fail_over_stream(reason: str):
+    stream_playback['generation'] += 1
+    generation = stream_playback['generation']
+    stream_playback['failovers'] += 1
+    stream_playback['last_failover_reason'] = reason
+    source = stop_stream_pipeline()
+    logger.warning(f"Stream {source.url if source else 'unknown'} failed ({reason}), failing over")
+    if source is not None:
+        if source.frames:
+            stream_playback['failed_rounds'] = 0
+        # a stalled ffmpeg leaves the pump thread blocked in read(); killing it unblocks it
+        await asyncio.to_thread(source.cleanup)
+
+    await asyncio.sleep(STREAM_FAILOVER_DELAY_SECONDS)
+    if not stream_playback['active'] or generation != stream_playback['generation']:
+        return
+    if not any(voice_client.is_connected() for voice_client in stream_playback['voice_clients'].values()):
+        await auto_play_stream()
+        return
+
+    stream_playback['index'] += 1
+    if stream_playback['index'] >= len(stream_playback['candidates']):
+        # every candidate has failed once: back off, then re-resolve and re-probe
+        stream_playback['failed_rounds'] += 1
+        await asyncio.sleep(min(STREAM_RETRY_MAX_SECONDS, STREAM_RETRY_ROUND_SECONDS * stream_playback['failed_rounds']))
+        if not stream_playback['active'] or generation != stream_playback['generation']:
+            return
+        candidates, probes = await rank_stream_candidates(await gather_stream_candidates())
+        if not stream_playback['active'] or generation != stream_playback['generation']:
+            return
+        if not candidates:
+            logger.error("No stream URL configured, stopping playback")
+            stop_stream_playback()
+            return
+        stream_playback.update(candidates=candidates, probes=probes, index=0)
+
+    try:
+        await start_stream_pipeline()
+    except Exception as e:
+        logger.error(f"Failed to play stream: {e}")
+        # scheduled for after this failover task has finished so it is not treated as in flight
+        asyncio.get_running_loop().call_soon(
+            schedule_stream_failover, stream_playback['generation'], f"failed to start: {e}"
+        )
+
+@tasks.loop(seconds=2)
+async def stream_watchdog():
+    """Sample ffmpeg usage, restart stopped listeners, and fail over when the stream stops producing audio frames"""
+    if not stream_playback['active']:
+        return
+    for channel_id, voice_client in stream_playback['voice_clients'].items():
+        connected = voice_client.is_connected()
+        if stream_playback['voice_connected'].get(channel_id) and not connected:
+            stream_playback['voice_disconnects'] += 1
+        stream_playback['voice_connected'][channel_id] = connected
+        if connected and not voice_client.is_playing():
+            logger.warning(f"Voice player in {voice_client.channel.name} stopped, restarting it")
+            play_broadcast_listener(voice_client)
+
+    source = stream_playback['source']
+    if source is None:
+        return
+    sample_ffmpeg_usage(source)
+    limit = STREAM_START_TIMEOUT_SECONDS if source.frames == 0 else STREAM_STALL_SECONDS
+    silent_for = time.monotonic() - source.last_frame_at
+    if silent_for > limit:
+        schedule_stream_failover(stream_playback['generation'], f"no audio for {silent_for:.0f}s")
+
+def get_stream_playback_stats() -> dict:
+    source = stream_playback['source']
+    return {
+        'active': stream_playback['active'],
+        'url': source.url if source else None,
+        'channels': [listener.channel_name for listener in stream_playback['listeners'].values()],
+        'candidate_index': stream_playback['index'],
+        'candidates': len(stream_playback['candidates']),
+        'probes': stream_playback['probes'],
+        'failovers': stream_playback['failovers'],
+        'last_failover_reason': stream_playback['last_failover_reason'],
+        'audio': get_audio_telemetry(),
+    }
+
+def get_voice_channel_ids() -> list:
+    """The primary channel.id followed by any extra channel.ids, without duplicates"""
+    channel_config = config.get('channel', {})
+    extra_ids = channel_config.get('ids', [])
+    if not isinstance(extra_ids, list):
+        extra_ids = []
+    channel_ids = []
+    for raw_id in [channel_config.get('id'), *extra_ids]:
+        try:
+            channel_id = int(raw_id)
+        except (TypeError, ValueError):
+            continue
+        if channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    return channel_ids
+
+def find_voice_channels() -> list:
+    channels = []
+    guild_ids = set()
+    for channel_id in get_voice_channel_ids():
         channel = bot.get_channel(channel_id)
         if not channel:
             logger.error(f"Voice channel {channel_id} not found")
-            return
-        
+            continue
         if not isinstance(channel, discord.VoiceChannel):
             logger.error(f"Channel {channel_id} is not a voice channel")
+            continue
+        if channel.guild.id in guild_ids:
+            # Discord allows one voice connection per guild
+            logger.error(f"Skipping voice channel {channel.name}: already playing in another channel of that server")
+            continue
+        guild_ids.add(channel.guild.id)
+        channels.append(channel)
+    return channels
+
+async def join_broadcast_channel(channel):
+    # Disconnect if already connected
+    for vc in bot.voice_clients:
+        if vc.guild == channel.guild:
+            await vc.disconnect()
+
+    # Connect to the voice channel
+    voice_client = await channel.connect()
+    logger.info(f"Connected to voice channel: {channel.name}")
+    stream_playback['voice_clients'][channel.id] = voice_client
+    return voice_client
+
+async def auto_play_stream():
+    """Connect to the voice channels and play the m3u stream into all of them"""
+    try:
+        # Resolve playlists/mirrors and probe them while the voice connections are set up
+        stop_stream_playback()
+        candidates = await gather_stream_candidates()
+        if not candidates:
+            logger.error("No stream URL configured")
             return
-        
-        # Disconnect if already connected
-        for vc in bot.voice_clients:
-            if vc.channel == channel:
-                await vc.disconnect()
-        
-        # Connect to the voice channel
-        voice_client = await channel.connect()
-        logger.info(f"Connected to voice channel: {channel.name}")
-        
-        # Play the m3u stream
-        # Using FFmpeg to stream the URL
+        ranking = asyncio.create_task(rank_stream_candidates(candidates))
+
+        channels = find_voice_channels()
+        if not channels:
+            ranking.cancel()
+            return
+
+        for channel in channels:
+            try:
+                await join_broadcast_channel(channel)
+            except Exception as e:
+                logger.error(f"Failed to join voice channel {channel.name}: {e}")
+        if not stream_playback['voice_clients']:
+            ranking.cancel()
+            return
+
+        # One ffmpeg process decodes the stream once and feeds every channel
         ffmpeg_exec = config.get('stream', {}).get('ffmpeg_executable') or FFMPEG_EXE
         if not ffmpeg_exec:
+            ranking.cancel()
             logger.error('ffmpeg executable not found. Aborting playback. Ensure ffmpeg is installed and on PATH or set stream.ffmpeg_executable in config.')
             return
-        audio_source = discord.FFmpegPCMAudio(
-            stream_url,
-            executable=ffmpeg_exec,
-            before_options="-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
-            options="-vn -b:a 192k"
-        )
-        
-        voice_client.play(
-            audio_source,
-            after=lambda e: logger.error(f"Player error: {e}") if e else None
+
+        candidates, probes = await ranking
+        stream_playback.update(
+            active=True,
+            candidates=candidates,
+            probes=probes,
+            index=0,
+            failed_rounds=0,
+            ffmpeg_exec=ffmpeg_exec,
         )
-        
-        logger.info(f"Started playing stream: {config['stream']['name']}")
-        
+        await start_stream_pipeline()
+        for voice_client in stream_playback['voice_clients'].values():
+            play_broadcast_listener(voice_client)
+
+        logger.info(f"Started playing stream: {config['stream']['name']} in {len(stream_playback['listeners'])} channel(s)")
+
     except Exception as e:
         logger.error(f"Failed to play stream: {e}")
 
+async def rejoin_missing_channels():
+    """Rejoin configured channels the bot dropped out of, without restarting the others"""
+    if not stream_playback['active']:
+        await auto_play_stream()
+        return
+    for channel in find_voice_channels():
+        if any(member.id == bot.user.id for member in channel.members):
+            continue
+        logger.warning(f"Bot disconnected from {channel.name}, attempting to rejoin...")
+        try:
+            play_broadcast_listener(await join_broadcast_channel(channel))
+        except Exception as e:
+            logger.error(f"Failed to rejoin voice channel {channel.name}: {e}")
+
 @bot.tree.command(name="play", description="Start the toast radio stream")
 async def slash_play(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
@@ -1701,6 +5272,7 @@ async def slash_play(interaction: discord.Interaction):
 @bot.tree.command(name="stop", description="Stop playback and disconnect")
 async def slash_stop(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
+    stop_stream_playback()
     for vc in bot.voice_clients:
         await vc.disconnect()
     await interaction.followup.send("⏹️ Stopped playback", ephemeral=True)
@@ -1709,12 +5281,243 @@ async def slash_stop(interaction: discord.Interaction):
 async def slash_status(interaction: discord.Interaction):
     voice_clients = bot.voice_clients
     if voice_clients:
-        vc = voice_clients[0]
-        is_playing = vc.is_playing()
-        status_str = f"▶️ Playing {config['stream']['name']}" if is_playing else "⏸️ Connected but not playing"
+        playing = sum(1 for vc in voice_clients if vc.is_playing())
+        status_str = f"▶️ Playing {config['stream']['name']}" if playing else "⏸️ Connected but not playing"
+        if len(voice_clients) > 1:
+            status_str += f" ({playing}/{len(voice_clients)} channels)"
     else:
         status_str = "⭕ Disconnected"
-    await interaction.response.send_message(f"Bot Status: {status_str}", ephemeral=True)
+    message = f"Bot Status: {status_str}"
+    if stream_playback['active']:
+        message += f"\nAudio: {format_audio_telemetry()}"
+    await interaction.response.send_message(message, ephemeral=True)
+
+DM_CAMPAIGN_PROGRESS_SECONDS = 3.0
+DM_CAMPAIGN_REPORT_MAX_FAILURES = 15
+
+# /sendmsg role DMs run as background campaigns. Every recipient's outcome is stored in SQLite
+# as it happens, so a restart picks up the recipients that were still pending.
+dm_campaign_store = {
+    'connection': None,
+    'running': {},
+}
+
+DM_CAMPAIGN_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS dm_campaigns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        role_name TEXT NOT NULL,
+        requested_by TEXT NOT NULL,
+        message TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        finished_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dm_campaign_recipients (
+        campaign_id INTEGER NOT NULL,
+        discord_user_id TEXT NOT NULL,
+        label TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        error TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (campaign_id, discord_user_id)
+    ) WITHOUT ROWID
+    """,
+)
+
+def get_dm_campaign_db() -> sqlite3.Connection:
+    connection = dm_campaign_store['connection']
+    if connection is not None:
+        return connection
+
+    connection = sqlite3.connect(str(dm_campaign_db_path), isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    for statement in DM_CAMPAIGN_SCHEMA:
+        connection.execute(statement)
+    dm_campaign_store['connection'] = connection
+    return connection
+
+def close_dm_campaign_db():
+    connection = dm_campaign_store['connection']
+    if connection is None:
+        return
+    dm_campaign_store['connection'] = None
+    try:
+        connection.close()
+    except Exception as e:
+        logger.warning(f"Failed to close DM campaign database: {e}")
+
+def create_dm_campaign(guild, role, requested_by, message: str, recipients: list) -> int:
+    connection = get_dm_campaign_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        cursor = connection.execute(
+            """
+            INSERT INTO dm_campaigns (guild_id, role_id, role_name, requested_by, message, status, created_at)
+            VALUES (?, ?, ?, ?, ?, 'running', ?)
+            """,
+            (str(guild.id), str(role.id), role.name, str(requested_by.id), message, time.time()),
+        )
+        campaign_id = cursor.lastrowid
+        connection.executemany(
+            'INSERT OR IGNORE INTO dm_campaign_recipients (campaign_id, discord_user_id, label) VALUES (?, ?, ?)',
+            [(campaign_id, str(member.id), str(member)) for member in recipients],
+        )
+    return campaign_id
+
+def get_dm_campaign(campaign_id: int):
+    return get_dm_campaign_db().execute('SELECT * FROM dm_campaigns WHERE id = ?', (campaign_id,)).fetchone()
+
+def get_dm_campaign_counts(campaign_id: int) -> dict:
+    counts = {'pending': 0, 'sent': 0, 'failed': 0}
+    for row in get_dm_campaign_db().execute(
+        'SELECT status, COUNT(*) AS total FROM dm_campaign_recipients WHERE campaign_id = ? GROUP BY status',
+        (campaign_id,),
+    ):
+        counts[row['status']] = row['total']
+    return counts
+
+def get_pending_campaign_recipients(campaign_id: int) -> list:
+    return [
+        row['discord_user_id']
+        for row in get_dm_campaign_db().execute(
+            "SELECT discord_user_id FROM dm_campaign_recipients WHERE campaign_id = ? AND status = 'pending'",
+            (campaign_id,),
+        )
+    ]
+
+def record_campaign_recipient(campaign_id: int, discord_user_id: str, status: str, error: str = ''):
+    get_dm_campaign_db().execute(
+        'UPDATE dm_campaign_recipients SET status = ?, error = ? WHERE campaign_id = ? AND discord_user_id = ?',
+        (status, error, campaign_id, discord_user_id),
+    )
+
+def finish_dm_campaign(campaign_id: int):
+    get_dm_campaign_db().execute(
+        "UPDATE dm_campaigns SET status = 'finished', finished_at = ? WHERE id = ?",
+        (time.time(), campaign_id),
+    )
+
+def format_dm_campaign_report(campaign, counts: dict, finished: bool) -> str:
+    if not finished:
+        done = counts['sent'] + counts['failed']
+        total = done + counts['pending']
+        return (
+            f"sending to `{campaign['role_name']}`: `{done}/{total}` done, "
+            f"`{counts['sent']}` sent" + (f", `{counts['failed']}` failed" if counts['failed'] else "") + "..."
+        )
+
+    report = f"done. sent `{counts['sent']}` dm(s) to `{campaign['role_name']}`" + (
+        f", `{counts['failed']}` failed." if counts['failed'] else "."
+    )
+    if counts['failed']:
+        failures = get_dm_campaign_db().execute(
+            """
+            SELECT discord_user_id, label, error FROM dm_campaign_recipients
+            WHERE campaign_id = ? AND status = 'failed' ORDER BY label LIMIT ?
+            """,
+            (campaign['id'], DM_CAMPAIGN_REPORT_MAX_FAILURES),
+        ).fetchall()
+        lines = [f"- {row['label']} (`{row['discord_user_id']}`): {row['error'] or 'unknown error'}" for row in failures]
+        if counts['failed'] > len(failures):
+            lines.append(f"- ...and `{counts['failed'] - len(failures)}` more")
+        report += "\nfailed:\n" + "\n".join(lines)
+    return report[:1900]
+
+async def edit_dm_campaign_progress(progress_message, content: str):
+    if progress_message is None:
+        return None
+    try:
+        await progress_message.edit(content=content)
+        return progress_message
+    except Exception as e:
+        # the interaction token only lasts 15 minutes; the final report falls back to a DM
+        logger.info(f"Stopped editing /sendmsg progress message: {e}")
+        return None
+
+async def run_dm_campaign(campaign_id: int, members: dict = None, progress_message=None):
+    campaign = get_dm_campaign(campaign_id)
+    pending = deque(get_pending_campaign_recipients(campaign_id))
+    members = members or {}
+
+    async def send_next():
+        while pending:
+            discord_user_id = pending.popleft()
+            target = members.get(discord_user_id, discord_user_id)
+            try:
+                await send_logged_dm(target, campaign['message'], DM_PRIORITY_BULK)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to send role DM to {target} ({discord_user_id}): {e}")
+                error = e.__class__.__name__ if not str(e) else f"{e.__class__.__name__}: {str(e)[:200]}"
+                record_campaign_recipient(campaign_id, discord_user_id, 'failed', error)
+            else:
+                record_campaign_recipient(campaign_id, discord_user_id, 'sent')
+
+    senders = [asyncio.create_task(send_next()) for _ in range(get_dm_dispatch_config()['concurrency'])]
+    try:
+        last_report = ''
+        while not all(sender.done() for sender in senders):
+            await asyncio.wait(senders, timeout=DM_CAMPAIGN_PROGRESS_SECONDS)
+            report = format_dm_campaign_report(campaign, get_dm_campaign_counts(campaign_id), False)
+            if progress_message is not None and report != last_report:
+                progress_message = await edit_dm_campaign_progress(progress_message, report)
+                last_report = report
+        for sender in senders:
+            sender.result()
+    finally:
+        for sender in senders:
+            sender.cancel()
+
+    finish_dm_campaign(campaign_id)
+    report = format_dm_campaign_report(campaign, get_dm_campaign_counts(campaign_id), True)
+    if await edit_dm_campaign_progress(progress_message, report) is None:
+        try:
+            await send_logged_dm(campaign['requested_by'], f"/sendmsg report:\n{report}", DM_PRIORITY_INTERACTIVE)
+        except Exception as e:
+            logger.warning(f"Failed to DM /sendmsg report for campaign {campaign_id}: {e}")
+    logger.info(f"DM campaign {campaign_id} finished: {report.splitlines()[0]}")
+
+def start_dm_campaign(campaign_id: int, members: dict = None, progress_message=None):
+    running = dm_campaign_store['running'].get(campaign_id)
+    if running is not None and not running.done():
+        return running
+
+    task = asyncio.create_task(run_dm_campaign(campaign_id, members, progress_message))
+    dm_campaign_store['running'][campaign_id] = task
+
+    def forget_campaign(completed_task: asyncio.Task):
+        dm_campaign_store['running'].pop(campaign_id, None)
+        if not completed_task.cancelled() and completed_task.exception() is not None:
+            logger.error(f"DM campaign {campaign_id} crashed: {completed_task.exception()}")
+
+    task.add_done_callback(forget_campaign)
+    return task
+
+def resume_dm_campaigns():
+    try:
+        campaign_ids = [
+            row['id'] for row in get_dm_campaign_db().execute("SELECT id FROM dm_campaigns WHERE status = 'running'")
+        ]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load unfinished DM campaigns: {e}")
+        return
+    for campaign_id in campaign_ids:
+        if campaign_id not in dm_campaign_store['running']:
+            logger.info(f"Resuming DM campaign {campaign_id}")
+            start_dm_campaign(campaign_id)
+
+def get_dm_campaign_stats() -> dict:
+    return {
+        str(campaign_id): get_dm_campaign_counts(campaign_id)
+        for campaign_id in list(dm_campaign_store['running'])
+    }
 
 @bot.tree.command(name="sendmsg", description="DM everyone in a role")
 @app_commands.default_permissions(administrator=True)
@@ -1745,27 +5548,37 @@ async def slash_sendmsg(interaction: discord.Interaction, role_id: str, message:
         await interaction.followup.send("that role has no non-bot members to message.", ephemeral=True)
         return
 
-    sent_count = 0
-    failed_count = 0
-    for member in recipients:
-        try:
-            await send_logged_dm(member, message)
-            sent_count += 1
-        except Exception as e:
-            failed_count += 1
-            logger.warning(f"Failed to send role DM to {member} ({member.id}): {e}")
-
-    await interaction.followup.send(
-        f"done. sent `{sent_count}` dm(s) to `{role.name}`" + (f", `{failed_count}` failed." if failed_count else "."),
-        ephemeral=True
+    campaign_id = create_dm_campaign(interaction.guild, role, interaction.user, message, recipients)
+    progress_message = await interaction.followup.send(
+        f"sending to `{role.name}`: `0/{len(recipients)}` done...",
+        ephemeral=True,
+        wait=True,
     )
+    start_dm_campaign(campaign_id, {str(member.id): member for member in recipients}, progress_message)
 
 async def status_handler(request):
     return web.json_response({
         'online': bot_online and not bot.is_closed(),
-        'stream_name': config.get('stream', {}).get('name', 'Unknown Stream')
+        'stream_name': config.get('stream', {}).get('name', 'Unknown Stream'),
+        'groq_http': get_groq_http_stats(),
+        'groq_resilience': get_groq_resilience_stats(),
+        'groq_routing': get_groq_routing_stats(),
+        'groq_hedging': get_groq_hedging_stats(),
+        'vision_cache': get_vision_cache_stats(),
+        'prompt_cache': get_prompt_cache_stats(),
+        'playlist_cache': get_playlist_cache_stats(),
+        'stream': get_stream_playback_stats(),
+        'dm_dispatch': get_dm_dispatch_stats(),
+        'notification_digests': get_notification_digest_stats(),
+        'dm_campaigns': get_dm_campaign_stats(),
     })
 
+async def metrics_handler(request):
+    return web.Response(
+        body=render_metrics().encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'},
+    )
+
 async def find_registered_role():
     try:
         channel_id = int(config['channel']['id'])
@@ -1825,12 +5638,15 @@ async def link_discord_handler(request):
             "- Someone replies to one of your /feed/ posts\n"
             "- There's an important update you'll want to be notified of\n\n"
             "If you need to edit any account information, speak to <@609510856811741428>.\n"
-            "Until then, sit back and enjoy the silence. I'll be in contact."
+            "Until then, sit back and enjoy the silence. I'll be in contact.",
+            DM_PRIORITY_INTERACTIVE,
         )
     except Exception as e:
         logger.warning(f"Failed to complete discord linking for {discord_user_id}: {e}")
         return web.json_response({'ok': False, 'error': 'failed to assign registered role or send confirmation dm'}, status=500)
 
+    apply_discord_link_to_accounts_cache(site_username, discord_user_id)
+
     return web.json_response({
         'ok': True,
         'guild_id': str(guild.id),
@@ -1877,7 +5693,8 @@ async def send_account_invite_handler(request):
             f"> **password:** ||{site_password}||\n\n"
             "**enjoy using your account!**\n"
             "i'll be here to send you messages whenever you get post replies, or if anything else demands your attention.\n"
-            "see you around, and stay safe!"
+            "see you around, and stay safe!",
+            DM_PRIORITY_INTERACTIVE,
         )
     except Exception as e:
         logger.warning(f"Failed to send account invite DM to {discord_user_id}: {e}")
@@ -1903,11 +5720,13 @@ async def send_message_handler(request):
         return web.json_response({'ok': False, 'error': 'message cannot be empty'}, status=400)
 
     try:
-        user, sent_message = await send_logged_dm(discord_user_id, message)
+        user, sent_message = await send_logged_dm(discord_user_id, message, DM_PRIORITY_INTERACTIVE)
     except Exception as e:
         logger.warning(f"Failed to send manual DM to {discord_user_id}: {e}")
         return build_dm_error_response(e, 'send the DM')
 
+    # the inbox redirects and re-reads the JSON export right away, so skip the debounce
+    flush_dm_history_export()
     return web.json_response({
         'ok': True,
         'discord_user_id': str(user.id),
@@ -1938,6 +5757,7 @@ async def set_ai_mute_handler(request):
         if active_task and not active_task.done():
             active_task.cancel()
 
+    flush_dm_history_export()
     return web.json_response({
         'ok': True,
         'discord_user_id': discord_user_id,
@@ -2006,6 +5826,7 @@ async def contact_notify_handler(request):
 
 async def start_status_server():
     status_app.router.add_get('/status', status_handler)
+    status_app.router.add_get('/metrics', metrics_handler)
     status_app.router.add_post('/link-discord', link_discord_handler)
     status_app.router.add_post('/send-account-invite', send_account_invite_handler)
     status_app.router.add_post('/messages/send', send_message_handler)
@@ -2013,9 +5834,9 @@ async def start_status_server():
     status_app.router.add_post('/contact/notify', contact_notify_handler)
     runner = web.AppRunner(status_app)
     await runner.setup()
-    site = web.TCPSite(runner, '127.0.0.1', 8765)
+    site = web.TCPSite(runner, STATUS_SERVER_HOST, STATUS_SERVER_PORT)
     await site.start()
-    logger.info('Local status server started on http://127.0.0.1:8765/status')
+    logger.info(f"Local status server started on http://{STATUS_SERVER_HOST}:{STATUS_SERVER_PORT}/status")
 
 
 async def main():
@@ -2027,18 +5848,21 @@ async def main():
 
     # Start local status server before running the bot
     await start_status_server()
+    await start_groq_http_client()
 
     # Start monitoring tasks
-    config_monitor.start()
+    start_config_watcher()
     heartbeat.start()
+    stream_watchdog.start()
     feed_notifications_monitor.start()
     
     # Register signal handler for graceful shutdown
     def signal_handler(signum, frame):
         logger.info("Received SIGINT (Ctrl+C), shutting down gracefully...")
         # Cancel tasks
-        config_monitor.cancel()
+        stop_config_watcher()
         heartbeat.cancel()
+        stream_watchdog.cancel()
         feed_notifications_monitor.cancel()
         # Close the bot
         if bot.is_closed():
@@ -2060,11 +5884,21 @@ async def shutdown_bot():
     try:
         global bot_online
         logger.info("Disconnecting from voice channels...")
+        stop_stream_playback()
         for vc in bot.voice_clients:
             if vc.is_playing():
                 vc.stop()
             await vc.disconnect()
         bot_online = False
+        for campaign_task in list(dm_campaign_store['running'].values()):
+            campaign_task.cancel()
+        flush_dm_history_export()
+        close_dm_history_db()
+        close_notify_state_db()
+        close_dm_campaign_db()
+        close_feed_watcher()
+        await close_groq_http_client()
+        await close_vision_http_client()
         logger.info("Closing bot connection...")
         await bot.close()
     except Exception as e:
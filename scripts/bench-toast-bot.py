@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the toast Discord bot (others/toast-discord-bot/bot/main.py).
+
+Builds a synthetic site tree (data/, a copy of the wiki and of the bot) at a configurable
+scale, imports the bot from that tree so every find_* helper resolves the synthetic data,
+times the hot paths and prints the results as JSON.
+
+Run it with the bot's Python environment (discord.py + aiohttp installed):
+
+  others/toast-discord-bot/bot/venv/bin/python scripts/bench-toast-bot.py --posts 20000 --output bench.json
+  others/toast-discord-bot/bot/venv/bin/python scripts/bench-toast-bot.py --compare bench.json
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BOT_DIR = REPO_ROOT / 'others' / 'toast-discord-bot' / 'bot'
+
+WORDS = (
+    'toast fridge radio feed post reply music stream beat synth loop bass night coffee '
+    'project website theme code bug fix update draw photo gallery journal guestbook '
+    'discord server friend today tomorrow weekend listen track mix vocal sample drum'
+).split()
+
+SITE_QUESTION = 'how do feed replies and mentions work on fridg3.org? can toast dm me about them?'
+
+LONG_REPLY = ' '.join(
+    [
+        'yeah that track is honestly so good, the bass in the second half just carries it.',
+        'i had it on loop all night while fixing my theme.',
+        'you should post the project file on the feed so people can remix it!',
+        '',
+        'also did you see the new gallery page? the layout is way cleaner now.',
+        'anyway let me know when the next radio mix goes live, i will be listening.',
+    ] * 6
+)
+
+
+def random_body(rng: random.Random, usernames: list, mention_rate: float = 0.2) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 60))]
+    if rng.random() < mention_rate:
+        words.insert(rng.randrange(len(words)), '@' + rng.choice(usernames))
+    if rng.random() < 0.15:
+        words.append('[url=https://example.com/' + rng.choice(WORDS) + ']' + rng.choice(WORDS) + '[/url]')
+    if rng.random() < 0.1:
+        words.append('[img]https://example.com/' + rng.choice(WORDS) + '.png[/img]')
+    if rng.random() < 0.1:
+        words.append('https://fridg3.org/feed/posts/' + str(rng.randint(1, 99999)))
+    return ' '.join(words)
+
+
+def generate_data_tree(root: Path, args) -> dict:
+    """Write a synthetic data/ tree plus copies of the bot and wiki under root"""
+    rng = random.Random(args.seed)
+    data_dir = root / 'data'
+    posts_dir = data_dir / 'feed'
+    replies_dir = posts_dir / 'replies'
+    etc_dir = data_dir / 'etc'
+    accounts_dir = data_dir / 'accounts'
+    for directory in (replies_dir, etc_dir, accounts_dir):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    usernames = [f"user{index}" for index in range(args.accounts)]
+    accounts = [
+        {
+            'username': username,
+            'discordUserId': str(100000000000000000 + index) if index % 3 == 0 else '',
+        }
+        for index, username in enumerate(usernames)
+    ]
+    (accounts_dir / 'accounts.json').write_text(json.dumps({'accounts': accounts}), encoding='utf-8')
+
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    post_ids = []
+    for index in range(args.posts):
+        post_id = f"{index:08d}"
+        post_ids.append(post_id)
+        posted_at = started + timedelta(minutes=index * 7)
+        (posts_dir / f"{post_id}.txt").write_text(
+            f"@{rng.choice(usernames)}\n{posted_at:%Y-%m-%d %H:%M}\n{random_body(rng, usernames)}",
+            encoding='utf-8',
+        )
+
+    for post_id in rng.sample(post_ids, min(args.reply_files, len(post_ids))):
+        replies = [
+            {
+                'id': f"r{post_id}{reply_index}",
+                'username': rng.choice(usernames),
+                'date': f"{started + timedelta(minutes=int(post_id) * 7 + reply_index):%Y-%m-%d %H:%M}",
+                'body': random_body(rng, usernames),
+            }
+            for reply_index in range(rng.randint(1, args.replies_per_file * 2 - 1))
+        ]
+        (replies_dir / f"{post_id}.json").write_text(json.dumps({'replies': replies}), encoding='utf-8')
+
+    threads = {}
+    for user_index in range(args.dm_users):
+        discord_user_id = str(200000000000000000 + user_index)
+        messages = [
+            {
+                'id': f"{discord_user_id}{message_index}",
+                'direction': 'inbound' if message_index % 2 == 0 else 'outbound',
+                'content': random_body(rng, usernames, mention_rate=0.0),
+                'timestamp': (started + timedelta(minutes=message_index)).isoformat(),
+            }
+            for message_index in range(args.dm_messages)
+        ]
+        threads[discord_user_id] = {
+            'discord_user_id': discord_user_id,
+            'username': f"dm{user_index}",
+            'display_name': f"DM {user_index}",
+            'updated_at': started.isoformat(),
+            'messages': messages,
+        }
+    (etc_dir / 'toast-dm-history.json').write_text(json.dumps({'threads': threads}), encoding='utf-8')
+
+    (etc_dir / 'toast.json').write_text(json.dumps({
+        'bot': {'token': 'benchmark'},
+        'stream': {'name': 'benchmark', 'url': 'http://127.0.0.1/'},
+        'channel': {'id': '1'},
+        'groq': {'api_key': 'benchmark', 'warmup_connection': False},
+    }), encoding='utf-8')
+
+    shutil.copytree(REPO_ROOT / 'wiki', root / 'wiki')
+    frdgbeats_wiki = REPO_ROOT / 'tools' / 'frdgbeats' / 'wiki'
+    if frdgbeats_wiki.exists():
+        shutil.copytree(frdgbeats_wiki, root / 'tools' / 'frdgbeats' / 'wiki')
+    bot_copy = root / 'others' / 'toast-discord-bot' / 'bot'
+    bot_copy.mkdir(parents=True)
+    shutil.copy2(BOT_DIR / 'main.py', bot_copy / 'main.py')
+    shutil.copy2(BOT_DIR / 'personality.json', bot_copy / 'personality.json')
+
+    return {
+        'usernames': usernames,
+        'post_ids': post_ids,
+        'linked_user_id': accounts[0]['discordUserId'],
+        'posts_dir': posts_dir,
+        'bot_path': bot_copy / 'main.py',
+    }
+
+
+def import_bot(bot_path: Path):
+    spec = importlib.util.spec_from_file_location('toast_bot_benchmark', bot_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        'iterations': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'median_ms': round(statistics.median(ordered) * 1000, 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+async def time_case(fn, repeat: int, setup=None, warmup: int = 1) -> dict:
+    samples = []
+    for iteration in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+async def run_benchmarks(bot, fixture: dict, args) -> dict:
+    results = {}
+    rng = random.Random(args.seed + 1)
+
+    async def skip_dm(discord_user_id, message):
+        return True
+
+    # digests that come due during a long run must not try to reach Discord
+    bot.send_dm_to_user = skip_dm
+
+    def reset_feed_index():
+        bot.feed_index.update(
+            posts={}, replies={}, post_ids={}, post_replies={}, removed_posts={}, removed_replies={}
+        )
+        bot.feed_watch_state['full_scan_due'] = True
+
+    results['load_feed_posts_cold'] = await time_case(
+        bot.load_feed_posts, max(1, args.repeat // 5), setup=reset_feed_index, warmup=0
+    )
+    results['load_feed_posts_warm'] = await time_case(bot.load_feed_posts, args.repeat)
+    results['load_feed_replies_warm'] = await time_case(bot.load_feed_replies, args.repeat)
+
+    # first pass only marks existing keys as delivered, like a fresh install
+    results['feed_monitor_initial_pass'] = await time_case(
+        bot.feed_notifications_monitor.coro, 1, warmup=0
+    )
+    results['feed_monitor_idle_pass'] = await time_case(bot.feed_notifications_monitor.coro, args.repeat)
+
+    def touch_posts():
+        for post_id in rng.sample(fixture['post_ids'], min(args.changed_posts, len(fixture['post_ids']))):
+            post_path = fixture['posts_dir'] / f"{post_id}.txt"
+            author, date_line, _body = post_path.read_text(encoding='utf-8').split('\n', 2)
+            mention = '@' + rng.choice(fixture['usernames'])
+            post_path.write_text(f"{author}\n{date_line}\nedited {mention} {rng.random()}", encoding='utf-8')
+
+    results['feed_monitor_changed_pass'] = await time_case(
+        bot.feed_notifications_monitor.coro, args.repeat, setup=touch_posts
+    )
+    results['feed_monitor_changed_pass']['changed_posts'] = args.changed_posts
+    results['feed_monitor_changed_pass']['notifications_queued'] = sum(
+        value for (name, _labels), value in bot.metrics['counters'].items() if name == 'toast_feed_notifications_total'
+    )
+
+    results['dm_history_json_migration'] = await time_case(bot.get_dm_history_db, 1, warmup=0)
+
+    linked_user = SimpleNamespace(
+        id=int(fixture['linked_user_id']),
+        name='user0',
+        global_name='User Zero',
+        display_name='User Zero',
+        display_avatar=None,
+    )
+    results['build_groq_messages'] = await time_case(
+        lambda: bot.build_groq_messages(linked_user, 12, SITE_QUESTION), args.repeat
+    )
+    results['build_wiki_context_for_message'] = await time_case(
+        lambda: bot.build_wiki_context_for_message(SITE_QUESTION), args.repeat
+    )
+
+    feed_body = random_body(random.Random(args.seed), fixture['usernames'], mention_rate=1.0) * 4
+    results['clean_feed_context_text'] = await time_case(
+        lambda: bot.clean_feed_context_text(feed_body), args.repeat * 10
+    )
+    results['split_natural_messages'] = await time_case(
+        lambda: bot.split_natural_messages(LONG_REPLY), args.repeat * 10
+    )
+    results['append_dm_history_entry'] = await time_case(
+        lambda: bot.append_dm_history_entry(linked_user, 'inbound', 'benchmark message ' + str(rng.random())),
+        args.repeat * 5,
+    )
+
+    handle = bot.dm_history_store['export_handle']
+    if handle is not None:
+        handle.cancel()
+    results['export_dm_history_json'] = await time_case(
+        bot.export_dm_history_json,
+        max(1, args.repeat // 5),
+        setup=lambda: bot.dm_history_store.update(export_dirty=True),
+    )
+    bot.close_dm_history_db()
+    bot.close_notify_state_db()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', '-C', str(REPO_ROOT), 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ''
+
+
+def compare_results(current: dict, previous_path: Path) -> dict:
+    previous = json.loads(previous_path.read_text(encoding='utf-8')).get('results', {})
+    comparison = {}
+    for name, stats in current.items():
+        before = previous.get(name)
+        if not before or not before.get('median_ms'):
+            continue
+        comparison[name] = {
+            'previous_median_ms': before['median_ms'],
+            'median_ms': stats['median_ms'],
+            'ratio': round(stats['median_ms'] / before['median_ms'], 3),
+        }
+    return comparison
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--reply-files', type=int, default=8000)
+    parser.add_argument('--replies-per-file', type=int, default=4, help='average replies per replies file')
+    parser.add_argument('--dm-users', type=int, default=300)
+    parser.add_argument('--dm-messages', type=int, default=250, help='messages per DM thread')
+    parser.add_argument('--changed-posts', type=int, default=20, help='posts edited before each changed monitor pass')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', type=Path, help='build the synthetic tree here and keep it (default: temp dir)')
+    parser.add_argument('--output', type=Path, help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', type=Path, help='previous results JSON to compare medians against')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = args.data_dir or Path(tempfile.mkdtemp(prefix='toast-bench-'))
+    if root.exists() and any(root.iterdir()):
+        print(f"{root} is not empty", file=sys.stderr)
+        sys.exit(1)
+    root.mkdir(parents=True, exist_ok=True)
+
+    try:
+        generate_started = time.perf_counter()
+        fixture = generate_data_tree(root, args)
+        generate_seconds = time.perf_counter() - generate_started
+
+        bot = import_bot(fixture['bot_path'])
+        logging.disable(logging.WARNING)
+        results = asyncio.run(run_benchmarks(bot, fixture, args))
+    finally:
+        logging.disable(logging.NOTSET)
+        if args.data_dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'generate_seconds': round(generate_seconds, 2),
+            'scale': {
+                'accounts': args.accounts,
+                'posts': args.posts,
+                'reply_files': args.reply_files,
+                'replies_per_file': args.replies_per_file,
+                'dm_users': args.dm_users,
+                'dm_messages': args.dm_messages,
+            },
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.compare:
+        report['comparison'] = compare_results(results, args.compare)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+End-to-end DM load harness for the toast Discord bot (others/toast-discord-bot/bot/main.py).
+
+Builds the same synthetic site tree as bench-toast-bot.py, imports the bot from it and
+drives on_message with fake Discord users/DM channels. Groq traffic goes to a local fake
+OpenAI-compatible server (configurable latency, streaming and error rate) and PHP-style
+calls are replayed against the bot's status server on a free local port. Nothing talks to
+Discord or Groq.
+
+Reports DM reply latency percentiles, pending-batch and reply-task depths, fake Groq
+concurrency and event-loop lag as JSON.
+
+  others/toast-discord-bot/bot/venv/bin/python scripts/loadtest-toast-bot.py --users 50 --bursts 3 --burst-size 4
+  others/toast-discord-bot/bot/venv/bin/python scripts/loadtest-toast-bot.py --groq-error-rate 0.1 --no-groq-stream
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+from aiohttp import web
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def load_bench_module():
+    spec = importlib.util.spec_from_file_location('toast_bench', SCRIPTS_DIR / 'bench-toast-bot.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bench = load_bench_module()
+
+DM_PROMPTS = [
+    'yo toast whats up',
+    'did you hear the new radio mix',
+    'how do i change my theme on fridg3.org?',
+    'can you explain how feed replies work',
+    'what should i post on the feed today',
+    'lol that is so true',
+    'how does the guestbook work',
+    'i finished my beat, want to hear about it?',
+]
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': pick(0.5),
+        'p90_ms': pick(0.9),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeUser(discord.User):
+    """discord.User stand-in; isinstance checks in the bot pass and send() never leaves the process"""
+
+    def __init__(self, user_id: int, name: str, recorder):
+        self.id = user_id
+        self.name = name
+        self.global_name = name.title()
+        self.discriminator = '0'
+        self.bot = False
+        self.system = False
+        self.recorder = recorder
+        self.sent_messages = 0
+
+    @property
+    def display_avatar(self):
+        return None
+
+    @property
+    def display_name(self):
+        return self.global_name
+
+    async def send(self, content=None, **kwargs):
+        self.sent_messages += 1
+        self.recorder.record_outbound(self, content or '')
+        return SimpleNamespace(id=self.id * 1000 + self.sent_messages, created_at=datetime.now(timezone.utc))
+
+
+class FakeDMChannel(discord.DMChannel):
+    def __init__(self, recipient: FakeUser):
+        self.id = recipient.id + 1
+        self.recipients = [recipient]
+
+    def typing(self):
+        return contextlib.nullcontext()
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent_messages = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent_messages += 1
+        return SimpleNamespace(id=self.id * 1000 + self.sent_messages)
+
+
+class LoadRecorder:
+    def __init__(self, fallback_reply_text: str = ''):
+        self.fallback_reply_text = fallback_reply_text
+        self.awaiting_since = {}
+        self.first_reply_latencies = []
+        self.outbound_chunks = 0
+        self.inbound_messages = 0
+        self.fallback_replies = 0
+
+    def record_inbound(self, user: FakeUser):
+        self.inbound_messages += 1
+        self.awaiting_since[user.id] = time.perf_counter()
+
+    def record_outbound(self, user: FakeUser, content: str):
+        self.outbound_chunks += 1
+        if content == self.fallback_reply_text:
+            self.fallback_replies += 1
+        started = self.awaiting_since.pop(user.id, None)
+        if started is not None:
+            self.first_reply_latencies.append(time.perf_counter() - started)
+
+
+class FakeGroqServer:
+    """Minimal OpenAI-compatible /chat/completions endpoint with tunable latency and failures"""
+
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.aborted_streams = 0
+        self.runner = None
+        self.url = ''
+
+    def reply_tokens(self) -> list:
+        words = [self.rng.choice(bench.WORDS) for _ in range(self.args.groq_tokens)]
+        tokens = []
+        for index, word in enumerate(words):
+            tokens.append(word + ('. ' if index % 12 == 11 else ' '))
+        return tokens
+
+    async def handle_chat_completion(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            payload = await request.json()
+            latency = max(0.0, self.rng.gauss(self.args.groq_latency, self.args.groq_jitter))
+            await asyncio.sleep(latency)
+
+            if self.rng.random() < self.args.groq_error_rate:
+                self.errors += 1
+                status = self.rng.choice((429, 500, 503))
+                return web.json_response({'error': {'message': 'fake groq failure'}}, status=status)
+
+            tokens = self.reply_tokens()
+            if not payload.get('stream'):
+                await asyncio.sleep(self.args.groq_token_delay * len(tokens))
+                return web.json_response({
+                    'id': f"fake-{self.requests}",
+                    'object': 'chat.completion',
+                    'model': payload.get('model', ''),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens).strip()}}],
+                })
+
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            try:
+                await response.prepare(request)
+                for token in tokens:
+                    chunk = {'choices': [{'index': 0, 'delta': {'content': token}}]}
+                    await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    if self.args.groq_token_delay:
+                        await asyncio.sleep(self.args.groq_token_delay)
+                await response.write(b'data: [DONE]\n\n')
+                await response.write_eof()
+            except ConnectionResetError:
+                # the bot closed the request mid-reply (a newer DM cancelled it); that's expected
+                self.aborted_streams += 1
+            return response
+        finally:
+            self.in_flight -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/openai/v1/chat/completions', self.handle_chat_completion)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        port = free_port()
+        await web.TCPSite(self.runner, '127.0.0.1', port).start()
+        self.url = f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'max_in_flight': self.max_in_flight,
+            'aborted_streams': self.aborted_streams,
+        }
+
+
+async def monitor_loop_lag(interval: float, samples: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def sample_queue_depths(bot, groq: FakeGroqServer, interval: float, samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        samples.append({
+            'pending_messages': sum(len(batch) for batch in bot.ai_dm_pending_batches.values()),
+            'pending_users': len(bot.ai_dm_pending_batches),
+            'reply_tasks': sum(1 for task in bot.ai_dm_reply_tasks.values() if not task.done()),
+            'groq_in_flight': groq.in_flight,
+            'dm_queued': sum(bot.dm_dispatch['queued'].values()),
+        })
+        await asyncio.sleep(interval)
+
+
+def summarize_depths(samples: list) -> dict:
+    summary = {}
+    for key in ('pending_messages', 'pending_users', 'reply_tasks', 'groq_in_flight', 'dm_queued'):
+        values = [sample[key] for sample in samples] or [0]
+        summary[key] = {'max': max(values), 'mean': round(statistics.fmean(values), 2)}
+    return summary
+
+
+async def simulate_user(bot, user: FakeUser, channel: FakeDMChannel, recorder: LoadRecorder, args, rng: random.Random):
+    await asyncio.sleep(rng.uniform(0, args.burst_gap))
+    for burst in range(args.bursts):
+        for index in range(args.burst_size):
+            content = rng.choice(DM_PROMPTS)
+            message = SimpleNamespace(
+                id=user.id * 100000 + burst * 100 + index,
+                content=content,
+                attachments=[],
+                author=user,
+                channel=channel,
+                created_at=datetime.now(timezone.utc),
+            )
+            recorder.record_inbound(user)
+            await bot.on_message(message)
+            await asyncio.sleep(rng.uniform(0, args.message_gap * 2))
+        await asyncio.sleep(rng.uniform(args.burst_gap * 0.5, args.burst_gap * 1.5))
+
+
+async def replay_php_calls(base_url: str, php_users: list, channel_id: int, args, rng: random.Random, stop: asyncio.Event):
+    """Hit the status server the way the PHP side does: status polls, manual DMs, mute toggles, contact pings"""
+    latencies = {}
+    statuses = {}
+    if args.php_rate <= 0:
+        return latencies, statuses
+
+    async with aiohttp.ClientSession() as session:
+        while not stop.is_set():
+            route = rng.choices(
+                ('/status', '/metrics', '/messages/send', '/messages/ai-mute', '/contact/notify'),
+                weights=(4, 1, 2, 1, 1),
+            )[0]
+            user = rng.choice(php_users)
+            if route in ('/status', '/metrics'):
+                request = session.get(base_url + route)
+            elif route == '/messages/send':
+                request = session.post(base_url + route, json={'discord_user_id': str(user.id), 'message': 'hey from the site inbox'})
+            elif route == '/messages/ai-mute':
+                request = session.post(base_url + route, json={'discord_user_id': str(user.id), 'muted': False})
+            else:
+                request = session.post(base_url + route, json={
+                    'channel_id': str(channel_id),
+                    'id': f"contact-{rng.randrange(1000000)}",
+                    'name': user.name,
+                    'email': f"{user.name}@example.com",
+                    'message_preview': 'hello from the contact form',
+                })
+
+            started = time.perf_counter()
+            try:
+                async with request as response:
+                    await response.read()
+                    status = str(response.status)
+            except Exception as e:
+                status = e.__class__.__name__
+            latencies.setdefault(route, []).append(time.perf_counter() - started)
+            statuses.setdefault(route, {}).setdefault(status, 0)
+            statuses[route][status] += 1
+            await asyncio.sleep(rng.expovariate(args.php_rate))
+    return latencies, statuses
+
+
+async def wait_for_replies(bot, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if not any(not task.done() for task in bot.ai_dm_reply_tasks.values()):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run_load(bot, fixture: dict, args) -> dict:
+    recorder = LoadRecorder(bot.GROQ_FALLBACK_REPLY)
+
+    groq = FakeGroqServer(args, random.Random(args.seed + 1))
+    await groq.start()
+    bot.GROQ_CHAT_COMPLETIONS_URL = groq.url
+    bot.STATUS_SERVER_PORT = free_port()
+    await bot.start_status_server()
+    base_url = f"http://{bot.STATUS_SERVER_HOST}:{bot.STATUS_SERVER_PORT}"
+
+    linked_ids = [int(account_id) for account_id in fixture['linked_user_ids']]
+    users = []
+    for index in range(args.users):
+        user_id = linked_ids[index] if index < len(linked_ids) else 300000000000000000 + index
+        users.append(FakeUser(user_id, f"loaduser{index}", recorder))
+    php_users = [FakeUser(400000000000000000 + index, f"siteuser{index}", LoadRecorder()) for index in range(10)]
+    users_by_id = {user.id: user for user in users + php_users}
+    contact_channel = FakeTextChannel(500000000000000000)
+
+    async def fetch_user(user_id):
+        return users_by_id[int(user_id)]
+
+    async def skip_commands(message):
+        return None
+
+    # No gateway session exists, so command parsing and REST lookups are served from the fakes.
+    bot.bot.fetch_user = fetch_user
+    bot.bot.get_channel = lambda channel_id: contact_channel if channel_id == contact_channel.id else None
+    bot.bot.process_commands = skip_commands
+    if not args.typing_delay:
+        bot.typing_delay_seconds = lambda text: 0.0
+        bot.AI_DM_MIN_SEND_DELAY_SECONDS = 0.0
+
+    stop = asyncio.Event()
+    lag_samples = []
+    depth_samples = []
+    monitors = [
+        asyncio.create_task(monitor_loop_lag(args.lag_interval, lag_samples, stop)),
+        asyncio.create_task(sample_queue_depths(bot, groq, args.lag_interval * 2, depth_samples, stop)),
+    ]
+    php_task = asyncio.create_task(
+        replay_php_calls(base_url, php_users, contact_channel.id, args, random.Random(args.seed + 2), stop)
+    )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_user(bot, user, FakeDMChannel(user), recorder, args, random.Random(args.seed * 1000 + index))
+        for index, user in enumerate(users)
+    ))
+    drained = await wait_for_replies(bot, args.drain_timeout)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    php_latencies, php_statuses = await php_task
+    await asyncio.gather(*monitors)
+    for task in bot.ai_dm_reply_tasks.values():
+        task.cancel()
+    await groq.stop()
+    await bot.close_groq_http_client()
+    bot.close_dm_history_db()
+    bot.close_notify_state_db()
+
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'drained': drained,
+        'dm': {
+            'inbound_messages': recorder.inbound_messages,
+            'outbound_chunks': recorder.outbound_chunks,
+            'fallback_replies': recorder.fallback_replies,
+            'unanswered_users': len(recorder.awaiting_since),
+            'inbound_per_second': round(recorder.inbound_messages / elapsed, 2) if elapsed else 0.0,
+            'first_reply_latency': percentiles(recorder.first_reply_latencies),
+        },
+        'queue_depths': summarize_depths(depth_samples),
+        'event_loop_lag': percentiles(lag_samples),
+        'groq': groq.stats(),
+        'dm_dispatch': bot.get_dm_dispatch_stats(),
+        'php': {
+            route: {'latency': percentiles(samples), 'statuses': php_statuses.get(route, {})}
+            for route, samples in sorted(php_latencies.items())
+        },
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='concurrent DM users')
+    parser.add_argument('--bursts', type=int, default=3, help='bursts per user')
+    parser.add_argument('--burst-size', type=int, default=4, help='messages per burst')
+    parser.add_argument('--message-gap', type=float, default=0.3, help='mean seconds between messages in a burst')
+    parser.add_argument('--burst-gap', type=float, default=2.0, help='mean seconds between bursts')
+    parser.add_argument('--groq-latency', type=float, default=0.4, help='mean seconds before the fake Groq answers')
+    parser.add_argument('--groq-jitter', type=float, default=0.15)
+    parser.add_argument('--groq-token-delay', type=float, default=0.005, help='seconds between streamed tokens')
+    parser.add_argument('--groq-tokens', type=int, default=60, help='tokens per fake reply')
+    parser.add_argument('--groq-error-rate', type=float, default=0.0, help='fraction of Groq calls answered with 429/5xx')
+    parser.add_argument('--no-groq-stream', action='store_true', help='set groq.stream_replies to false')
+    parser.add_argument('--typing-delay', action='store_true', help='keep the bot typing-delay pacing between chunks')
+    parser.add_argument('--dm-rate', type=float, default=45.0, help='dm_dispatch.rate_per_second for outbound DMs')
+    parser.add_argument('--dm-burst', type=int, default=45, help='dm_dispatch.burst')
+    parser.add_argument('--dm-concurrency', type=int, default=8, help='dm_dispatch.concurrency')
+    parser.add_argument('--php-rate', type=float, default=5.0, help='PHP-style status server calls per second (0 disables)')
+    parser.add_argument('--lag-interval', type=float, default=0.05, help='event-loop lag probe interval in seconds')
+    parser.add_argument('--drain-timeout', type=float, default=60.0, help='seconds to wait for in-flight replies at the end')
+    parser.add_argument('--accounts', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', type=Path, help='write the JSON report to this file instead of stdout')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = Path(tempfile.mkdtemp(prefix='toast-load-'))
+    data_args = SimpleNamespace(
+        seed=args.seed,
+        accounts=args.accounts,
+        posts=args.posts,
+        reply_files=args.posts // 3,
+        replies_per_file=3,
+        dm_users=0,
+        dm_messages=0,
+    )
+
+    try:
+        fixture = bench.generate_data_tree(root, data_args)
+        toast_config_path = root / 'data' / 'etc' / 'toast.json'
+        toast_config = json.loads(toast_config_path.read_text(encoding='utf-8'))
+        toast_config['groq']['stream_replies'] = not args.no_groq_stream
+        toast_config['dm_dispatch'] = {
+            'rate_per_second': args.dm_rate,
+            'burst': args.dm_burst,
+            'concurrency': args.dm_concurrency,
+        }
+        toast_config_path.write_text(json.dumps(toast_config), encoding='utf-8')
+        accounts = json.loads((root / 'data' / 'accounts' / 'accounts.json').read_text(encoding='utf-8'))['accounts']
+        fixture['linked_user_ids'] = [account['discordUserId'] for account in accounts if account['discordUserId']]
+
+        bot = bench.import_bot(fixture['bot_path'])
+        logging.disable(logging.WARNING)
+        results = asyncio.run(run_load(bot, fixture, args))
+    finally:
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'revision': bench.git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())